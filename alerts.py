@@ -1,29 +1,213 @@
 import asyncio
+import random
+import time
 import websockets
 import json
 import logging
-from config import RECONNECT_DELAY_SECONDS 
+from dataclasses import dataclass
+from config import (
+    RECONNECT_INITIAL_DELAY_SECONDS, RECONNECT_DELAY_SECONDS, WS_PING_INTERVAL_SECONDS, WS_PING_TIMEOUT_SECONDS,
+    WHALE_ALERT_BACKFILL_MAX_SECONDS,
+)
+from dedup import DedupIndex
+from metrics import FRAMES_RECEIVED, FRAMES_FILTERED, FRAME_ERRORS, ALERTS_RECEIVED, WS_RECONNECTS
+
+# _DECODE_ERRORS: what the active decoder raises on a malformed frame (msgspec's DecodeError is not a
+# ValueError), plus ValueError for bad field values.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _DECODE_ERRORS = (orjson.JSONDecodeError, ValueError)
+    JSON_DECODER = 'orjson'
+except ImportError:
+    try:
+        import msgspec
+        _json_loads = msgspec.json.decode
+        _DECODE_ERRORS = (msgspec.DecodeError, ValueError)
+        JSON_DECODER = 'msgspec'
+    except ImportError:
+        _json_loads = json.loads
+        _DECODE_ERRORS = (json.JSONDecodeError, ValueError)
+        JSON_DECODER = 'json'
 
 """
 Connects to Whale Alert WebSocket, subscribes, yields parsed alert data,
 and handles reconnections.
+Frames are received as raw bytes and run through a cheap byte-level pre-filter
+before any JSON decoding, so frames for other symbols or message types are
+rejected without a full parse. Matching frames are decoded with orjson or
+msgspec when installed (stdlib json otherwise) into WhaleAlert records.
+Dead connections are detected with ping/pong keepalives, reconnects back off
+exponentially with jitter from a sub-second first attempt, and an optional
+backfill callable recovers the alerts missed while the stream was down.
 """
 
 logger = logging.getLogger(__name__)
 
-async def listen_for_alerts(websocket_url: str, subscription_msg: dict):
+
+@dataclass(slots=True)
+class WhaleAlert:
+    symbol: str
+    blockchain: str
+    amount: float
+    value_usd: float
+    from_owner: str
+    to_owner: str
+    timestamp: int = None
+    batch: list = None
+    from_owner_type: str = 'unknown'
+    to_owner_type: str = 'unknown'
+    tx_hash: str = None
+
+
+def _owner(party) -> str:
+    if isinstance(party, dict):
+        return party.get('owner', party.get('owner_type', 'unknown'))
+    elif isinstance(party, str):
+        return party
+    return 'unknown'
+
+
+def _owner_type(party) -> str:
+    if isinstance(party, dict):
+        return party.get('owner_type') or 'unknown'
+    return 'unknown'
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Backoff:
+    """Exponential reconnect delays with equal jitter: each delay is drawn from [d/2, d], d doubling up to `maximum`."""
+
+    def __init__(self, initial: float = RECONNECT_INITIAL_DELAY_SECONDS, maximum: float = RECONNECT_DELAY_SECONDS,
+                 multiplier: float = 2.0, rng: random.Random = None):
+        self.initial = initial
+        self.maximum = max(initial, maximum)
+        self.multiplier = multiplier
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next(self) -> float:
+        ceiling = min(self.maximum, self.initial * self.multiplier ** self.attempts)
+        self.attempts += 1
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def reset(self):
+        self.attempts = 0
+
+
+_SYMBOL_KEY = b'"symbol":"'
+
+
+def build_symbol_filter(symbols) -> tuple:
+    """Returns (lowercase symbol set, same set as bytes) used by parse_frame."""
+    symbol_set = frozenset(s.lower() for s in symbols)
+    return symbol_set, frozenset(s.encode() for s in symbol_set)
+
+
+def prefilter_frame(frame: bytes, symbol_bytes: frozenset) -> bool:
+    """
+    False when the raw frame cannot be an alert for a subscribed symbol.
+    Only compact `"symbol":"xxx"` layouts are inspected; anything else passes
+    through to the full parse.
+    """
+    if b'"alert"' not in frame:
+        return False
+    start = frame.find(_SYMBOL_KEY)
+    if start < 0:
+        return True
+    start += len(_SYMBOL_KEY)
+    return frame[start:frame.find(b'"', start)].lower() in symbol_bytes
+
+
+def parse_frame(frame, symbol_filter: tuple):
+    """Decodes one WebSocket frame into a WhaleAlert, or None if it is not a target alert."""
+    symbol_set, symbol_bytes = symbol_filter
+    if isinstance(frame, str):
+        frame = frame.encode()
+    if not prefilter_frame(frame, symbol_bytes):
+        return None
+    message_data = _json_loads(frame)
+    symbol = message_data.get('symbol') or ''
+    if message_data.get('type') != 'alert' or symbol.lower() not in symbol_set:
+        return None
+    amount = 0
+    value_usd = 0
+    amounts_list = message_data.get('amounts')
+    if amounts_list:
+        first_amount_dict = amounts_list[0]
+        if isinstance(first_amount_dict, dict):
+            amount = first_amount_dict.get('amount', 0)
+            value_usd = first_amount_dict.get('value_usd', 0)
+    from_data = message_data.get('from')
+    to_data = message_data.get('to')
+    transaction = message_data.get('transaction')
+    return WhaleAlert(
+        symbol=symbol.upper(),
+        blockchain=(message_data.get('blockchain') or 'unknown').upper(),
+        amount=_number(amount),
+        value_usd=_number(value_usd),
+        from_owner=_owner(from_data),
+        to_owner=_owner(to_data),
+        timestamp=message_data.get('timestamp'),
+        from_owner_type=_owner_type(from_data),
+        to_owner_type=_owner_type(to_data),
+        tx_hash=transaction.get('hash') if isinstance(transaction, dict) else None,
+    )
+
+
+async def _backfill_gap(backfill, since: float, symbol_set: frozenset, min_value_usd: float, seen: DedupIndex) -> list:
+    """Alerts the backfill source reports since `since` that are for target symbols and not yet seen."""
+    until = time.time()
+    since = max(since, until - WHALE_ALERT_BACKFILL_MAX_SECONDS)
+    try:
+        missed = await backfill(since, until)
+    except Exception as e:
+        logger.error(f"Alert backfill failed: {e}", exc_info=True)
+        return []
+    recovered = [alert for alert in missed
+                 if alert.symbol.lower() in symbol_set and alert.value_usd >= min_value_usd and seen.add(alert)]
+    logger.info(f"Backfilled {len(recovered)} missed alert(s) from a {until - since:.0f}s gap "
+                f"({len(missed) - len(recovered)} already seen or filtered).")
+    return recovered
+
+
+async def listen_for_alerts(websocket_url: str, subscription_msg: dict, reconnect: bool = True, backfill=None,
+                            seen: DedupIndex = None):
+    """
+    Yields target alerts from the stream; with reconnect=False it returns once the connection ends.
+    Alerts below the subscription's min_value_usd are dropped locally as well as by the server.
+    `backfill(since, until)` is an optional coroutine function returning the WhaleAlerts between two
+    Unix timestamps; after each reconnect its results for the outage are yielded before live alerts.
+    Listeners that share the `seen` DedupIndex never yield the same transfer twice within its window.
+    """
     if not websocket_url:
         logger.critical("WebSocket URL is not configured. Cannot connect.")
-        return 
-    subscribed_symbols = [s.lower() for s in subscription_msg.get("symbols", [])]
+        return
+    symbol_filter = build_symbol_filter(subscription_msg.get("symbols", []))
+    subscribed_symbols = sorted(symbol_filter[0])
     if not subscribed_symbols:
         logger.error("No symbols defined in subscription message. Cannot filter alerts.")
         return
-    logger.info(f"Will listen for alerts for symbols: {', '.join(subscribed_symbols).upper()}")
-    while True: 
+    logger.info(f"Will listen for alerts for symbols: {', '.join(subscribed_symbols).upper()} (decoder: {JSON_DECODER})")
+    frames_received = FRAMES_RECEIVED.labels()
+    frames_filtered = FRAMES_FILTERED.labels()
+    min_value_usd = subscription_msg.get("min_value_usd") or 0
+    backoff = Backoff()
+    seen = seen if seen is not None else DedupIndex()
+    # Earliest moment alerts may have been missed: a dead link goes unnoticed for up to a ping interval plus timeout.
+    detection_lag = WS_PING_INTERVAL_SECONDS + WS_PING_TIMEOUT_SECONDS
+    gap_started = None
+    while True:
         try:
             logger.info(f"Attempting WebSocket connection...")
-            async with websockets.connect(websocket_url) as ws:
+            async with websockets.connect(websocket_url, ping_interval=WS_PING_INTERVAL_SECONDS,
+                                          ping_timeout=WS_PING_TIMEOUT_SECONDS) as ws:
                 logger.info("WebSocket connected. Subscribing...")
                 await ws.send(json.dumps(subscription_msg))
                 try:
@@ -33,71 +217,58 @@ async def listen_for_alerts(websocket_url: str, subscription_msg: dict):
                      logger.warning("Did not receive subscription confirmation within 10s.")
                 except Exception as conf_e:
                      logger.error(f"Error receiving subscription confirmation: {conf_e}")
+                if gap_started is not None and backfill is not None:
+                    for missed_alert in await _backfill_gap(backfill, gap_started, symbol_filter[0], min_value_usd, seen):
+                        ALERTS_RECEIVED.labels(missed_alert.symbol).inc()
+                        yield missed_alert
+                gap_started = None
+                healthy = False
                 logger.info(f"Listening for alerts for {', '.join(subscribed_symbols).upper()}...")
-                while True: 
+                while True:
                     try:
-                        message_str = await asyncio.wait_for(ws.recv(), timeout=50)
-                        message_data = json.loads(message_str)
-                        message_symbol_lower = message_data.get('symbol', '').lower()
-                        if message_data.get('type') == 'alert' and message_symbol_lower in subscribed_symbols:
-                            from_data = message_data.get('from')
-                            to_data = message_data.get('to')
-                            if isinstance(from_data, dict):
-                                from_owner = from_data.get('owner', from_data.get('owner_type', 'unknown'))
-                            elif isinstance(from_data, str):
-                                from_owner = from_data
-                            else:
-                                from_owner = 'unknown'
-                            if isinstance(to_data, dict):
-                                to_owner = to_data.get('owner', to_data.get('owner_type', 'unknown'))
-                            elif isinstance(to_data, str):
-                                to_owner = to_data
-                            else:
-                                to_owner = 'unknown'
-                            amounts_list = message_data.get('amounts', [])
-                            amount = 0
-                            value_usd = 0
-                            if amounts_list: 
-                                first_amount_dict = amounts_list[0]
-                                if isinstance(first_amount_dict, dict):
-                                    amount = first_amount_dict.get('amount', 0)
-                                    value_usd = first_amount_dict.get('value_usd', 0)
-                            parsed_alert = {
-                                'symbol': message_data.get('symbol', 'UNKNOWN').upper(), 
-                                'blockchain': message_data.get('blockchain', 'unknown').upper(),
-                                'amount': amount,
-                                'value_usd': value_usd,
-                                'from_owner': from_owner,
-                                'to_owner': to_owner,
-                                'timestamp': message_data.get('timestamp')
-                            }
-                            logger.info(f"Yielding parsed {parsed_alert['symbol']} alert.")
-                            yield parsed_alert 
+                        message_bytes = await asyncio.wait_for(ws.recv(decode=False), timeout=50)
+                        frames_received.inc()
+                        if not healthy:
+                            healthy = True
+                            backoff.reset()
+                        parsed_alert = parse_frame(message_bytes, symbol_filter)
+                        if parsed_alert is not None and parsed_alert.value_usd >= min_value_usd:
+                            if not seen.add(parsed_alert):
+                                logger.info("Skipping duplicate %s alert.", parsed_alert.symbol)
+                                continue
+                            ALERTS_RECEIVED.labels(parsed_alert.symbol).inc()
+                            logger.info("Yielding parsed %s alert.", parsed_alert.symbol)
+                            yield parsed_alert
                         else:
-                            logger.debug(f"Ignoring non-target message: Type='{message_data.get('type')}', Symbol='{message_data.get('symbol')}'")
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to decode JSON: {message_str}")
+                            frames_filtered.inc()
+                            if logger.isEnabledFor(logging.DEBUG):
+                                logger.debug("Ignoring non-target message: %r", message_bytes[:120])
+                    except _DECODE_ERRORS:
+                        FRAME_ERRORS.inc()
+                        logger.error("Failed to decode JSON: %r", message_bytes)
                     except asyncio.TimeoutError: # If using wait_for
                         logger.debug('No message received within timeout window, continuing listen.')
                         continue
                     except websockets.ConnectionClosedOK:
                         logger.info("Inner loop detected connection closed normally.")
-                        break 
+                        break
                     except websockets.ConnectionClosedError as e:
                          logger.warning(f"Inner loop detected connection closed error: {e}")
-                         break 
+                         break
                     except Exception as e:
                         logger.error(f"Error processing message inside loop: {e}", exc_info=True)
-        except websockets.exceptions.InvalidStatusCode as e: 
-            logger.error(f"WebSocket Handshake Failed: Status {e.status_code}. Check API Key/Rate Limits.")
-            logger.info(f"Waiting {RECONNECT_DELAY_SECONDS * 4} seconds before retrying handshake...")
-            await asyncio.sleep(RECONNECT_DELAY_SECONDS * 4) 
-            continue 
+        except websockets.exceptions.InvalidStatus as e:
+            logger.error(f"WebSocket Handshake Failed: Status {e.response.status_code}. Check API Key/Rate Limits.")
         except ConnectionRefusedError:
-            logger.error(f"Connection refused by server. Retrying in {RECONNECT_DELAY_SECONDS * 2}s...")
-            await asyncio.sleep(RECONNECT_DELAY_SECONDS * 2)
-            continue
-        except Exception as e: 
+            logger.error("Connection refused by server.")
+        except Exception as e:
             logger.error(f"WebSocket connection failed: {e}", exc_info=True)
-        logger.info(f"Waiting {RECONNECT_DELAY_SECONDS} seconds before attempting reconnect...")
-        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
\ No newline at end of file
+        if gap_started is None:
+            gap_started = time.time() - detection_lag
+        if not reconnect:
+            logger.info("WebSocket stream ended; not reconnecting.")
+            return
+        WS_RECONNECTS.inc()
+        delay = backoff.next()
+        logger.info(f"Reconnecting in {delay:.2f}s (attempt {backoff.attempts})...")
+        await asyncio.sleep(delay)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from alerts import WhaleAlert
+from config import ALERT_BATCH_WINDOW_SECONDS, ALERT_BATCH_MAX_SIZE
+
+"""
+Micro-batching stage between listen_for_alerts and process_alert.
+Alerts for the same symbol that arrive within a short window are merged into a
+single WhaleAlert carrying the individual transfers in `batch`, so a burst costs
+one LLaMA inference and one Telegram message instead of one per transfer.
+"""
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+def merge_alerts(alerts: list) -> WhaleAlert:
+    """Combines same-symbol alerts into one; a single alert is returned unchanged."""
+    if len(alerts) == 1:
+        return alerts[0]
+    largest = max(alerts, key=lambda a: a.value_usd)
+    return WhaleAlert(
+        symbol=largest.symbol,
+        blockchain=largest.blockchain,
+        amount=sum(a.amount for a in alerts),
+        value_usd=sum(a.value_usd for a in alerts),
+        from_owner=largest.from_owner,
+        to_owner=largest.to_owner,
+        timestamp=max((a.timestamp or 0 for a in alerts), default=None),
+        batch=alerts,
+        from_owner_type=largest.from_owner_type,
+        to_owner_type=largest.to_owner_type,
+    )
+
+
+async def batch_alerts(alerts, window_seconds: float = ALERT_BATCH_WINDOW_SECONDS,
+                       max_batch_size: int = ALERT_BATCH_MAX_SIZE):
+    """
+    Re-yields alerts from the async iterator `alerts`, merging same-symbol alerts
+    seen within `window_seconds` of the first one (or up to `max_batch_size`).
+    Batching is disabled when the window is <= 0 or the max size is <= 1.
+    """
+    if window_seconds <= 0 or max_batch_size <= 1:
+        async for alert in alerts:
+            yield alert
+        return
+
+    inbox = asyncio.Queue(maxsize=max_batch_size * 4)
+
+    async def pump():
+        try:
+            async for alert in alerts:
+                await inbox.put(alert)
+        except Exception as e:
+            await inbox.put(e)
+        finally:
+            await inbox.put(_END)
+
+    pump_task = asyncio.create_task(pump(), name="alert-batcher-pump")
+    pending = {}
+    try:
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, min(deadline for deadline, _ in pending.values()) - time.monotonic())
+            try:
+                item = await asyncio.wait_for(inbox.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                now = time.monotonic()
+                for symbol in [s for s, (deadline, _) in pending.items() if deadline <= now]:
+                    _, batch = pending.pop(symbol)
+                    yield merge_alerts(batch)
+                continue
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            symbol = item.symbol
+            if symbol not in pending:
+                pending[symbol] = (time.monotonic() + window_seconds, [])
+            batch = pending[symbol][1]
+            batch.append(item)
+            if len(batch) >= max_batch_size:
+                del pending[symbol]
+                logger.info("Flushing full %s batch of %d alerts.", symbol, len(batch))
+                yield merge_alerts(batch)
+        for _, batch in pending.values():
+            yield merge_alerts(batch)
+    finally:
+        pump_task.cancel()
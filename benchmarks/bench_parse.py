@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import JSON_DECODER, build_symbol_filter, parse_frame  # noqa: E402
+
+"""
+Microbenchmark for Whale Alert frame parsing.
+Replays recorded WebSocket frames (JSONL, one frame per line) through the
+previous json.loads + dict path and the current pre-filter + fast-decoder
+path, reporting frames/sec and tracemalloc-measured allocation per frame.
+
+Usage: python benchmarks/bench_parse.py [frames.jsonl] [--symbols btc,eth] [--repeat 50]
+"""
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'whale_frames_sample.jsonl')
+
+
+def legacy_parse(message_str: str, subscribed_symbols: list):
+    """The pre-fast-path parser: full json.loads of every frame, then an ad-hoc dict."""
+    message_data = json.loads(message_str)
+    message_symbol_lower = message_data.get('symbol', '').lower()
+    if message_data.get('type') == 'alert' and message_symbol_lower in subscribed_symbols:
+        from_data = message_data.get('from')
+        to_data = message_data.get('to')
+        if isinstance(from_data, dict):
+            from_owner = from_data.get('owner', from_data.get('owner_type', 'unknown'))
+        elif isinstance(from_data, str):
+            from_owner = from_data
+        else:
+            from_owner = 'unknown'
+        if isinstance(to_data, dict):
+            to_owner = to_data.get('owner', to_data.get('owner_type', 'unknown'))
+        elif isinstance(to_data, str):
+            to_owner = to_data
+        else:
+            to_owner = 'unknown'
+        amounts_list = message_data.get('amounts', [])
+        amount = 0
+        value_usd = 0
+        if amounts_list:
+            first_amount_dict = amounts_list[0]
+            if isinstance(first_amount_dict, dict):
+                amount = first_amount_dict.get('amount', 0)
+                value_usd = first_amount_dict.get('value_usd', 0)
+        return {
+            'symbol': message_data.get('symbol', 'UNKNOWN').upper(),
+            'blockchain': message_data.get('blockchain', 'unknown').upper(),
+            'amount': amount,
+            'value_usd': value_usd,
+            'from_owner': from_owner,
+            'to_owner': to_owner,
+            'timestamp': message_data.get('timestamp')
+        }
+    return None
+
+
+def _throughput(parse, frames, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            parse(frame)
+    return len(frames) * repeat / (time.perf_counter() - start)
+
+
+def _allocation(parse, frames) -> tuple:
+    """Returns (avg peak bytes allocated while parsing a frame, retained bytes per kept alert)."""
+    kept = []
+    tracemalloc.start()
+    peak_total = 0
+    for frame in frames:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        result = parse(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - before
+        if result is not None:
+            kept.append(result)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    kept_count = len(kept)
+    return peak_total / len(frames), retained / kept_count if kept_count else 0.0, kept_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('frames', nargs='?', default=DEFAULT_FRAMES)
+    parser.add_argument('--symbols', default='btc,eth')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.frames, 'rb') as f:
+        raw_frames = [line.rstrip(b'\n') for line in f if line.strip()]
+    text_frames = [frame.decode() for frame in raw_frames]
+    symbols = [s.strip().lower() for s in args.symbols.split(',') if s.strip()]
+    symbol_filter = build_symbol_filter(symbols)
+
+    cases = [
+        ('legacy json+dict', lambda frame: legacy_parse(frame, symbols), text_frames),
+        (f'fast path ({JSON_DECODER})', lambda frame: parse_frame(frame, symbol_filter), raw_frames),
+    ]
+    print(f"{len(raw_frames)} frames from {args.frames}, symbols {','.join(symbols)}, repeat {args.repeat}")
+    print(f"{'parser':<24} {'frames/sec':>12} {'peak B/frame':>13} {'retained B/alert':>17} {'alerts':>7}")
+    for name, parse, frames in cases:
+        rate = _throughput(parse, frames, args.repeat)
+        peak, retained, kept = _allocation(parse, frames)
+        print(f"{name:<24} {rate:>12,.0f} {peak:>13,.0f} {retained:>17,.0f} {kept:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from replay import DEFAULT_LATENCIES, MockServiceServer, ServiceProfile, load_frames  # noqa: E402
+
+"""
+End-to-end pipeline benchmark with per-stage latency percentiles.
+Drives synthetic alert loads at several arrival rates through the real
+dispatcher, process_alert and TelegramSender, with Twitter, Cerebras and
+Telegram served by the replay mock server (see replay.py). For every rate it
+reports p50/p95/p99 for the parse, enrich, infer, render and deliver stages,
+achieved throughput and peak RSS, and writes everything to a JSON file so runs
+from different versions can be diffed; --baseline prints p95 changes against a
+previous results file.
+
+Usage: python benchmarks/bench_pipeline.py [--rates 5,20,50] [--duration 10] [--output results.json] [--baseline old.json]
+"""
+
+DEFAULT_FRAMES = os.path.join(ROOT, 'benchmarks', 'data', 'whale_frames_sample.jsonl')
+STAGES = ('parse', 'enrich', 'infer', 'render', 'deliver', 'total')
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+
+    def pct(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {'count': len(values), 'p50': pct(0.50), 'p95': pct(0.95), 'p99': pct(0.99), 'max': values[-1]}
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def configure_environment(mock_url: str):
+    """Points every backend at the mock server; tunables can still be overridden from the environment."""
+    os.environ.update({
+        'WHALE_ALERT_API_KEY': 'bench',
+        'TWITTER_BEARER_TOKEN': 'bench',
+        'TWITTER_API_BASE_URL': mock_url,
+        'CEREBRAS_API_KEY': 'bench',
+        'CEREBRAS_BASE_URL': mock_url,
+        'CEREBRAS_MODEL_ID': 'bench-model',
+        'TELEGRAM_BOT_TOKEN': 'bench',
+        'TELEGRAM_API_BASE_URL': mock_url,
+        'TELEGRAM_CHAT_ID': 'bench-chat',
+        'TELEGRAM_ROUTES': '',
+        'ALERT_JOURNAL_PATH': '',
+        'LLAMA_CACHE_DB': '',
+    })
+    for name, value in {
+        'LOG_LEVEL': 'WARNING',
+        'LLAMA_CACHE_TTL_SECONDS': '0',
+        'TELEGRAM_STREAM_ANALYSIS': 'false',
+        'TELEGRAM_GLOBAL_RATE_PER_SECOND': '1000',
+        'TELEGRAM_CHAT_RATE_PER_MINUTE': '60000',
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+async def run_rate(alerts_module, main_module, client, frames: list, rate: float, duration: float) -> dict:
+    """Submits frames at `rate` per second for `duration` seconds and collects per-stage timings."""
+    from dispatcher import AlertDispatcher
+    from enrichment import build_default_sources
+    from telegram_bot import TelegramSender
+
+    symbol_filter = alerts_module.build_symbol_filter(main_module.config.WHALE_SUBSCRIPTION_MSG['symbols'])
+    samples = {stage: [] for stage in STAGES}
+    sources = build_default_sources()
+    sender = TelegramSender(client, main_module.config.TELEGRAM_BOT_TOKEN)
+    sender.start()
+
+    async def handler(alert):
+        timings = await main_module.process_alert(client, alert, sources, sender)
+        for stage, seconds in (timings or {}).items():
+            samples[stage].append(seconds)
+
+    dispatcher = AlertDispatcher(handler)
+    dispatcher.start()
+    count = max(1, int(rate * duration))
+    started = time.monotonic()
+    for i in range(count):
+        wait = started + i / rate - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        parse_start = time.perf_counter()
+        alert = alerts_module.parse_frame(frames[i % len(frames)], symbol_filter)
+        samples['parse'].append(time.perf_counter() - parse_start)
+        await dispatcher.submit(alert)
+    await dispatcher.close(drain_timeout=max(60.0, duration))
+    await sender.close(drain_timeout=60.0)
+    elapsed = time.monotonic() - started
+    samples['deliver'] = list(sender.latencies)
+    dispatch_stats = dispatcher.stats()
+    return {
+        'rate': rate,
+        'duration_seconds': duration,
+        'alerts_submitted': count,
+        'alerts_processed': dispatch_stats['processed'],
+        'alerts_failed': dispatch_stats['failed'],
+        'alerts_dropped': dispatch_stats['dropped'],
+        'messages_delivered': sender.delivered,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': dispatch_stats['processed'] / elapsed if elapsed else 0.0,
+        'avg_queue_wait_seconds': dispatch_stats['avg_queue_wait_seconds'],
+        'stages': {stage: percentiles(values) for stage, values in samples.items()},
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+
+async def run_benchmark(args) -> dict:
+    profiles = {
+        service: ServiceProfile(latency=latency, jitter=args.jitter)
+        for service, latency in dict(DEFAULT_LATENCIES, cerebras=args.cerebras_latency).items()
+    }
+    mock = MockServiceServer(profiles, seed=args.seed)
+    await mock.start()
+    configure_environment(mock.base_url)
+    import alerts
+    import main
+    main.config.setup_logging()
+    await main.warm_up_llama()
+
+    symbol_filter = alerts.build_symbol_filter(main.config.WHALE_SUBSCRIPTION_MSG['symbols'])
+    frames = [frame for frame in load_frames(args.frames) if alerts.parse_frame(frame, symbol_filter)]
+    runs = []
+    try:
+        async with main.HttpClients() as http:
+            for rate in args.rates:
+                print(f"Running {rate:g} alerts/s for {args.duration:g}s...", file=sys.stderr)
+                runs.append(await run_rate(alerts, main, http.client, frames, rate, args.duration))
+            pool_stats = http.stats()
+    finally:
+        await mock.stop()
+    return {
+        'meta': {
+            'benchmark': 'pipeline',
+            'git_revision': git_revision(),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'json_decoder': alerts.JSON_DECODER,
+            'alert_workers': main.config.ALERT_WORKERS,
+            'mock_latency_seconds': {service: profile.latency for service, profile in profiles.items()},
+            'mock_jitter': args.jitter,
+            'frames': args.frames,
+            'http_pools': pool_stats,
+        },
+        'runs': runs,
+    }
+
+
+def print_report(results: dict, baseline: dict = None):
+    baseline_runs = {run['rate']: run for run in (baseline or {}).get('runs', [])}
+    for run in results['runs']:
+        print(f"\n{run['rate']:g} alerts/s: {run['alerts_processed']}/{run['alerts_submitted']} processed, "
+              f"{run['throughput_per_second']:.1f}/s, dropped {run['alerts_dropped']}, "
+              f"peak RSS {run['peak_rss_bytes'] / 2**20:.1f} MiB")
+        print(f"  {'stage':<8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+              + (f" {'p95 vs base':>12}" if baseline_runs else ''))
+        for stage in STAGES:
+            stats = run['stages'].get(stage, {})
+            if not stats.get('count'):
+                continue
+            line = f"  {stage:<8}" + ''.join(f" {stats[key] * 1000:>9.2f}" for key in ('p50', 'p95', 'p99', 'max'))
+            base = baseline_runs.get(run['rate'], {}).get('stages', {}).get(stage, {})
+            if base.get('p95'):
+                line += f" {(stats['p95'] / base['p95'] - 1) * 100:>+11.1f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', default=DEFAULT_FRAMES)
+    parser.add_argument('--rates', default='5,20,50', help="Comma-separated alert arrival rates per second")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per rate")
+    parser.add_argument('--cerebras-latency', type=float, default=DEFAULT_LATENCIES['cerebras'])
+    parser.add_argument('--jitter', type=float, default=0.3, help="Log-normal spread of mock latencies")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_pipeline_results.json')
+    parser.add_argument('--baseline', help="Previous results file to compare p95 latencies against")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(',') if rate.strip()]
+
+    results = asyncio.run(run_benchmark(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+"""
+Startup-time benchmark: how long `import main` takes in a fresh interpreter.
+Runs `python -X importtime -c "import main"` several times with placeholder
+credentials, reports the median cumulative import time, the slowest modules by
+self time and any heavy SDKs that were imported eagerly, and exits non-zero
+when the median exceeds --budget-ms or a deferred dependency was loaded at
+import (so it can guard startup in CI).
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--budget-ms 400] [--module main] [--json]
+"""
+
+# Dependencies that must only be imported when first used.
+DEFERRED_MODULES = ('cerebras', 'telegram')
+PLACEHOLDER_ENV = {
+    'WHALE_ALERT_API_KEY': 'startup-bench',
+    'CEREBRAS_API_KEY': 'startup-bench',
+    'CEREBRAS_MODEL_ID': 'startup-bench',
+    'TELEGRAM_BOT_TOKEN': 'startup-bench',
+    'TELEGRAM_CHAT_ID': 'startup-bench',
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self_us, cumulative_us) rows from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str) -> dict:
+    env = dict(os.environ, **PLACEHOLDER_ENV)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    total = next(cumulative for name, _, cumulative in reversed(rows) if name == module)
+    return {
+        'total_ms': total / 1000,
+        'slowest': sorted(rows, key=lambda row: row[1], reverse=True)[:10],
+        'eager': sorted({name.split('.')[0] for name, _, _ in rows if name.split('.')[0] in DEFERRED_MODULES}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=400.0, help="Fail when the median import time exceeds this")
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    median_ms = statistics.median(run['total_ms'] for run in runs)
+    eager = sorted({name for run in runs for name in run['eager']})
+    results = {
+        'module': args.module,
+        'runs': [round(run['total_ms'], 1) for run in runs],
+        'median_ms': round(median_ms, 1),
+        'budget_ms': args.budget_ms,
+        'eager_deferred_modules': eager,
+        'slowest_self_us': [[name, self_us] for name, self_us, _ in runs[-1]['slowest']],
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+        for name, self_us in results['slowest_self_us']:
+            print(f"  {self_us / 1000:8.1f} ms  {name}")
+        if eager:
+            print(f"Imported eagerly (should be deferred): {', '.join(eager)}")
+    if median_ms > args.budget_ms or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import build_symbol_filter, parse_frame  # noqa: E402
+from replay import load_frames  # noqa: E402
+from scoring import AlertScorer, LLM, TEMPLATE, DIGEST  # noqa: E402
+
+"""
+Offline evaluation of the alert pre-scorer on a recorded capture (JSONL frames,
+.gz supported). Scores every target alert in recorded order, exactly as the
+live pipeline would, then sweeps LLM thresholds and reports for each one
+how many LLM calls it would make, how much of the moved USD value those alerts
+cover, and the recall of "notable" alerts. Notable means in the top
+--notable-share by value of their symbol over the whole capture, a hindsight
+reference the online scorer never sees.
+
+Usage: python benchmarks/eval_prescore.py [frames.jsonl] [--symbols btc,eth]
+           [--llm-thresholds 0.4,0.5,0.55,0.6,0.7] [--template-threshold 0.3] [--json]
+"""
+
+DEFAULT_FRAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'whale_frames_sample.jsonl')
+
+
+def score_capture(path: str, symbols: list, scorer: AlertScorer) -> list:
+    """(alert, score) for every target alert in the capture, in recorded order."""
+    symbol_filter = build_symbol_filter(symbols)
+    scored = []
+    for frame in load_frames(path):
+        alert = parse_frame(frame, symbol_filter)
+        if alert is not None:
+            scored.append((alert, scorer.score(alert)))
+    return scored
+
+
+def notable_alerts(scored: list, share: float) -> set:
+    """Indices of the top `share` of each symbol's alerts by USD value."""
+    by_symbol = defaultdict(list)
+    for index, (alert, _) in enumerate(scored):
+        by_symbol[alert.symbol].append(index)
+    notable = set()
+    for indices in by_symbol.values():
+        ranked = sorted(indices, key=lambda index: scored[index][0].value_usd, reverse=True)
+        notable.update(ranked[:max(1, round(len(ranked) * share))])
+    return notable
+
+
+def evaluate(scored: list, llm_thresholds: list, template_threshold: float, notable_share: float) -> dict:
+    notable = notable_alerts(scored, notable_share)
+    total_value = sum(alert.value_usd for alert, _ in scored) or 1.0
+    scores = sorted(score for _, score in scored)
+    sweeps = []
+    for threshold in llm_thresholds:
+        router = AlertScorer(llm_threshold=threshold, template_threshold=min(template_threshold, threshold),
+                             digest_enabled=True)
+        routes = [router.route_for(score) for _, score in scored]
+        llm = [index for index, route in enumerate(routes) if route == LLM]
+        sweeps.append({
+            'llm_threshold': threshold,
+            'llm_calls': len(llm),
+            'llm_share': len(llm) / len(scored),
+            'template': routes.count(TEMPLATE),
+            'digest': routes.count(DIGEST),
+            'value_share_analyzed': sum(scored[index][0].value_usd for index in llm) / total_value,
+            'notable_recall': len(notable.intersection(llm)) / len(notable),
+        })
+    return {
+        'alerts': len(scored),
+        'notable_alerts': len(notable),
+        'score_percentiles': {
+            f"p{q}": round(scores[min(len(scores) - 1, int(len(scores) * q / 100))], 3) for q in (10, 50, 90)
+        },
+        'template_threshold': template_threshold,
+        'sweeps': sweeps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('frames', nargs='?', default=DEFAULT_FRAMES)
+    parser.add_argument('--symbols', default='btc,eth')
+    parser.add_argument('--llm-thresholds', default='0.4,0.5,0.55,0.6,0.7')
+    parser.add_argument('--template-threshold', type=float, default=0.3)
+    parser.add_argument('--notable-share', type=float, default=0.1, help="Top share of each symbol's alerts counted as notable")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    scored = score_capture(args.frames, args.symbols.split(','), AlertScorer())
+    if not scored:
+        sys.exit(f"No {args.symbols} alerts in {args.frames}.")
+    results = evaluate(scored, [float(t) for t in args.llm_thresholds.split(',')], args.template_threshold,
+                       args.notable_share)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['alerts']} alerts, {results['notable_alerts']} notable; scores {results['score_percentiles']}")
+    print(f"{'threshold':>9} {'LLM calls':>10} {'saved':>7} {'template':>9} {'digest':>7} {'value':>7} {'recall':>7}")
+    for sweep in results['sweeps']:
+        print(f"{sweep['llm_threshold']:>9.2f} {sweep['llm_calls']:>10} {1 - sweep['llm_share']:>7.0%} "
+              f"{sweep['template']:>9} {sweep['digest']:>7} {sweep['value_share_analyzed']:>7.0%} "
+              f"{sweep['notable_recall']:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import logging
+import time
+from collections import deque
+from config import (
+    BREAKER_ENABLED, BREAKER_WINDOW_SIZE, BREAKER_MIN_CALLS, BREAKER_FAILURE_RATE,
+    BREAKER_OPEN_SECONDS, BREAKER_HALF_OPEN_CALLS, CEREBRAS_BREAKER_SLOW_SECONDS, TWITTER_BREAKER_SLOW_SECONDS,
+)
+
+"""
+Circuit breakers for upstream dependencies (Cerebras, Twitter).
+A breaker watches the outcome of the last `window_size` calls to its upstream;
+a call counts as failed when it errors or takes longer than `slow_call_seconds`.
+Once at least `min_calls` have been seen and the failed share reaches
+`failure_rate`, the breaker opens: callers skip the upstream immediately
+instead of waiting out its timeout. After `open_seconds` it goes half-open and
+lets `half_open_calls` trial calls through; if they all succeed it closes,
+and any failure reopens it. allow() hands each admitted call a Permit that it
+returns to record(); only permits issued as trials of the current half-open
+period decide it, so a slow call admitted before the trip cannot close the
+breaker without a real probe.
+"""
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+# Numeric encoding for the state gauge.
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class Permit:
+    """An admitted call; `trial` is the half-open period it probes, None for an ordinary call."""
+    __slots__ = ('trial',)
+
+    def __init__(self, trial: int = None):
+        self.trial = trial
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, slow_call_seconds: float = None, window_size: int = BREAKER_WINDOW_SIZE,
+                 min_calls: int = BREAKER_MIN_CALLS, failure_rate: float = BREAKER_FAILURE_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS, half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+                 enabled: bool = BREAKER_ENABLED, clock=time.monotonic):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.enabled = enabled
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=max(1, window_size))
+        self._opened_at = 0.0
+        self._half_open_period = 0
+        self._trials_started = 0
+        self._trials_passed = 0
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def _transition(self, state: str, reason: str = ''):
+        self.state = state
+        if state == OPEN:
+            self._opened_at = self.clock()
+            self.opened += 1
+            logger.warning(f"Circuit breaker '{self.name}' opened ({reason}); skipping it for {self.open_seconds:.0f}s.")
+        elif state == HALF_OPEN:
+            self._half_open_period += 1
+            self._trials_started = self._trials_passed = 0
+            logger.info(f"Circuit breaker '{self.name}' half-open; trying {self.half_open_calls} call(s).")
+        else:
+            self._outcomes.clear()
+            logger.info(f"Circuit breaker '{self.name}' closed; its trial calls succeeded.")
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through (without reserving a half-open trial)."""
+        if not self.enabled or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self._opened_at >= self.open_seconds
+        return self._trials_started < self.half_open_calls
+
+    def allow(self):
+        """Admits one call, returning the Permit it must hand back to record(); None means skip the upstream."""
+        if not self.enabled:
+            return Permit()
+        if self.state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return Permit()
+        if self.state == HALF_OPEN and self._trials_started < self.half_open_calls:
+            self._trials_started += 1
+            return Permit(trial=self._half_open_period)
+        self.rejected += 1
+        return None
+
+    def record(self, permit: Permit, ok: bool, seconds: float):
+        """
+        Reports the outcome of the call admitted with `permit`; calls slower than slow_call_seconds count
+        as failures. While half-open, only this period's trial permits move the breaker.
+        """
+        slow = self.slow_call_seconds is not None and seconds >= self.slow_call_seconds
+        failed = not ok or slow
+        self.slow_calls += slow
+        if failed:
+            self.failures += 1
+        else:
+            self.successes += 1
+        if not self.enabled:
+            return
+        if self.state == HALF_OPEN:
+            if permit.trial != self._half_open_period:
+                return
+            if failed:
+                self._transition(OPEN, f"trial call {'slow' if ok else 'failed'}")
+            else:
+                self._trials_passed += 1
+                if self._trials_passed >= self.half_open_calls:
+                    self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls:
+            rate = sum(self._outcomes) / len(self._outcomes)
+            if rate >= self.failure_rate:
+                self._transition(OPEN, f"{rate:.0%} of the last {len(self._outcomes)} calls failed or were slow")
+
+    def stats(self) -> dict:
+        return {
+            'state': STATE_CODES[self.state],
+            'window_failure_rate': sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0,
+            'successes': self.successes,
+            'failures': self.failures,
+            'slow_calls': self.slow_calls,
+            'rejected': self.rejected,
+            'opened': self.opened,
+        }
+
+
+_breakers = {}
+_SLOW_CALL_SECONDS = {'cerebras': CEREBRAS_BREAKER_SLOW_SECONDS, 'twitter': TWITTER_BREAKER_SLOW_SECONDS}
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    """The process-wide breaker for an upstream, created on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, _SLOW_CALL_SECONDS.get(name))
+    return breaker
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+
+"""
+In-memory caches shared by the enrichment and inference stages.
+TTLCache is a size-bounded LRU map whose entries expire after a TTL.
+AsyncCache layers single-flight coalescing and stale-while-revalidate on top,
+so concurrent callers for the same key share one upstream request and an
+expired entry keeps being served while a background refresh runs.
+SQLiteCacheStore optionally backs an AsyncCache on disk so entries survive restarts.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """LRU map of key -> (value, stored_at); entries older than ttl + stale_ttl are dropped."""
+
+    def __init__(self, ttl: float, max_entries: int, stale_ttl: float = 0.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+
+    def get_entry(self, key):
+        """Returns (value, age_seconds) or None if missing or past the stale window."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, age
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > self.ttl:
+            return default
+        return entry[0]
+
+    def set(self, key, value, age: float = 0.0):
+        self._entries[key] = (value, time.monotonic() - age)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheStore:
+    """Write-through on-disk backing for an AsyncCache. Values must be JSON-serializable."""
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+
+    def get(self, key: str, max_age: float):
+        """Returns (value, age_seconds) if a stored entry is younger than `max_age`, else None."""
+        row = self._db.execute(
+            "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[1]
+        if age > max_age:
+            return None
+        return json.loads(row[0]), age
+
+    def set(self, key: str, value):
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), time.time()),
+        )
+
+    def prune(self, max_age: float) -> int:
+        cursor = self._db.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND stored_at < ?",
+            (self.namespace, time.time() - max_age),
+        )
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
+
+
+class AsyncCache:
+    """TTLCache with single-flight fetches and stale-while-revalidate."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int, stale_ttl: float = 0.0,
+                 store: SQLiteCacheStore = None):
+        self.name = name
+        self.entries = TTLCache(ttl, max_entries, stale_ttl)
+        self.store = store
+        self._in_flight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.disk_hits = 0
+
+    async def get_or_fetch(self, key, fetch):
+        """
+        Returns the cached value for `key`, calling the zero-argument coroutine
+        function `fetch` on a miss. A fetch result of None is returned but not cached.
+        """
+        entry = self.entries.get_entry(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key, self.entries.ttl + self.entries.stale_ttl)
+            if entry is not None:
+                self.disk_hits += 1
+                self.entries.set(key, entry[0], age=entry[1])
+        if entry is not None:
+            value, age = entry
+            if age <= self.entries.ttl:
+                self.hits += 1
+                return value
+            self.stale_hits += 1
+            if key not in self._in_flight:
+                self.refreshes += 1
+                self._start_fetch(key, fetch)
+            return value
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_fetch(key, fetch)
+        return await asyncio.shield(task)
+
+    def _start_fetch(self, key, fetch) -> asyncio.Task:
+        task = asyncio.create_task(self._fetch(key, fetch), name=f"{self.name}-cache-fetch")
+        self._in_flight[key] = task
+        return task
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            if value is not None:
+                self.entries.set(key, value)
+                if self.store is not None:
+                    self.store.set(key, value)
+            return value
+        except Exception as e:
+            logger.error("%s cache fetch failed for %r: %s", self.name, key, e)
+            return None
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'disk_hits': self.disk_hits,
+            'hit_rate': (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+from config import WORKER_PROCESSES, ALERT_QUEUE_SIZE, ALERT_DRAIN_TIMEOUT_SECONDS
+
+"""
+Multi-process deployment mode (WORKER_PROCESSES > 0).
+The ingest process keeps the WebSocket shards, dedup, journal and batching,
+and hands each alert to one of N analysis worker processes over a bounded
+multiprocessing queue. Routing hashes the symbol, so every alert for a symbol
+lands on the same worker and that worker's tweet and analysis caches stay
+warm. Workers report each alert's outcome back on a shared results queue,
+which the ingest process applies to the journal.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def worker_for(symbol: str, processes: int) -> int:
+    """Stable worker index for a symbol (the same in every process and across restarts)."""
+    return zlib.crc32(symbol.upper().encode()) % processes
+
+
+def _worker_entry(index: int, processes: int, inbox, results):
+    # Ctrl+C reaches the whole process group; the ingest process coordinates shutdown via the sentinel.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import main
+    main.config.setup_logging()
+    asyncio.run(main.run_analysis_worker(index, processes, inbox, results))
+
+
+class WorkerPool:
+    """Spawns the analysis worker processes and routes alerts to them by symbol."""
+
+    def __init__(self, processes: int = WORKER_PROCESSES, queue_size: int = ALERT_QUEUE_SIZE,
+                 on_result=None, target=_worker_entry):
+        self.processes = max(1, processes)
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.target = target
+        self._context = multiprocessing.get_context('spawn')
+        self._inboxes = []
+        self._workers = []
+        self._results = None
+        self._results_task = None
+        self.submitted = [0] * self.processes
+        self.completed = 0
+        self.blocked = 0
+        self.restarts = 0
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=self.target, args=(index, self.processes, self._inboxes[index], self._results),
+            name=f"pulsestreet-worker-{index}", daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self):
+        self._results = self._context.Queue()
+        self._inboxes = [self._context.Queue(maxsize=self.queue_size) for _ in range(self.processes)]
+        self._workers = [self._spawn(index) for index in range(self.processes)]
+        self._results_task = asyncio.create_task(self._drain_results(), name="worker-results")
+        logger.info(f"Started {self.processes} analysis worker processes.")
+
+    async def submit(self, alert) -> bool:
+        """Queues the alert for its symbol's worker, waiting (off the event loop) while that queue is full."""
+        index = worker_for(alert.symbol, self.processes)
+        if not self._workers[index].is_alive():
+            logger.error(f"Analysis worker {index} exited (code {self._workers[index].exitcode}); restarting it.")
+            self.restarts += 1
+            self._workers[index] = self._spawn(index)
+        inbox = self._inboxes[index]
+        try:
+            inbox.put_nowait(alert)
+        except queue.Full:
+            self.blocked += 1
+            await asyncio.to_thread(inbox.put, alert)
+        self.submitted[index] += 1
+        return True
+
+    async def _drain_results(self):
+        while (result := await asyncio.to_thread(self._results.get)) is not None:
+            self.completed += 1
+            if self.on_result:
+                alert, state = result
+                self.on_result(alert, state)
+
+    async def close(self, drain_timeout: float = ALERT_DRAIN_TIMEOUT_SECONDS):
+        """Lets every worker drain its queue, then collects the remaining results."""
+        deadline = time.monotonic() + drain_timeout + 10
+        for index, inbox in enumerate(self._inboxes):
+            try:
+                await asyncio.to_thread(inbox.put, None, True, max(0.1, deadline - time.monotonic()))
+            except queue.Full:
+                logger.warning(f"Analysis worker {index} is not draining its queue.")
+        for index, process in enumerate(self._workers):
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Analysis worker {index} did not stop within {drain_timeout}s; terminating it.")
+                process.terminate()
+                await asyncio.to_thread(process.join)
+        if self._results_task is not None:
+            self._results.put(None)
+            await self._results_task
+        logger.info(f"Worker pool stats: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {
+            'processes': self.processes,
+            'alive': sum(process.is_alive() for process in self._workers),
+            'submitted': sum(self.submitted),
+            'completed': self.completed,
+            'blocked': self.blocked,
+            'restarts': self.restarts,
+        }
@@ -6,12 +6,15 @@ load_dotenv(dotenv_path)
 
 """
 Main configuration file for the application.
+Importing it only reads settings: logging is installed by setup_logging() from
+the entry points, and IS_CONFIG_VALID is computed (and its problems logged) on
+first access.
 """
 
 # --- Basic Logging Setup ---
 LOG_LEVEL_STR = os.getenv('LOG_LEVEL', 'INFO').upper()
 LOG_LEVEL = getattr(logging, LOG_LEVEL_STR, logging.INFO)
-logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
 logger = logging.getLogger(__name__) 
 
 # --- API Keys & Tokens ---
@@ -20,6 +23,7 @@ TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN')
 CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_ROUTES = os.getenv('TELEGRAM_ROUTES')
 
 # --- Whale Alert Config ---
 WHALE_SUBSCRIPTION_MSG = {
@@ -28,23 +32,133 @@ WHALE_SUBSCRIPTION_MSG = {
     "symbols": ["eth", "btc"],
     "min_value_usd": 10_000,
 }
-WHALE_ALERT_WSS_URL = f"wss://leviathan.whale-alert.io/ws?api_key={WHALE_ALERT_API_KEY}" if WHALE_ALERT_API_KEY else None
+WHALE_SUBSCRIPTIONS = os.getenv('WHALE_SUBSCRIPTIONS')
+WHALE_ALERT_WSS_BASE_URL = os.getenv('WHALE_ALERT_WSS_BASE_URL', 'wss://leviathan.whale-alert.io/ws')
+WHALE_ALERT_WSS_URL = f"{WHALE_ALERT_WSS_BASE_URL}?api_key={WHALE_ALERT_API_KEY}" if WHALE_ALERT_API_KEY else None
+WHALE_ALERT_REST_BASE_URL = os.getenv('WHALE_ALERT_REST_BASE_URL', 'https://api.whale-alert.io').rstrip('/')
+WHALE_ALERT_BACKFILL = os.getenv('WHALE_ALERT_BACKFILL', 'true').lower() in ('1', 'true', 'yes')
+WHALE_ALERT_BACKFILL_MAX_SECONDS = float(os.getenv('WHALE_ALERT_BACKFILL_MAX_SECONDS', '3600'))
+WHALE_ALERT_REST_TIMEOUT_SECONDS = float(os.getenv('WHALE_ALERT_REST_TIMEOUT_SECONDS', '10'))
+DEDUP_WINDOW_SECONDS = float(os.getenv('DEDUP_WINDOW_SECONDS', '3600'))
+DEDUP_BACKEND = os.getenv('DEDUP_BACKEND', 'sets').lower()
+if DEDUP_BACKEND not in ('sets', 'bloom'):
+    logger.warning(f"DEDUP_BACKEND ({DEDUP_BACKEND}) is not 'sets' or 'bloom'. Using sets.")
+    DEDUP_BACKEND = 'sets'
+DEDUP_BLOOM_CAPACITY = int(os.getenv('DEDUP_BLOOM_CAPACITY', '100000'))
+DEDUP_BLOOM_ERROR_RATE = float(os.getenv('DEDUP_BLOOM_ERROR_RATE', '0.0001'))
 
 # --- Twitter Config ---
+TWITTER_API_BASE_URL = os.getenv('TWITTER_API_BASE_URL', 'https://api.twitter.com').rstrip('/')
 TWITTER_MAX_RESULTS = int(os.getenv('TWITTER_MAX_RESULTS', '10')) 
 if TWITTER_MAX_RESULTS < 10:
     logger.warning(f"TWITTER_MAX_RESULTS ({TWITTER_MAX_RESULTS}) is less than 10. Setting to 10 as required by Twitter API.")
     TWITTER_MAX_RESULTS = 10
+TWITTER_CACHE_TTL_SECONDS = float(os.getenv('TWITTER_CACHE_TTL_SECONDS', '60'))
+TWITTER_CACHE_STALE_SECONDS = float(os.getenv('TWITTER_CACHE_STALE_SECONDS', '240'))
+TWITTER_CACHE_MAX_ENTRIES = int(os.getenv('TWITTER_CACHE_MAX_ENTRIES', '128'))
+TWITTER_PREFETCH = os.getenv('TWITTER_PREFETCH', 'true').lower() in ('1', 'true', 'yes')
+TWITTER_POLL_INTERVAL_SECONDS = float(os.getenv('TWITTER_POLL_INTERVAL_SECONDS', '60'))
+TWITTER_RATE_LIMIT_REQUESTS = int(os.getenv('TWITTER_RATE_LIMIT_REQUESTS', '60'))
+TWITTER_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv('TWITTER_RATE_LIMIT_WINDOW_SECONDS', '900'))
+TWITTER_WINDOW_SIZE = int(os.getenv('TWITTER_WINDOW_SIZE', '50'))
+TWITTER_TIMEOUT_SECONDS = float(os.getenv('TWITTER_TIMEOUT_SECONDS', '10'))
 
 # --- Cerebras Config ---
 CEREBRAS_MODEL_ID = os.getenv('CEREBRAS_MODEL_ID')
+CEREBRAS_BASE_URL = os.getenv('CEREBRAS_BASE_URL')
 LLAMA_MAX_TOKENS = int(os.getenv('LLAMA_MAX_TOKENS', '60')) 
+LLAMA_BACKEND = os.getenv('LLAMA_BACKEND', 'async').lower()
+if LLAMA_BACKEND not in ('async', 'sync'):
+    logger.warning(f"LLAMA_BACKEND ({LLAMA_BACKEND}) is not 'async' or 'sync'. Using async.")
+    LLAMA_BACKEND = 'async'
+LLAMA_MAX_CONCURRENCY = int(os.getenv('LLAMA_MAX_CONCURRENCY', '4'))
+LLAMA_TIMEOUT_SECONDS = float(os.getenv('LLAMA_TIMEOUT_SECONDS', '30'))
+LLAMA_CACHE_TTL_SECONDS = float(os.getenv('LLAMA_CACHE_TTL_SECONDS', '300'))
+LLAMA_CACHE_MAX_ENTRIES = int(os.getenv('LLAMA_CACHE_MAX_ENTRIES', '1024'))
+LLAMA_CACHE_DB = os.getenv('LLAMA_CACHE_DB')
+LLAMA_CACHE_VALUE_BUCKETS_PER_DECADE = int(os.getenv('LLAMA_CACHE_VALUE_BUCKETS_PER_DECADE', '4'))
 
 # --- Telegram Config ---
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org').rstrip('/')
 TELEGRAM_TIMEOUT_SECONDS = int(os.getenv('TELEGRAM_TIMEOUT_SECONDS', '10')) 
+TELEGRAM_GLOBAL_RATE_PER_SECOND = float(os.getenv('TELEGRAM_GLOBAL_RATE_PER_SECOND', '30'))
+TELEGRAM_CHAT_RATE_PER_MINUTE = float(os.getenv('TELEGRAM_CHAT_RATE_PER_MINUTE', '20'))
+TELEGRAM_CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', '5'))
+TELEGRAM_SENDER_CONCURRENCY = int(os.getenv('TELEGRAM_SENDER_CONCURRENCY', '8'))
+TELEGRAM_STREAM_ANALYSIS = os.getenv('TELEGRAM_STREAM_ANALYSIS', 'false').lower() in ('1', 'true', 'yes')
+TELEGRAM_EDIT_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_EDIT_INTERVAL_SECONDS', '3'))
 
 # --- General Config ---
-RECONNECT_DELAY_SECONDS = int(os.getenv('RECONNECT_DELAY_SECONDS', '300')) 
+RECONNECT_INITIAL_DELAY_SECONDS = float(os.getenv('RECONNECT_INITIAL_DELAY_SECONDS', '0.5'))
+RECONNECT_DELAY_SECONDS = float(os.getenv('RECONNECT_DELAY_SECONDS', '60'))
+WS_PING_INTERVAL_SECONDS = float(os.getenv('WS_PING_INTERVAL_SECONDS', '15'))
+WS_PING_TIMEOUT_SECONDS = float(os.getenv('WS_PING_TIMEOUT_SECONDS', '10'))
+
+# --- HTTP Connection Pool Config ---
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '10'))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('HTTP_KEEPALIVE_EXPIRY_SECONDS', '60'))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', '5'))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv('HTTP_READ_TIMEOUT_SECONDS', '30'))
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv('HTTP_POOL_TIMEOUT_SECONDS', '10'))
+
+# --- Circuit Breaker Config ---
+BREAKER_ENABLED = os.getenv('BREAKER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+BREAKER_WINDOW_SIZE = int(os.getenv('BREAKER_WINDOW_SIZE', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '5'))
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '30'))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv('BREAKER_HALF_OPEN_CALLS', '2'))
+CEREBRAS_BREAKER_SLOW_SECONDS = float(os.getenv('CEREBRAS_BREAKER_SLOW_SECONDS', '10'))
+TWITTER_BREAKER_SLOW_SECONDS = float(os.getenv('TWITTER_BREAKER_SLOW_SECONDS', '5'))
+
+# --- Dispatcher Config ---
+ALERT_WORKERS = int(os.getenv('ALERT_WORKERS', '4'))
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '0'))
+ALERT_QUEUE_SIZE = int(os.getenv('ALERT_QUEUE_SIZE', '100'))
+ALERT_OVERFLOW_POLICY = os.getenv('ALERT_OVERFLOW_POLICY', 'drop_oldest').lower()
+if ALERT_OVERFLOW_POLICY not in ('drop_oldest', 'drop_lowest_value', 'block'):
+    logger.warning(f"ALERT_OVERFLOW_POLICY ({ALERT_OVERFLOW_POLICY}) is not one of drop_oldest, drop_lowest_value, block. Using drop_oldest.")
+    ALERT_OVERFLOW_POLICY = 'drop_oldest'
+ALERT_DRAIN_TIMEOUT_SECONDS = float(os.getenv('ALERT_DRAIN_TIMEOUT_SECONDS', '30'))
+ALERT_BATCH_WINDOW_SECONDS = float(os.getenv('ALERT_BATCH_WINDOW_SECONDS', '2'))
+ALERT_BATCH_MAX_SIZE = int(os.getenv('ALERT_BATCH_MAX_SIZE', '10'))
+ALERT_LATENCY_BUDGET_SECONDS = float(os.getenv('ALERT_LATENCY_BUDGET_SECONDS', '20'))
+ENRICHMENT_TIMEOUT_SECONDS = float(os.getenv('ENRICHMENT_TIMEOUT_SECONDS', '3'))
+ALERT_JOURNAL_PATH = os.getenv('ALERT_JOURNAL_PATH')
+ALERT_JOURNAL_FLUSH_SECONDS = float(os.getenv('ALERT_JOURNAL_FLUSH_SECONDS', '0.5'))
+ALERT_JOURNAL_RETENTION_HOURS = float(os.getenv('ALERT_JOURNAL_RETENTION_HOURS', '24'))
+ALERT_JOURNAL_PRUNE_INTERVAL_SECONDS = float(os.getenv('ALERT_JOURNAL_PRUNE_INTERVAL_SECONDS', '600'))
+
+# --- Pre-scoring Config ---
+PRESCORE_ENABLED = os.getenv('PRESCORE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PRESCORE_LLM_THRESHOLD = float(os.getenv('PRESCORE_LLM_THRESHOLD', '0.55'))
+PRESCORE_TEMPLATE_THRESHOLD = float(os.getenv('PRESCORE_TEMPLATE_THRESHOLD', '0.3'))
+if PRESCORE_TEMPLATE_THRESHOLD > PRESCORE_LLM_THRESHOLD:
+    logger.warning(f"PRESCORE_TEMPLATE_THRESHOLD ({PRESCORE_TEMPLATE_THRESHOLD}) is above PRESCORE_LLM_THRESHOLD. Using {PRESCORE_LLM_THRESHOLD}.")
+    PRESCORE_TEMPLATE_THRESHOLD = PRESCORE_LLM_THRESHOLD
+PRESCORE_HISTORY_SIZE = int(os.getenv('PRESCORE_HISTORY_SIZE', '500'))
+PRESCORE_MIN_HISTORY = int(os.getenv('PRESCORE_MIN_HISTORY', '20'))
+PRESCORE_BURST_WINDOW_SECONDS = float(os.getenv('PRESCORE_BURST_WINDOW_SECONDS', '300'))
+PRESCORE_BURST_SATURATION = int(os.getenv('PRESCORE_BURST_SATURATION', '10'))
+PRESCORE_VALUE_WEIGHT = float(os.getenv('PRESCORE_VALUE_WEIGHT', '0.5'))
+PRESCORE_FLOW_WEIGHT = float(os.getenv('PRESCORE_FLOW_WEIGHT', '0.3'))
+PRESCORE_BURST_WEIGHT = float(os.getenv('PRESCORE_BURST_WEIGHT', '0.2'))
+
+# --- Digest Config ---
+DIGEST_ENABLED = os.getenv('DIGEST_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+DIGEST_WINDOWS_SECONDS = tuple(float(w) for w in os.getenv('DIGEST_WINDOWS_SECONDS', '900,3600').split(',') if w.strip())
+DIGEST_INTERVAL_SECONDS = float(os.getenv('DIGEST_INTERVAL_SECONDS', '900'))
+DIGEST_BUCKETS = int(os.getenv('DIGEST_BUCKETS', '60'))
+DIGEST_MAX_OWNERS_PER_BUCKET = int(os.getenv('DIGEST_MAX_OWNERS_PER_BUCKET', '32'))
+DIGEST_TOP_OWNERS = int(os.getenv('DIGEST_TOP_OWNERS', '3'))
+DIGEST_LLM_SUMMARY = os.getenv('DIGEST_LLM_SUMMARY', 'true').lower() in ('1', 'true', 'yes')
+DIGEST_CHAT_ID = os.getenv('DIGEST_CHAT_ID') or TELEGRAM_CHAT_ID
+
+# --- Metrics Config ---
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
 
 # --- Validation Function ---
 def validate_config():
@@ -54,12 +168,15 @@ def validate_config():
         "CEREBRAS_API_TOKEN": CEREBRAS_API_KEY,
         "CEREBRAS_MODEL_ID": CEREBRAS_MODEL_ID, 
         "TELEGRAM_BOT_TOKEN": TELEGRAM_BOT_TOKEN,
-        "TELEGRAM_CHAT_ID": TELEGRAM_CHAT_ID,
+        "TELEGRAM_CHAT_ID or TELEGRAM_ROUTES": TELEGRAM_CHAT_ID or TELEGRAM_ROUTES,
     }
     missing = [k for k, v in essential_vars.items() if not v]
     if missing:
         logger.critical(f"CRITICAL ERROR: Missing essential config variables: {', '.join(missing)}")
         return False
+    if DIGEST_ENABLED and not DIGEST_CHAT_ID:
+        logger.critical("CRITICAL ERROR: DIGEST_ENABLED needs DIGEST_CHAT_ID (or TELEGRAM_CHAT_ID) to send the digest to.")
+        return False
     if not WHALE_ALERT_WSS_URL:
         logger.critical("CRITICAL ERROR: WHALE_ALERT_WSS_URL could not be constructed (WHALE_ALERT_API_KEY missing?).")
         return False
@@ -67,9 +184,19 @@ def validate_config():
          logger.warning("Optional config 'TWITTER_BEARER_TOKEN' not set. Twitter context will be skipped.")
     return True
 
-IS_CONFIG_VALID = validate_config()
+def __getattr__(name):
+    # PEP 562: validation (and its log output) runs on first use of IS_CONFIG_VALID, not at import.
+    if name == 'IS_CONFIG_VALID':
+        value = globals()['IS_CONFIG_VALID'] = validate_config()
+        logger.debug(f"Config Loaded: Whale WSS URL set = {bool(WHALE_ALERT_WSS_URL)}, Sub Msg = {WHALE_SUBSCRIPTION_MSG}")
+        logger.debug(f"Config Loaded: Twitter Token set = {bool(TWITTER_BEARER_TOKEN)}, Max Results = {TWITTER_MAX_RESULTS}")
+        logger.debug(f"Config Loaded: Cerebras key set = {bool(CEREBRAS_API_KEY)}, Model ID = {CEREBRAS_MODEL_ID}")
+        logger.debug(f"Config Loaded: Telegram Token set = {bool(TELEGRAM_BOT_TOKEN)}, Chat ID = {TELEGRAM_CHAT_ID}")
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-logger.debug(f"Config Loaded: Whale WSS URL set = {bool(WHALE_ALERT_WSS_URL)}, Sub Msg = {WHALE_SUBSCRIPTION_MSG}")
-logger.debug(f"Config Loaded: Twitter Token set = {bool(TWITTER_BEARER_TOKEN)}, Max Results = {TWITTER_MAX_RESULTS}")
-logger.debug(f"Config Loaded: Cerebras key set = {bool(CEREBRAS_API_KEY)}, Model ID = {CEREBRAS_MODEL_ID}")
-logger.debug(f"Config Loaded: Telegram Token set = {bool(TELEGRAM_BOT_TOKEN)}, Chat ID = {TELEGRAM_CHAT_ID}")
\ No newline at end of file
+def setup_logging():
+    """Installs the root log handler (LOG_LEVEL, LOG_FORMAT); called once by each entry point."""
+    from log_context import configure_logging
+    configure_logging(LOG_LEVEL, LOG_FORMAT)
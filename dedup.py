@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import math
+import time
+from config import DEDUP_WINDOW_SECONDS, DEDUP_BACKEND, DEDUP_BLOOM_CAPACITY, DEDUP_BLOOM_ERROR_RATE
+
+"""
+Time-bounded deduplication of whale transactions across connections,
+subscription shards and reconnect backfills.
+An alert is identified by a 64-bit digest of its alert_key, the same transfer
+identity the alert journal uses, so both agree on what a duplicate is. The key
+leaves out fields the stream and REST backfill report differently (owner
+attribution, USD value, hash case). Digests live in two
+generations that rotate every `window` seconds, so a key is remembered for
+between one and two windows and memory stays flat however long the process
+runs. The 'sets' backend is exact; the 'bloom' backend keeps each generation
+in a fixed-size Bloom filter, trading a small false-positive rate (a genuine
+alert dropped as a duplicate) for a few bits per key.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def alert_key(alert) -> str:
+    """Stable identity of a single transfer: the transaction hash when known, else symbol, amount and time."""
+    if alert.tx_hash:
+        return f"{alert.blockchain}:{alert.tx_hash.lower()}:{alert.symbol}"
+    return "sha1:" + hashlib.sha1(repr((alert.symbol, alert.amount, alert.timestamp)).encode()).hexdigest()
+
+
+def dedup_key(alert) -> int:
+    """64-bit digest of the alert's alert_key."""
+    return int.from_bytes(hashlib.blake2b(alert_key(alert).encode(), digest_size=8).digest(), 'little')
+
+
+class RotatingKeySet:
+    """Exact membership over the last one to two windows, as two generations of int sets."""
+
+    def __init__(self, window: float, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.rotations = 0
+        self._current = set()
+        self._previous = set()
+        self._rotated_at = clock()
+
+    def _rotate_if_due(self):
+        now = self.clock()
+        elapsed = now - self._rotated_at
+        if elapsed >= self.window:
+            self._previous = self._current if elapsed < 2 * self.window else set()
+            self._current = set()
+            self._rotated_at = now
+            self.rotations += 1
+
+    def add(self, key: int) -> bool:
+        """Records `key`; False if it was seen within the window."""
+        self._rotate_if_due()
+        if key in self._current or key in self._previous:
+            return False
+        self._current.add(key)
+        return True
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+
+class _BloomGeneration:
+    __slots__ = ('bits', 'count')
+
+    def __init__(self, size_bytes: int):
+        self.bits = bytearray(size_bytes)
+        self.count = 0
+
+
+class RotatingBloomFilter:
+    """
+    Two generations of Bloom filters sized for `capacity` keys each at `error_rate`.
+    A generation that fills up before its window ends rotates early so the false-positive
+    rate stays bounded (shortening the window instead).
+    """
+
+    def __init__(self, window: float, capacity: int, error_rate: float, clock=time.monotonic):
+        self.window = window
+        self.capacity = max(1, capacity)
+        self.clock = clock
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.rotations = 0
+        self.early_rotations = 0
+        self._size_bytes = (self.num_bits + 7) // 8
+        self._current = _BloomGeneration(self._size_bytes)
+        self._previous = _BloomGeneration(self._size_bytes)
+        self._rotated_at = clock()
+
+    def _rotate(self, keep_previous: bool):
+        self._previous = self._current if keep_previous else _BloomGeneration(self._size_bytes)
+        self._current = _BloomGeneration(self._size_bytes)
+        self.rotations += 1
+
+    def _positions(self, key: int) -> list:
+        # Kirsch-Mitzenmacher double hashing over the two 32-bit halves of the key.
+        low, high = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(low + i * high) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _contains(generation: _BloomGeneration, positions: list) -> bool:
+        bits = generation.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, key: int) -> bool:
+        """Records `key`; False if it was (probably) seen within the window."""
+        now = self.clock()
+        elapsed = now - self._rotated_at
+        if elapsed >= self.window:
+            self._rotate(keep_previous=elapsed < 2 * self.window)
+            self._rotated_at = now
+        elif self._current.count >= self.capacity:
+            self._rotate(keep_previous=True)
+            self._rotated_at = now
+            self.early_rotations += 1
+            logger.warning(f"Dedup Bloom filter reached {self.capacity} keys after {elapsed:.0f}s; rotated early "
+                           f"(raise DEDUP_BLOOM_CAPACITY to keep the full {self.window:.0f}s window).")
+        positions = self._positions(key)
+        if self._contains(self._current, positions) or self._contains(self._previous, positions):
+            return False
+        bits = self._current.bits
+        for p in positions:
+            bits[p >> 3] |= 1 << (p & 7)
+        self._current.count += 1
+        return True
+
+    def __len__(self):
+        return self._current.count + self._previous.count
+
+
+class DedupIndex:
+    """Shared duplicate check placed in front of processing; `add(alert)` is False for repeats."""
+
+    def __init__(self, window: float = DEDUP_WINDOW_SECONDS, backend: str = DEDUP_BACKEND,
+                 capacity: int = DEDUP_BLOOM_CAPACITY, error_rate: float = DEDUP_BLOOM_ERROR_RATE,
+                 clock=time.monotonic):
+        self.backend = backend
+        if backend == 'bloom':
+            self.keys = RotatingBloomFilter(window, capacity, error_rate, clock)
+        else:
+            self.keys = RotatingKeySet(window, clock)
+        self.checked = 0
+        self.duplicates = 0
+
+    def add(self, alert) -> bool:
+        self.checked += 1
+        if self.keys.add(dedup_key(alert)):
+            return True
+        self.duplicates += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.backend,
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'entries': len(self.keys),
+            'rotations': self.keys.rotations,
+        }
@@ -0,0 +1,200 @@
+import heapq
+import logging
+import time
+from array import array
+from config import DIGEST_WINDOWS_SECONDS, DIGEST_BUCKETS, DIGEST_MAX_OWNERS_PER_BUCKET, DIGEST_TOP_OWNERS
+from scoring import flow_direction
+
+"""
+Rolling per-symbol aggregates for the periodic digest ("last N minutes").
+Each (symbol, window) pair keeps a ring of DIGEST_BUCKETS time slots in
+fixed-size arrays (transfer count, exchange inflow and outflow, volume,
+largest transfer) plus window-wide running totals. An alert updates one slot
+and the totals in O(1); a slot that has aged out of the window is subtracted
+from the totals and reused, so nothing is ever rescanned and memory is
+constant however long the process runs. Owner volumes are kept per slot,
+bounded to DIGEST_MAX_OWNERS_PER_BUCKET, for the window's top owners.
+Alerts are bucketed by arrival time, so a digest covers what the alerter
+received in the last N minutes.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class RollingAggregate:
+    """Aggregates over the last `window` seconds, in `buckets` ring slots."""
+
+    def __init__(self, window: float, buckets: int = DIGEST_BUCKETS, max_owners: int = DIGEST_MAX_OWNERS_PER_BUCKET):
+        self.window = window
+        self.buckets = max(1, buckets)
+        self.bucket_seconds = window / self.buckets
+        self.max_owners = max_owners
+        self._epochs = array('q', [-1] * self.buckets)
+        self._counts = array('q', [0] * self.buckets)
+        self._inflow = array('d', [0.0] * self.buckets)
+        self._outflow = array('d', [0.0] * self.buckets)
+        self._volume = array('d', [0.0] * self.buckets)
+        self._largest_value = array('d', [0.0] * self.buckets)
+        self._largest = [None] * self.buckets
+        self._owners = [None] * self.buckets
+        self.count = 0
+        self.inflow_usd = 0.0
+        self.outflow_usd = 0.0
+        self.volume_usd = 0.0
+        # owner -> [usd, slots holding it]
+        self._owner_totals = {}
+
+    def _evict(self, index: int):
+        if self._counts[index]:
+            self.count -= self._counts[index]
+            self.inflow_usd -= self._inflow[index]
+            self.outflow_usd -= self._outflow[index]
+            self.volume_usd -= self._volume[index]
+            if self.count == 0:
+                # Drop accumulated float error once the window is empty.
+                self.inflow_usd = self.outflow_usd = self.volume_usd = 0.0
+        for owner, usd in (self._owners[index] or {}).items():
+            total = self._owner_totals[owner]
+            total[0] -= usd
+            total[1] -= 1
+            if total[1] == 0:
+                del self._owner_totals[owner]
+        self._counts[index] = 0
+        self._inflow[index] = self._outflow[index] = self._volume[index] = self._largest_value[index] = 0.0
+        self._largest[index] = None
+        self._owners[index] = None
+        self._epochs[index] = -1
+
+    def _slot(self, now: float) -> int:
+        epoch = int(now // self.bucket_seconds)
+        index = epoch % self.buckets
+        # A slot from a later epoch (the wall clock stepped back) is kept and added to.
+        if self._epochs[index] < epoch:
+            self._evict(index)
+            self._epochs[index] = epoch
+        return index
+
+    def expire(self, now: float):
+        """Evicts slots that have aged out of the window (O(buckets), done once per snapshot)."""
+        oldest = int(now // self.bucket_seconds) - self.buckets
+        for index in range(self.buckets):
+            if 0 <= self._epochs[index] <= oldest:
+                self._evict(index)
+
+    def add(self, alert, now: float):
+        index = self._slot(now)
+        value = float(alert.value_usd or 0.0)
+        self._counts[index] += 1
+        self.count += 1
+        self._volume[index] += value
+        self.volume_usd += value
+        direction = flow_direction(alert)
+        if direction == 'inflow':
+            self._inflow[index] += value
+            self.inflow_usd += value
+        elif direction == 'outflow':
+            self._outflow[index] += value
+            self.outflow_usd += value
+        if value > self._largest_value[index]:
+            self._largest_value[index] = value
+            self._largest[index] = (value, alert.amount, alert.from_owner, alert.to_owner)
+        owners = self._owners[index]
+        if owners is None:
+            owners = self._owners[index] = {}
+        for owner, owner_type in {(alert.from_owner, alert.from_owner_type), (alert.to_owner, alert.to_owner_type)}:
+            # Unattributed wallets are not owners worth ranking.
+            if not owner or owner_type == 'unknown':
+                continue
+            if owner not in owners:
+                if len(owners) >= self.max_owners:
+                    continue
+                owners[owner] = 0.0
+                total = self._owner_totals.setdefault(owner, [0.0, 0])
+                total[1] += 1
+            owners[owner] += value
+            self._owner_totals[owner][0] += value
+
+    def snapshot(self, now: float, top_owners: int = DIGEST_TOP_OWNERS) -> dict:
+        self.expire(now)
+        largest = max((entry for entry in self._largest if entry is not None), default=None)
+        return {
+            'window_seconds': self.window,
+            'count': self.count,
+            'inflow_usd': max(0.0, self.inflow_usd),
+            'outflow_usd': max(0.0, self.outflow_usd),
+            'volume_usd': max(0.0, self.volume_usd),
+            'largest': largest,
+            'top_owners': heapq.nlargest(top_owners, ((owner, total[0]) for owner, total in self._owner_totals.items()),
+                                         key=lambda item: item[1]),
+        }
+
+
+class DigestAggregator:
+    """One RollingAggregate per subscribed symbol and configured window."""
+
+    def __init__(self, windows: tuple = DIGEST_WINDOWS_SECONDS, buckets: int = DIGEST_BUCKETS,
+                 max_owners: int = DIGEST_MAX_OWNERS_PER_BUCKET, clock=time.time):
+        self.windows = tuple(sorted(windows))
+        self.buckets = buckets
+        self.max_owners = max_owners
+        self.clock = clock
+        self._symbols = {}
+        self.observed = 0
+
+    def add(self, alert):
+        aggregates = self._symbols.get(alert.symbol)
+        if aggregates is None:
+            aggregates = self._symbols[alert.symbol] = [
+                RollingAggregate(window, self.buckets, self.max_owners) for window in self.windows
+            ]
+        now = self.clock()
+        for aggregate in aggregates:
+            aggregate.add(alert, now)
+        self.observed += 1
+
+    async def observe(self, alerts):
+        """Passes an alert stream through unchanged, feeding every alert into the aggregates."""
+        async for alert in alerts:
+            self.add(alert)
+            yield alert
+
+    def snapshot(self) -> dict:
+        """{symbol: [stats per window, shortest first]} for symbols with alerts in any window."""
+        now = self.clock()
+        snapshot = {}
+        for symbol, aggregates in sorted(self._symbols.items()):
+            stats = [aggregate.snapshot(now) for aggregate in aggregates]
+            if any(window['count'] for window in stats):
+                snapshot[symbol] = stats
+        return snapshot
+
+    def stats(self) -> dict:
+        return {'symbols': len(self._symbols), 'observed': self.observed}
+
+
+def _format_window(seconds: float) -> str:
+    return f"{seconds / 3600:g}h" if seconds >= 3600 and seconds % 3600 == 0 else f"{seconds / 60:g}m"
+
+
+def format_digest_sections(snapshot: dict) -> list:
+    """Plain-text digest, one block of lines per symbol (split points for long digests)."""
+    sections = []
+    for symbol, windows in snapshot.items():
+        lines = [f"{symbol}:"]
+        for stats in windows:
+            line = (f"  last {_format_window(stats['window_seconds'])}: {stats['count']} transfers, "
+                    f"${stats['volume_usd']:,.0f} moved, ${stats['inflow_usd']:,.0f} into exchanges, "
+                    f"${stats['outflow_usd']:,.0f} out of exchanges")
+            if stats['largest']:
+                value, amount, from_owner, to_owner = stats['largest']
+                line += f"; largest {float(amount):,.2f} {symbol} (${value:,.0f}) {from_owner} -> {to_owner}"
+            if stats['top_owners']:
+                line += "; top owners " + ", ".join(f"{owner} (${usd:,.0f})" for owner, usd in stats['top_owners'])
+            lines.append(line)
+        sections.append("\n".join(lines))
+    return sections
+
+
+def format_digest(snapshot: dict) -> str:
+    """Plain-text digest body (also used as the LLM summary prompt's data)."""
+    return "\n".join(format_digest_sections(snapshot))
@@ -0,0 +1,176 @@
+import asyncio
+import collections
+import logging
+import time
+from alerts import WhaleAlert
+from log_context import alert_id, new_alert_id
+from config import ALERT_WORKERS, ALERT_QUEUE_SIZE, ALERT_OVERFLOW_POLICY, ALERT_DRAIN_TIMEOUT_SECONDS
+
+"""
+Bounded worker pool between the WebSocket reader and process_alert.
+Alerts are buffered in a fixed-depth asyncio.Queue and consumed by a fixed
+number of workers. When the queue is full the overflow policy decides what
+happens: drop the oldest queued alert, drop the lowest-value alert, or block
+the reader until a worker frees a slot.
+Every alert the dispatcher discards, whether already queued or just submitted,
+is reported to the optional on_drop callback (e.g. to mark it in the journal).
+Each alert is handled under its own correlation ID (log_context.alert_id).
+"""
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_lowest_value", "block")
+
+
+def _alert_value(alert: WhaleAlert) -> float:
+    return alert.value_usd
+
+
+class _AlertQueue(asyncio.Queue):
+    """
+    asyncio.Queue of (enqueued_at, alert) items that can swap its lowest-value alert for a new one.
+    Items live in the queue's own deque, set up through the _init/_put/_get storage hooks, so
+    eviction never touches asyncio.Queue's private state.
+    """
+
+    def _init(self, maxsize):
+        self._items = collections.deque()
+
+    def _put(self, item):
+        self._items.append(item)
+
+    def _get(self):
+        return self._items.popleft()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def lowest(self):
+        return min(self._items, key=lambda item: _alert_value(item[1]))
+
+    def replace(self, old, new):
+        """Evicts queued item `old` and queues `new` in its slot; the depth is unchanged, so no putter wakes."""
+        self._items.remove(old)
+        self.task_done()
+        self.put_nowait(new)
+
+
+class AlertDispatcher:
+    """Feeds alerts to `handler` through a bounded queue and a fixed worker pool."""
+
+    def __init__(self, handler, workers: int = ALERT_WORKERS, queue_size: int = ALERT_QUEUE_SIZE,
+                 overflow_policy: str = ALERT_OVERFLOW_POLICY, on_drop=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}'. Expected one of {OVERFLOW_POLICIES}.")
+        self.handler = handler
+        self.num_workers = max(1, workers)
+        self.overflow_policy = overflow_policy
+        self.on_drop = on_drop
+        self.queue = _AlertQueue(maxsize=max(1, queue_size))
+        self._workers = []
+        self._closing = False
+        self.in_flight = 0
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.dequeued = 0
+        self.queue_wait_total = 0.0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"alert-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(f"Alert dispatcher started: {self.num_workers} workers, queue size {self.queue.maxsize}, "
+                    f"overflow policy '{self.overflow_policy}'.")
+
+    async def submit(self, alert: WhaleAlert) -> bool:
+        """Queues an alert. Returns False if it was rejected or dropped."""
+        if self._closing:
+            logger.warning("Dispatcher is shutting down; rejecting new alert.")
+            if self.on_drop:
+                self.on_drop(alert)
+            return False
+        self.submitted += 1
+        item = (time.monotonic(), alert)
+        if self.queue.full():
+            if self.overflow_policy == "block":
+                await self.queue.put(item)
+            elif self.overflow_policy == "drop_oldest":
+                _, dropped = self.queue.get_nowait()
+                self.queue.task_done()
+                self._record_drop(dropped)
+                self.queue.put_nowait(item)
+            else:
+                lowest = self.queue.lowest()
+                if _alert_value(alert) <= _alert_value(lowest[1]):
+                    self._record_drop(alert)
+                    return False
+                self.queue.replace(lowest, item)
+                self._record_drop(lowest[1])
+        else:
+            self.queue.put_nowait(item)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+    def _record_drop(self, alert: WhaleAlert):
+        self.dropped += 1
+        logger.warning("Alert queue full (%d); dropped %s alert worth $%.0f (policy '%s', total dropped %d).",
+                       self.queue.maxsize, alert.symbol, _alert_value(alert), self.overflow_policy, self.dropped)
+        if self.on_drop:
+            self.on_drop(alert)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            enqueued_at, alert = await self.queue.get()
+            self.dequeued += 1
+            self.queue_wait_total += time.monotonic() - enqueued_at
+            self.in_flight += 1
+            token = alert_id.set(new_alert_id(alert))
+            try:
+                await self.handler(alert)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error("Worker %d failed processing alert: %s", worker_id, e, exc_info=True)
+            finally:
+                alert_id.reset(token)
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def close(self, drain_timeout: float = ALERT_DRAIN_TIMEOUT_SECONDS):
+        """Stops accepting alerts, waits up to `drain_timeout` for queued work, then stops workers."""
+        self._closing = True
+        if self._workers and (self.queue.qsize() or self.in_flight):
+            logger.info(f"Draining alert queue ({self.queue.qsize()} queued, {self.in_flight} in flight)...")
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain timed out after {drain_timeout}s; abandoning {self.queue.qsize()} queued "
+                               f"and {self.in_flight} in-flight alerts.")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Alert dispatcher stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'avg_queue_wait_seconds': self.queue_wait_total / self.dequeued if self.dequeued else 0.0,
+        }
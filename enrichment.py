@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+import httpx
+from alerts import WhaleAlert
+from config import ENRICHMENT_TIMEOUT_SECONDS, TWITTER_BEARER_TOKEN
+from twitter import fetch_recent_tweets
+from breaker import breaker_for
+
+"""
+Context-gathering stage of the alert pipeline.
+Each enrichment source (Twitter today; news, prices, etc. later) implements
+EnrichmentSource. gather_context runs all sources concurrently under one
+deadline, cancels any that overrun it, and returns whatever finished, so
+adding a source never lengthens the critical path beyond the budget. Sources
+report through available() when their upstream is down, and process_alert
+leaves them out.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentSource:
+    """Base class for a context source. Subclasses set `name` and implement `fetch`."""
+
+    name = "source"
+    timeout = None
+
+    async def fetch(self, client: httpx.AsyncClient, whale_data: WhaleAlert):
+        raise NotImplementedError
+
+    def available(self) -> bool:
+        """False while the source's upstream is known to be failing (e.g. its circuit breaker is open)."""
+        return True
+
+    def prompt_section(self, result):
+        """Extra text for the LLaMA prompt, or None if the source has a dedicated slot."""
+        return None
+
+
+class TwitterSource(EnrichmentSource):
+    """Recent tweets for the alert's symbol, from the prefetcher snapshot when one is running."""
+
+    name = "twitter"
+
+    def __init__(self, bearer_token: str, prefetcher=None, timeout: float = None):
+        self.bearer_token = bearer_token
+        self.prefetcher = prefetcher
+        self.timeout = timeout
+
+    async def fetch(self, client: httpx.AsyncClient, whale_data: WhaleAlert):
+        symbol = whale_data.symbol
+        if self.prefetcher:
+            return self.prefetcher.snapshot(symbol)
+        return await fetch_recent_tweets(client, self.bearer_token, f"#{symbol}")
+
+    def available(self) -> bool:
+        # Prefetched snapshots are local, so only direct lookups depend on the breaker.
+        return self.prefetcher is not None or breaker_for('twitter').available()
+
+
+def build_default_sources(prefetcher=None) -> list:
+    """The enrichment sources enabled by the current configuration."""
+    sources = []
+    if TWITTER_BEARER_TOKEN:
+        sources.append(TwitterSource(TWITTER_BEARER_TOKEN, prefetcher))
+    return sources
+
+
+async def _run_source(source: EnrichmentSource, client: httpx.AsyncClient, whale_data: WhaleAlert):
+    start = time.monotonic()
+    if source.timeout:
+        result = await asyncio.wait_for(source.fetch(client, whale_data), timeout=source.timeout)
+    else:
+        result = await source.fetch(client, whale_data)
+    logger.debug("Enrichment source '%s' finished in %.2fs.", source.name, time.monotonic() - start)
+    return result
+
+
+async def gather_context(client: httpx.AsyncClient, whale_data: WhaleAlert, sources: list,
+                         budget: float = ENRICHMENT_TIMEOUT_SECONDS) -> dict:
+    """
+    Runs every source concurrently and returns {source.name: result} for those that
+    completed within `budget` seconds. Slow or failing sources are left out.
+    """
+    if not sources:
+        return {}
+    tasks = {
+        asyncio.create_task(_run_source(source, client, whale_data), name=f"enrich-{source.name}"): source
+        for source in sources
+    }
+    done, pending = await asyncio.wait(tasks, timeout=max(0.0, budget))
+    for task in pending:
+        task.cancel()
+        logger.warning("Enrichment source '%s' exceeded the %.2fs budget; continuing without it.", tasks[task].name, budget)
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    context = {}
+    for task in done:
+        source = tasks[task]
+        if task.exception() is not None:
+            error = task.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                logger.warning("Enrichment source '%s' timed out after %ss.", source.name, source.timeout)
+            else:
+                logger.error("Enrichment source '%s' failed: %s", source.name, error)
+            continue
+        context[source.name] = task.result()
+    return context
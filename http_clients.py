@@ -0,0 +1,201 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import httpx
+from config import (
+    HTTP2_ENABLED, HTTP_MAX_CONNECTIONS_PER_HOST, HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS, HTTP_POOL_TIMEOUT_SECONDS,
+    TWITTER_API_BASE_URL, TWITTER_TIMEOUT_SECONDS,
+    TELEGRAM_API_BASE_URL, TELEGRAM_TIMEOUT_SECONDS, TELEGRAM_SENDER_CONCURRENCY,
+    WHALE_ALERT_REST_BASE_URL, WHALE_ALERT_REST_TIMEOUT_SECONDS,
+)
+
+"""
+Per-host connection pools for the shared httpx.AsyncClient.
+Each upstream (Twitter, Telegram, the Whale Alert REST API) is mounted on its
+own transport with explicit pool limits, keep-alive expiry and timeouts, and
+negotiates HTTP/2 over TLS when the server offers it, so concurrent requests
+multiplex over one connection instead of queueing for a free HTTP/1.1 socket.
+The host's timeouts take precedence over any given per request. Every pool
+counts in-flight requests, peak concurrency, requests that started with the
+pool at its connection limit (and so may have waited to acquire one) and pool
+timeouts, which are exported as metrics. Requests to other hosts use a default
+pool with the same limits.
+"""
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+
+@dataclass(frozen=True)
+class HostConfig:
+    name: str
+    base_url: str
+    read_timeout: float
+    max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST
+    keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY_SECONDS
+    http2: bool = HTTP2_ENABLED
+    warm_connections: int = 1
+
+    @property
+    def origin(self) -> str:
+        parts = urlsplit(self.base_url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS, pool=HTTP_POOL_TIMEOUT_SECONDS)
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+
+def default_hosts() -> list:
+    """The upstreams the pipeline talks to, sized from config."""
+    # Without HTTP/2 each concurrent Telegram send needs its own connection.
+    telegram_connections = max(HTTP_MAX_CONNECTIONS_PER_HOST, TELEGRAM_SENDER_CONCURRENCY)
+    return [
+        HostConfig('twitter', TWITTER_API_BASE_URL, TWITTER_TIMEOUT_SECONDS),
+        HostConfig('telegram', TELEGRAM_API_BASE_URL, TELEGRAM_TIMEOUT_SECONDS, max_connections=telegram_connections,
+                   warm_connections=1 if HTTP2_ENABLED else min(4, TELEGRAM_SENDER_CONCURRENCY)),
+        HostConfig('whale_alert', WHALE_ALERT_REST_BASE_URL, WHALE_ALERT_REST_TIMEOUT_SECONDS),
+    ]
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body that releases its in-flight slot when closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Connection pool for one host, applying its timeouts and recording utilization."""
+
+    def __init__(self, host: HostConfig, transport: httpx.AsyncBaseTransport = None):
+        self.host = host
+        http2 = host.http2 and HTTP2_AVAILABLE
+        self._transport = transport or httpx.AsyncHTTPTransport(http2=http2, limits=host.limits())
+        self._timeout = host.timeout().as_dict()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.saturated = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+        self.http2_responses = 0
+
+    def _release(self):
+        self.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions['timeout'] = self._timeout
+        self.requests += 1
+        if self.in_flight >= self.host.max_connections:
+            self.saturated += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            self.in_flight -= 1
+            if isinstance(e, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+                logger.warning("No %s connection free within %ss (%d in flight, limit %d).",
+                               self.host.name, self._timeout['pool'], self.in_flight + 1, self.host.max_connections)
+            elif isinstance(e, Exception):
+                self.errors += 1
+            raise
+        if response.extensions.get('http_version') == b'HTTP/2':
+            self.http2_responses += 1
+        if response.is_closed:
+            # Body already in memory (nothing left to read from the connection).
+            self._release()
+        else:
+            response.stream = _TrackedStream(response.stream, self._release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def stats(self) -> dict:
+        return {
+            'max_connections': self.host.max_connections,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'utilization': self.in_flight / self.host.max_connections,
+            'requests': self.requests,
+            'saturated': self.saturated,
+            'pool_timeouts': self.pool_timeouts,
+            'errors': self.errors,
+            'http2_responses': self.http2_responses,
+        }
+
+
+class HttpClients:
+    """The shared AsyncClient with one PooledTransport mounted per upstream origin."""
+
+    def __init__(self, hosts: list = None):
+        hosts = default_hosts() if hosts is None else hosts
+        if HTTP2_ENABLED and not HTTP2_AVAILABLE:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1 "
+                           "(pip install 'httpx[http2]').")
+        self.pools = {}
+        mounts = {}
+        for host in hosts:
+            if host.origin in mounts:
+                # Hosts sharing an origin (e.g. every service behind one mock server) share its pool.
+                logger.debug(f"{host.name} shares the {mounts[host.origin].host.name} pool for {host.origin}.")
+                self.pools[host.name] = mounts[host.origin]
+                continue
+            mounts[host.origin] = self.pools[host.name] = PooledTransport(host)
+        default = HostConfig('default', '', HTTP_READ_TIMEOUT_SECONDS)
+        self.client = httpx.AsyncClient(
+            timeout=default.timeout(),
+            mounts=mounts,
+            transport=httpx.AsyncHTTPTransport(http2=HTTP2_ENABLED and HTTP2_AVAILABLE, limits=default.limits()),
+        )
+
+    async def __aenter__(self) -> 'HttpClients':
+        await self.client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.__aexit__(*exc_info)
+
+    async def prewarm(self, names: list):
+        """Opens each named host's warm_connections pooled connections concurrently (HEAD on the base URL)."""
+        pools = {self.pools[name] for name in names if name in self.pools}
+
+        async def warm(pool: PooledTransport):
+            started = time.monotonic()
+            results = await asyncio.gather(
+                *(self.client.head(pool.host.base_url) for _ in range(pool.host.warm_connections)),
+                return_exceptions=True,
+            )
+            failures = [result for result in results if isinstance(result, Exception)]
+            if failures:
+                logger.warning(f"Could not pre-connect to {pool.host.name}: {failures[0]}")
+            else:
+                logger.info(f"{pool.host.name} connection pool warmed ({pool.host.warm_connections} connection(s), "
+                            f"{time.monotonic() - started:.2f}s).")
+
+        await asyncio.gather(*(warm(pool) for pool in pools))
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
@@ -0,0 +1,197 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import sqlite3
+import time
+from alerts import WhaleAlert
+from dedup import alert_key
+from config import ALERT_JOURNAL_FLUSH_SECONDS, ALERT_JOURNAL_RETENTION_HOURS, ALERT_JOURNAL_PRUNE_INTERVAL_SECONDS
+
+"""
+Durable, append-only record of every alert taken off the WebSocket.
+Each alert is stored with its processing state (pending -> done | failed | dropped).
+Writes are buffered in memory and committed in one SQLite (WAL) transaction per
+flush interval, so the firehose costs one fsync per batch rather than per alert.
+On startup, alerts still pending are replayed, and alerts already journaled
+(e.g. resent after a reconnect) are recognised by alert_key and skipped.
+Finished alerts past the retention window are pruned every prune interval,
+in the same off-loop write as a flush.
+"""
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+DROPPED = 'dropped'
+
+
+def alert_keys(alert: WhaleAlert) -> list:
+    """Keys of the transfers behind an alert (one per member for batched alerts)."""
+    return [alert_key(member) for member in alert.batch] if alert.batch else [alert_key(alert)]
+
+
+def _alert_from_dict(data: dict) -> WhaleAlert:
+    batch = data.get('batch')
+    if batch:
+        data = dict(data, batch=[_alert_from_dict(member) for member in batch])
+    return WhaleAlert(**data)
+
+
+class AlertJournal:
+    """SQLite-backed journal of alerts and their processing state, written in batches."""
+
+    def __init__(self, path: str, flush_interval: float = ALERT_JOURNAL_FLUSH_SECONDS,
+                 retention_hours: float = ALERT_JOURNAL_RETENTION_HOURS,
+                 prune_interval: float = ALERT_JOURNAL_PRUNE_INTERVAL_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention_hours * 3600
+        self.prune_interval = prune_interval
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, state TEXT NOT NULL, "
+            "received_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS alerts_state ON alerts (state)")
+        self._seen = set(row[0] for row in self._db.execute("SELECT key FROM alerts"))
+        self.pruned = 0
+        self.prune()
+        self._pruned_at = time.monotonic()
+        self._inserts = []
+        self._updates = []
+        self._flush_task = None
+        self._stopping = None
+        self.recorded = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.max_flush_seconds = 0.0
+
+    def unfinished(self) -> list:
+        """Alerts journaled but never marked finished, oldest first (for replay on startup)."""
+        rows = self._db.execute(
+            "SELECT payload FROM alerts WHERE state = ? ORDER BY received_at", (PENDING,)
+        ).fetchall()
+        return [_alert_from_dict(json.loads(row[0])) for row in rows]
+
+    def record(self, alert: WhaleAlert) -> bool:
+        """Journals a freshly received alert. Returns False if it was already journaled."""
+        key = alert_key(alert)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(key)
+        now = time.time()
+        self._inserts.append((key, json.dumps(dataclasses.asdict(alert)), PENDING, now, now))
+        self.recorded += 1
+        return True
+
+    def mark(self, alert: WhaleAlert, state: str):
+        now = time.time()
+        self._updates.extend((state, now, key) for key in alert_keys(alert))
+
+    def track(self, handler):
+        """Wraps an alert handler so each alert is marked done or failed once it returns."""
+        async def tracked(alert: WhaleAlert):
+            try:
+                result = await handler(alert)
+            except Exception:
+                self.mark(alert, FAILED)
+                raise
+            self.mark(alert, DONE)
+            return result
+        return tracked
+
+    async def filter_new(self, alerts):
+        """Async generator passing through only alerts not journaled before, journaling each one."""
+        async for alert in alerts:
+            if self.record(alert):
+                yield alert
+            else:
+                logger.info("Skipping already journaled %s alert (%s).", alert.symbol, alert_key(alert))
+
+    def start(self):
+        if self._flush_task is None:
+            self._stopping = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="alert-journal-flush")
+            logger.info(f"Alert journal at {self.path} ({len(self._seen)} known alerts, "
+                        f"flushing every {self.flush_interval}s).")
+
+    async def _flush_loop(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Alert journal flush failed: {e}", exc_info=True)
+
+    async def flush(self):
+        prune = time.monotonic() - self._pruned_at >= self.prune_interval
+        if not self._inserts and not self._updates and not prune:
+            return
+        inserts, self._inserts = self._inserts, []
+        updates, self._updates = self._updates, []
+        started = time.monotonic()
+        pruned = await asyncio.to_thread(self._write, inserts, updates, prune)
+        if prune:
+            self._pruned_at = time.monotonic()
+            self._forget(pruned)
+        self.flushes += 1
+        self.max_flush_seconds = max(self.max_flush_seconds, time.monotonic() - started)
+
+    def _write(self, inserts: list, updates: list, prune: bool = False) -> list:
+        """Commits buffered writes (and, with `prune`, deletes expired alerts); returns the pruned keys."""
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO alerts (key, payload, state, received_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                inserts,
+            )
+            self._db.executemany("UPDATE alerts SET state = ?, updated_at = ? WHERE key = ?", updates)
+            return self._delete_expired() if prune else []
+
+    def _delete_expired(self) -> list:
+        cutoff = time.time() - self.retention
+        rows = self._db.execute(
+            "DELETE FROM alerts WHERE state != ? AND received_at < ? RETURNING key", (PENDING, cutoff)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _forget(self, keys: list):
+        self._seen.difference_update(keys)
+        self.pruned += len(keys)
+        if keys:
+            logger.info(f"Pruned {len(keys)} finished alerts from the journal.")
+
+    def prune(self) -> int:
+        """Deletes finished alerts older than the retention window; their keys stop being deduplicated."""
+        keys = self._delete_expired()
+        self._forget(keys)
+        return len(keys)
+
+    async def close(self):
+        """Stops the flush loop after its final flush (an in-progress write is never interrupted)."""
+        if self._flush_task is not None:
+            self._stopping.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        self.prune()
+        self._db.close()
+
+    def stats(self) -> dict:
+        return {
+            'recorded': self.recorded,
+            'duplicates': self.duplicates,
+            'buffered': len(self._inserts) + len(self._updates),
+            'flushes': self.flushes,
+            'pruned': self.pruned,
+            'max_flush_seconds': self.max_flush_seconds,
+        }
@@ -3,40 +3,240 @@ import os
 import time
 import logging
 import asyncio
-from cerebras.cloud.sdk import Cerebras 
-from config import CEREBRAS_API_KEY, CEREBRAS_MODEL_ID, LLAMA_MAX_TOKENS
+import threading
+import hashlib
+import math
+from typing import NamedTuple
+import httpx
+from alerts import WhaleAlert
+from cache import AsyncCache, SQLiteCacheStore
+from http_clients import HostConfig, PooledTransport
+from breaker import breaker_for
+from metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+from config import (
+    CEREBRAS_API_KEY, CEREBRAS_MODEL_ID, CEREBRAS_BASE_URL, LLAMA_MAX_TOKENS,
+    LLAMA_BACKEND, LLAMA_MAX_CONCURRENCY, LLAMA_TIMEOUT_SECONDS,
+    LLAMA_CACHE_TTL_SECONDS, LLAMA_CACHE_MAX_ENTRIES, LLAMA_CACHE_DB, LLAMA_CACHE_VALUE_BUCKETS_PER_DECADE,
+)
 
 """
 Cerebras LLaMA SDK wrapper for completions.
-This module provides functions to format prompts and make synchronous calls to the Cerebras SDK for text generation.
+This module provides functions to format prompts and run completions against the Cerebras SDK.
+Calls go through the SDK's async client over a pooled keep-alive connection by default; the
+synchronous client (run via asyncio.to_thread) is kept as a fallback.
+Analyses are cached by a fingerprint of the prompt inputs (symbol, bucketed USD
+value, owner types, tweet set), optionally persisted to SQLite, so near-identical
+alerts reuse an earlier inference.
 """
 
 logger = logging.getLogger(__name__)
 
-cerebras_client = None
-if CEREBRAS_API_KEY:
+_client_lock = threading.Lock()
+_async_http_client = None
+# PooledTransport for the async client's connections (see http_clients).
+connection_pool = None
+
+
+def init_clients():
+    """
+    Builds the Cerebras SDK clients on first call (later calls are no-ops). The SDK is
+    imported here rather than at module import, and neither client warms its connection
+    synchronously; warm_up() does that from the event loop.
+    """
+    global cerebras_client, async_cerebras_client, _async_http_client, connection_pool
+    if 'cerebras_client' in globals():
+        return
+    with _client_lock:
+        if 'cerebras_client' in globals():
+            return
+        sync_client = async_client = None
+        if CEREBRAS_API_KEY:
+            from cerebras.cloud.sdk import Cerebras, AsyncCerebras, DefaultAsyncHttpxClient
+            try:
+                sync_client = Cerebras(api_key=CEREBRAS_API_KEY, base_url=CEREBRAS_BASE_URL,
+                                       timeout=LLAMA_TIMEOUT_SECONDS, warm_tcp_connection=False)
+                logger.info("Cerebras SDK client initialized.")
+            except Exception as sdk_init_e:
+                logger.critical(f"Failed to initialize Cerebras SDK client: {sdk_init_e}", exc_info=True)
+            if LLAMA_BACKEND == 'async':
+                try:
+                    connection_pool = PooledTransport(HostConfig(
+                        'cerebras', CEREBRAS_BASE_URL or '', LLAMA_TIMEOUT_SECONDS,
+                        max_connections=LLAMA_MAX_CONCURRENCY,
+                    ))
+                    _async_http_client = DefaultAsyncHttpxClient(transport=connection_pool)
+                    async_client = AsyncCerebras(
+                        api_key=CEREBRAS_API_KEY,
+                        base_url=CEREBRAS_BASE_URL,
+                        timeout=LLAMA_TIMEOUT_SECONDS,
+                        warm_tcp_connection=False,
+                        http_client=_async_http_client,
+                    )
+                    logger.info(f"Async Cerebras SDK client initialized (max concurrency {LLAMA_MAX_CONCURRENCY}).")
+                except Exception as sdk_init_e:
+                    logger.error(f"Failed to initialize async Cerebras SDK client, falling back to sync: {sdk_init_e}")
+        else:
+            logger.critical("CEREBRAS_API_KEY environment variable not found.")
+        async_cerebras_client = async_client
+        cerebras_client = sync_client
+
+
+def __getattr__(name):
+    # PEP 562: `llama.cerebras_client` / `llama.async_cerebras_client` build the clients on first access.
+    if name in ('cerebras_client', 'async_cerebras_client'):
+        init_clients()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def warm_up():
+    """
+    Startup phase: builds the clients and opens the analysis cache off the event loop,
+    then opens a pooled connection to the API.
+    """
+    await asyncio.to_thread(init_cache_store)
+    await asyncio.to_thread(init_clients)
+    if _async_http_client is None:
+        return
+    started = time.monotonic()
     try:
-        cerebras_client = Cerebras(api_key=CEREBRAS_API_KEY)
-        logger.info("Cerebras SDK client initialized.")
-    except Exception as sdk_init_e:
-        logger.critical(f"Failed to initialize Cerebras SDK client: {sdk_init_e}", exc_info=True)
-else:
-    logger.critical("CEREBRAS_API_KEY environment variable not found.")
+        await _async_http_client.head(str(async_cerebras_client.base_url))
+        logger.info(f"Cerebras connection warmed in {time.monotonic() - started:.2f}s.")
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not pre-connect to Cerebras: {e}")
+
+
+_semaphores = {}
+
+# Memory-only until init_cache_store() attaches the LLAMA_CACHE_DB store.
+analysis_cache = AsyncCache(
+    "llama-analysis",
+    ttl=LLAMA_CACHE_TTL_SECONDS,
+    max_entries=LLAMA_CACHE_MAX_ENTRIES,
+)
+_cache_store_opened = False
+
+
+def init_cache_store():
+    """
+    Opens (and prunes) the on-disk analysis cache on first call; later calls are no-ops.
+    Kept out of module import because it creates and writes the database.
+    """
+    global _cache_store_opened
+    if _cache_store_opened:
+        return
+    with _client_lock:
+        if _cache_store_opened:
+            return
+        _cache_store_opened = True
+        if not LLAMA_CACHE_DB or LLAMA_CACHE_TTL_SECONDS <= 0:
+            return
+        try:
+            store = SQLiteCacheStore(LLAMA_CACHE_DB, namespace="llama-analysis")
+            store.prune(LLAMA_CACHE_TTL_SECONDS)
+            analysis_cache.store = store
+        except Exception as db_e:
+            logger.error(f"Could not open LLaMA analysis cache at {LLAMA_CACHE_DB}, using memory only: {db_e}")
+
+
+# Analysis text returned while the Cerebras circuit breaker is open.
+CIRCUIT_OPEN_TEXT = "Error: Cerebras circuit breaker open"
+
+
+class InferenceResult(NamedTuple):
+    text: str
+    queue_time: float
+    inference_time: float
+
 
+def _get_semaphore() -> asyncio.Semaphore:
+    """Returns the concurrency limiter for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        _semaphores.clear()
+        semaphore = _semaphores[loop] = asyncio.Semaphore(max(1, LLAMA_MAX_CONCURRENCY))
+    return semaphore
 
-def format_prompt_for_completion(whale_summary: str, tweet_snippets: list, symbol: str) -> str:
+
+def _value_bucket(value_usd: float) -> int:
+    """Log-scale bucket index, LLAMA_CACHE_VALUE_BUCKETS_PER_DECADE buckets per power of ten."""
+    if value_usd <= 0:
+        return -1
+    return math.floor(math.log10(value_usd) * LLAMA_CACHE_VALUE_BUCKETS_PER_DECADE)
+
+
+def analysis_fingerprint(whale_data: WhaleAlert, tweet_snippets: list, extra_context: list = None) -> str:
+    """Canonical cache key for an analysis: alerts with the same key get the same prompt in substance."""
+    content = hashlib.sha1()
+    for text in sorted(tweet_snippets or []):
+        content.update(text.encode())
+        content.update(b'\0')
+    content.update(b'\1')
+    for section in extra_context or []:
+        content.update(section.encode())
+        content.update(b'\0')
+    return "|".join((
+        whale_data.symbol,
+        str(_value_bucket(whale_data.value_usd)),
+        whale_data.from_owner_type,
+        whale_data.to_owner_type,
+        str(len(whale_data.batch or [])),
+        content.hexdigest()[:16],
+    ))
+
+
+def format_prompt_for_completion(whale_summary: str, tweet_snippets: list, symbol: str, extra_context: list = None) -> str:
     """Formats the input data into a single prompt string."""
+    extra = ''.join(f"{section}\n" for section in extra_context or [])
     prompt = f"""
 Analyze potential {symbol} market impact based ONLY on this fresh data:
 Whale Transactions:
 {whale_summary if whale_summary else 'None reported now.'}
 Recent Twitter Mentions ({symbol}):
 {' '.join([f'- "{t}"' for t in tweet_snippets]) if tweet_snippets else 'None relevant found.'}
-Task: Briefly summarize potential short-term (1-4h) impact/sentiment for {symbol} in under 50 words. Focus: concise market sentiment (e.g., Bullish pressure, Bearish risk, Mixed).
-Summary:""" 
+{extra}Task: Briefly summarize potential short-term (1-4h) impact/sentiment for {symbol} in under 50 words. Focus: concise market sentiment (e.g., Bullish pressure, Bearish risk, Mixed).
+Summary:"""
+    return prompt.strip()
+
+
+def format_digest_prompt(digest_text: str) -> str:
+    """Prompt for the one-paragraph summary of a periodic digest."""
+    prompt = f"""
+Summarize the whale activity below for crypto traders based ONLY on this data:
+{digest_text}
+Task: In under 60 words, describe the overall picture across symbols: net exchange flows (inflow suggests selling pressure, outflow accumulation), notable transfers, and a concise sentiment (e.g., Bullish pressure, Bearish risk, Mixed).
+Summary:"""
     return prompt.strip()
 
 
+async def summarize_digest(digest_text: str):
+    """One LLM summary for a digest; None if Cerebras is unavailable or the call fails."""
+    try:
+        result = await run_inference(format_digest_prompt(digest_text))
+    except RuntimeError as e:
+        logger.error(f"Cannot summarize digest: {e}")
+        return None
+    if result.text.startswith("Error:"):
+        logger.warning(f"Digest summary unavailable: {result.text}")
+        return None
+    return result.text.strip()
+
+
+def _extract_completion_text(completion) -> str:
+    """Pulls the generated text out of a completions response."""
+    if completion.choices and len(completion.choices) > 0:
+        completion_text = completion.choices[0].text
+        if completion_text:
+            return completion_text.strip()
+        else:
+             logger.error("Cerebras API completion response text is empty.")
+             return "Error: Received empty completion text"
+    else:
+        logger.error(f"Cerebras API completion response structure unexpected: {completion}")
+        return "Error: Could not parse Cerebras completion structure"
+
+
 def _sync_cerebras_call(prompt_str: str) -> str:
     """Synchronous function using client.completions.create."""
     if not cerebras_client:
@@ -44,47 +244,170 @@ def _sync_cerebras_call(prompt_str: str) -> str:
 
     try:
         completion = cerebras_client.completions.create(
-            prompt=prompt_str, 
+            prompt=prompt_str,
             model=CEREBRAS_MODEL_ID,
-            max_tokens=LLAMA_MAX_TOKENS, 
+            max_tokens=LLAMA_MAX_TOKENS,
             temperature=0.7,
         )
-        if completion.choices and len(completion.choices) > 0:
-            completion_text = completion.choices[0].text
-            if completion_text:
-                return completion_text.strip()
-            else:
-                 logger.error("Cerebras API completion response text is empty.")
-                 return "Error: Received empty completion text"
+        return _extract_completion_text(completion)
+    except Exception as e:
+        logger.error("Error during Cerebras SDK completion call: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+        status_code = getattr(e, 'status_code', None) or getattr(e, 'status', None)
+        UPSTREAM_ERRORS.labels('cerebras', str(status_code or 'exception')).inc()
+        if status_code:
+            return f"Error: Cerebras API Call Failed ({status_code})"
         else:
-            logger.error(f"Cerebras API completion response structure unexpected: {completion}")
-            return "Error: Could not parse Cerebras completion structure"
-    except Exception as e: 
-        logger.error(f"Error during Cerebras SDK completion call: {e}", exc_info=True)
+            raise
+
+
+async def _async_cerebras_call(prompt_str: str) -> str:
+    """Async counterpart of _sync_cerebras_call using the pooled async client."""
+    try:
+        completion = await async_cerebras_client.completions.create(
+            prompt=prompt_str,
+            model=CEREBRAS_MODEL_ID,
+            max_tokens=LLAMA_MAX_TOKENS,
+            temperature=0.7,
+            timeout=LLAMA_TIMEOUT_SECONDS,
+        )
+        return _extract_completion_text(completion)
+    except Exception as e:
+        logger.error("Error during async Cerebras SDK completion call: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
         status_code = getattr(e, 'status_code', None) or getattr(e, 'status', None)
+        UPSTREAM_ERRORS.labels('cerebras', str(status_code or 'exception')).inc()
         if status_code:
             return f"Error: Cerebras API Call Failed ({status_code})"
         else:
-            raise 
+            raise
 
-async def analyze_with_llama(whale_summary: str, tweet_snippets: list, symbol: str):
-    """Analyzes data using Cerebras SDK (completions), handling sync call."""
-    if not cerebras_client:
+
+async def _async_cerebras_stream(prompt_str: str, on_text) -> str:
+    """Streaming variant of _async_cerebras_call; calls on_text(text_so_far) as tokens arrive."""
+    try:
+        stream = await async_cerebras_client.completions.create(
+            prompt=prompt_str,
+            model=CEREBRAS_MODEL_ID,
+            max_tokens=LLAMA_MAX_TOKENS,
+            temperature=0.7,
+            stream=True,
+            timeout=LLAMA_TIMEOUT_SECONDS,
+        )
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].text:
+                parts.append(chunk.choices[0].text)
+                on_text(''.join(parts).strip())
+        completion_text = ''.join(parts).strip()
+        if not completion_text:
+            logger.error("Cerebras API streamed completion text is empty.")
+            return "Error: Received empty completion text"
+        return completion_text
+    except Exception as e:
+        logger.error("Error during streaming Cerebras SDK completion call: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+        status_code = getattr(e, 'status_code', None) or getattr(e, 'status', None)
+        UPSTREAM_ERRORS.labels('cerebras', str(status_code or 'exception')).inc()
+        if status_code:
+            return f"Error: Cerebras API Call Failed ({status_code})"
+        else:
+            raise
+
+
+async def run_inference(prompt_str: str, on_text=None) -> InferenceResult:
+    """
+    Runs one completion under the concurrency limit, timing queueing and inference separately.
+    With `on_text`, the async backend streams tokens and reports the partial text as it grows.
+    """
+    init_clients()
+    if not async_cerebras_client and not cerebras_client:
+        raise RuntimeError("Cerebras SDK client not initialized.")
+    breaker = breaker_for('cerebras')
+    queued_at = time.monotonic()
+    async with _get_semaphore():
+        # Admitted only once a slot is held: a caller cancelled while queued never takes a half-open trial.
+        permit = breaker.allow()
+        if permit is None:
+            logger.debug("Cerebras circuit breaker is open; skipping inference.")
+            return InferenceResult(CIRCUIT_OPEN_TEXT, time.monotonic() - queued_at, 0.0)
+        started_at = time.monotonic()
+        # Cancellation (e.g. by the alert's latency budget) only counts against Cerebras if the call was already slow.
+        ok = True
+        try:
+            if async_cerebras_client and on_text:
+                call = _async_cerebras_stream(prompt_str, on_text)
+            elif async_cerebras_client:
+                call = _async_cerebras_call(prompt_str)
+            else:
+                call = asyncio.to_thread(_sync_cerebras_call, prompt_str)
+            text = await asyncio.wait_for(call, timeout=LLAMA_TIMEOUT_SECONDS)
+            ok = not text.startswith("Error:")
+        except asyncio.TimeoutError:
+            UPSTREAM_ERRORS.labels('cerebras', 'timeout').inc()
+            logger.error(f"Cerebras completion timed out after {LLAMA_TIMEOUT_SECONDS}s.")
+            text = "Error: Cerebras API call timed out"
+            ok = False
+        except Exception:
+            ok = False
+            raise
+        finally:
+            breaker.record(permit, ok, time.monotonic() - started_at)
+        finished_at = time.monotonic()
+    UPSTREAM_SECONDS.labels('cerebras').observe(finished_at - started_at)
+    return InferenceResult(text, started_at - queued_at, finished_at - started_at)
+
+
+async def analyze_with_llama(whale_summary: str, tweet_snippets: list, symbol: str, extra_context: list = None,
+                             cache_key: str = None, on_text=None):
+    """
+    Analyzes data using Cerebras SDK (completions), returning (analysis, inference_time).
+    With a `cache_key` (see analysis_fingerprint), a cached analysis is returned with an
+    inference time of 0.0, and concurrent calls for the same key share one inference.
+    `on_text(text_so_far)` is called as streamed tokens arrive (see run_inference).
+    """
+    if cache_key is None or LLAMA_CACHE_TTL_SECONDS <= 0:
+        return await _analyze_uncached(whale_summary, tweet_snippets, symbol, extra_context, on_text)
+    init_cache_store()
+    outcome = {}
+
+    async def infer():
+        outcome['result'] = await _analyze_uncached(whale_summary, tweet_snippets, symbol, extra_context, on_text)
+        analysis_text = outcome['result'][0]
+        return None if analysis_text.startswith("Error:") else analysis_text
+
+    cached_text = await analysis_cache.get_or_fetch(cache_key, infer)
+    if 'result' in outcome:
+        return outcome['result']
+    if cached_text is None:
+        return "Error: Analysis failed.", 0.0
+    logger.info("Reusing cached LLaMA analysis for %s.", symbol)
+    return cached_text, 0.0
+
+
+async def _analyze_uncached(whale_summary: str, tweet_snippets: list, symbol: str, extra_context: list = None,
+                            on_text=None):
+    init_clients()
+    if not async_cerebras_client and not cerebras_client:
         logger.error("Cerebras SDK client not initialized. Cannot analyze.")
         return "Error: Cerebras client not ready.", 0.0
-    prompt_str = format_prompt_for_completion(whale_summary, tweet_snippets, symbol)
-    logger.info(f"Submitting prompt for {symbol} analysis via Cerebras SDK (completions)...")
+    if not breaker_for('cerebras').available():
+        return CIRCUIT_OPEN_TEXT, 0.0
+    prompt_str = format_prompt_for_completion(whale_summary, tweet_snippets, symbol, extra_context)
+    backend = ('async, streaming' if on_text else 'async') if async_cerebras_client else 'sync'
+    logger.info("Submitting prompt for %s analysis via Cerebras SDK (completions, %s)...", symbol, backend)
     start_time = time.monotonic()
     analysis_text = "Error: Analysis failed."
     inference_time = 0.0
 
     try:
-        analysis_text = await asyncio.to_thread(_sync_cerebras_call, prompt_str)
-        inference_time = time.monotonic() - start_time
-        if analysis_text.startswith("Error:"):
-            logger.error(f"Cerebras analysis failed within sync call: {analysis_text}")
+        result = await run_inference(prompt_str, on_text)
+        analysis_text = result.text
+        inference_time = result.inference_time
+        if analysis_text == CIRCUIT_OPEN_TEXT:
+            logger.info("Skipped %s analysis: the Cerebras circuit breaker is open.", symbol)
+        elif analysis_text.startswith("Error:"):
+            logger.error("Cerebras analysis failed within %s call: %s", backend, analysis_text)
         else:
-            logger.info(f"Cerebras Inference for {symbol} successful in {inference_time:.2f} seconds.")
+            logger.info("Cerebras Inference for %s successful in %.2f seconds (queued %.2fs).",
+                        symbol, inference_time, result.queue_time)
     except RuntimeError as rt_e:
         logger.error(f"Cannot analyze: {rt_e}")
         analysis_text = "Error: Cerebras client initialization failed."
@@ -94,4 +417,4 @@ async def analyze_with_llama(whale_summary: str, tweet_snippets: list, symbol: s
         logger.error(f"Unexpected error during async execution of Cerebras call: {e}", exc_info=True)
         analysis_text = "Error: Unexpected Exception during analysis."
 
-    return analysis_text.strip(), inference_time
\ No newline at end of file
+    return analysis_text.strip(), inference_time
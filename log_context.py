@@ -0,0 +1,93 @@
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+"""
+Logging setup shared by every module.
+Each record carries the correlation ID of the alert being processed (taken
+from a contextvar, so it follows the alert through the tasks it spawns), and
+LOG_FORMAT=json switches to one JSON object per line. In JSON mode records are
+handed to a QueueHandler and written by a QueueListener thread, so stdout or
+disk I/O never blocks the event loop.
+"""
+
+alert_id = contextvars.ContextVar('alert_id', default='-')
+_sequence = itertools.count(1)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(alert_id)s] %(message)s'
+_RESERVED = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'alert_id'}
+
+
+def new_alert_id(alert) -> str:
+    """Short, human-readable correlation ID: symbol plus transaction hash prefix or a sequence number."""
+    tx_hash = getattr(alert, 'tx_hash', None)
+    if tx_hash:
+        return f"{alert.symbol}-{tx_hash.removeprefix('0x')[:10]}"
+    return f"{alert.symbol}-{next(_sequence)}"
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps the current alert's correlation ID onto every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'alert_id'):
+            record.alert_id = alert_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'alert_id': getattr(record, 'alert_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _JsonQueueHandler(logging.handlers.QueueHandler):
+    """Resolves the message and traceback on the calling thread; JSON encoding and I/O happen on the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: int, log_format: str = 'text'):
+    """Installs the root handler: plain text to stderr, or queued JSON lines to stdout."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+    if log_format == 'json':
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        handler = _JsonQueueHandler(log_queue)
+        listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handler.addFilter(CorrelationFilter())
+    root.addHandler(handler)
@@ -1,64 +1,93 @@
 # main.py
 import asyncio
+import contextlib
 import httpx
 import time
 import logging
 import os 
 import config 
-if not config.IS_CONFIG_VALID:
-    logging.critical("Essential configuration is invalid. Exiting.")
-    exit(1)
-from alerts import listen_for_alerts
-from twitter import fetch_recent_tweets
-from llama import analyze_with_llama 
-from telegram_bot import send_telegram_alert
+from alerts import WhaleAlert
+import llama
+from llama import (
+    analyze_with_llama, analysis_fingerprint, analysis_cache, summarize_digest, warm_up as warm_up_llama, CIRCUIT_OPEN_TEXT,
+)
+from telegram_bot import send_telegram_alert, TelegramSender, LiveMessage, TELEGRAM_MAX_MESSAGE_LENGTH
+from http_clients import HttpClients
+from dispatcher import AlertDispatcher
+from batcher import batch_alerts
+from prefetch import TweetPrefetcher
+from enrichment import build_default_sources, gather_context
+from routing import RoutingTable
+from journal import AlertJournal, DONE, FAILED, DROPPED
+from backfill import make_backfill
+from dedup import DedupIndex
+from subscriptions import load_subscriptions, listen_to_shards, subscribed_symbols
+from cluster import WorkerPool, worker_for
+from twitter import tweet_cache
+from breaker import breaker_for
+from scoring import AlertScorer, LLM, TEMPLATE, DIGEST
+from digest import DigestAggregator, format_digest, format_digest_sections
+from metrics import REGISTRY, STAGE_SECONDS, DEGRADED_ALERTS, start_metrics_server, stats_collector
 
 """
 Handles the full workflow for processing a single whale alert:
 1. Formats whale data.
-2. Fetches Twitter context (optional, uses client).
+2. Gathers context from all enrichment sources concurrently (Twitter, optional, uses client).
 3. Analyzes with LLaMA via Cerebras SDK (handled in llama.py).
 4. Sends formatted alert to Telegram (uses client).
+With TELEGRAM_STREAM_ANALYSIS, the whale summary is posted first and the same
+message is edited as the analysis streams in.
 """
 
 logger = logging.getLogger(__name__)
 
-async def process_alert(client: httpx.AsyncClient, whale_data: dict):
-    start_process_time = time.monotonic()
-    symbol = whale_data.get('symbol', 'UNKNOWN')
-    if not symbol or symbol == 'UNKNOWN':
-        logger.warning(f"Skipping processing for alert with missing/unknown symbol: {whale_data}")
-        return
-    logger.info(f"Processing {symbol} alert...")
+CACHE_COUNTERS = ('hits', 'stale_hits', 'misses', 'coalesced', 'refreshes', 'disk_hits')
+BREAKER_COUNTERS = ('successes', 'failures', 'slow_calls', 'rejected', 'opened')
+POOL_COUNTERS = ('requests', 'saturated', 'pool_timeouts', 'errors', 'http2_responses')
+ANALYSIS_PENDING = "_Analysing…_"
+STREAMING_CURSOR = " ▌"
+DEGRADED_NOTES = {'analysis': "LLaMA analysis", 'twitter': "Twitter context"}
+
+
+def format_whale_summary(whale_data: WhaleAlert) -> str:
+    """One line per transfer; batched alerts get a totals line followed by each transfer."""
+    symbol = whale_data.symbol
     try:
-        whale_summary = (
-            f"{float(whale_data['amount']):,.2f} {symbol} (${float(whale_data['value_usd']):,.0f} USD) "
-            f"transferred from '{whale_data.get('from_owner', 'unknown')}' to '{whale_data.get('to_owner', 'unknown')}'."
+        if whale_data.batch:
+            lines = [
+                f"{len(whale_data.batch)} transfers totalling {float(whale_data.amount):,.2f} {symbol} "
+                f"(${float(whale_data.value_usd):,.0f} USD):"
+            ]
+            lines += [f"- {format_whale_summary(alert)}" for alert in whale_data.batch]
+            return "\n".join(lines)
+        return (
+            f"{float(whale_data.amount):,.2f} {symbol} (${float(whale_data.value_usd):,.0f} USD) "
+            f"transferred from '{whale_data.from_owner}' to '{whale_data.to_owner}'."
         )
     except (ValueError, TypeError) as e:
          logger.error(f"Could not format whale summary due to invalid amount/value: {e}. Data: {whale_data}")
-         whale_summary = f"Whale movement detected for {symbol} (details formatting error)."
-    tweets = []
+         return f"Whale movement detected for {symbol} (details formatting error)."
+
+
+def render_alert_message(whale_data: WhaleAlert, whale_summary: str, tweets: list, analysis: str,
+                         inference_time: float, total_latency: float, degraded: list = (), score: float = None) -> str:
+    """
+    Builds the Telegram Markdown message for a processed alert. `tweets` is None while context is pending,
+    and the message carries the whale data alone when `analysis` is None (template-only alerts).
+    `degraded` names the stages skipped because their upstream was unavailable; `score` is the pre-score.
+    """
+    symbol = whale_data.symbol
+    batch_size = len(whale_data.batch or [])
     dynamic_search_term = f"#{symbol}"
-    if config.TWITTER_BEARER_TOKEN:
-        logger.info(f"Fetching Twitter context using search term: '{dynamic_search_term}'")
-        tweets = await fetch_recent_tweets(
-            client, 
-            config.TWITTER_BEARER_TOKEN,
-            dynamic_search_term
-        )
-    else:
-        logger.info("Skipping Twitter fetch as token is not configured.")
-    logger.info(f"Sending data for {symbol} to LLaMA via Cerebras SDK for analysis...")
-    analysis, inference_time = await analyze_with_llama(
-        whale_summary,
-        tweets,
-        symbol
-    )
-    total_latency = time.monotonic() - start_process_time
     alert_message = f"🚨 **Real-Time {symbol} Alert** 🚨\n\n"
-    alert_message += f"**Whale Movement:**\n`{whale_summary}`\n\n"
-    if config.TWITTER_BEARER_TOKEN:
+    if degraded:
+        missing = ', '.join(DEGRADED_NOTES.get(stage, f"{stage} context") for stage in degraded)
+        alert_message += f"⚠️ _Degraded alert: {missing} unavailable right now._\n\n"
+    if batch_size:
+        alert_message += f"**Whale Movements ({batch_size} transfers):**\n```\n{whale_summary}\n```\n\n"
+    else:
+        alert_message += f"**Whale Movement:**\n`{whale_summary}`\n\n"
+    if config.TWITTER_BEARER_TOKEN and tweets is not None:
         if tweets:
             alert_message += f"**Recent Twitter Buzz ({dynamic_search_term}):**\n"
             for t in tweets:
@@ -67,41 +96,406 @@ async def process_alert(client: httpx.AsyncClient, whale_data: dict):
             alert_message += "\n"
         else:
             alert_message += f"_(No recent Twitter context found/fetched for {dynamic_search_term})_\n\n"
+    if score is not None:
+        alert_message += f"📊 *Alert Score: {score:.2f}*\n"
+    if analysis is None:
+        alert_message += f"⏱️ *Total Processing: {total_latency:.2f}s*"
+        return alert_message
     alert_message += f"**LLaMA Analysis ({config.CEREBRAS_MODEL_ID}):**\n{analysis}\n\n"
     alert_message += f"⏱️ *LLaMA Inference: {inference_time:.2f}s | Total Processing: {total_latency:.2f}s*"
-    logger.info(f"Sending alert for {symbol} to Telegram...")
-    await send_telegram_alert(
-        client, 
-        config.TELEGRAM_BOT_TOKEN,
-        config.TELEGRAM_CHAT_ID,
-        alert_message
-    )
-    logger.info(f"Alert processing for {symbol} completed in {total_latency:.2f}s.")
-
-
-async def run_alerter():
-    """Main application loop: Listens for alerts and schedules processing."""
+    return alert_message
+
+
+def _digest_header(part: int = 1, parts: int = 1) -> str:
+    return f"🗞️ **Whale Digest{f' ({part}/{parts})' if parts > 1 else ''}** 🗞️\n\n"
+
+
+def render_digest_messages(snapshot: dict, summary: str = None, limit: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> list:
+    """
+    Builds the Telegram Markdown messages for a periodic digest: symbol blocks are packed
+    into as few messages as fit under `limit` characters, and the summary goes last.
+    """
+    room = limit - len(_digest_header(99, 99)) - len("```\n\n```\n")
+    groups, group, size = [], [], 0
+    for section in format_digest_sections(snapshot):
+        section = section[:room]
+        if group and size + 1 + len(section) > room:
+            groups.append(group)
+            group, size = [], 0
+        size += len(section) + (1 if group else 0)
+        group.append(section)
+    if group:
+        groups.append(group)
+    messages = [
+        _digest_header(part, len(groups)) + "```\n" + "\n".join(group) + "\n```\n"
+        for part, group in enumerate(groups, 1)
+    ]
+    if summary:
+        summary_section = f"\n**LLaMA Summary ({config.CEREBRAS_MODEL_ID}):**\n{summary}\n"
+        if messages and len(messages[-1]) + len(summary_section) <= limit:
+            messages[-1] += summary_section
+        else:
+            messages.append(summary_section.lstrip()[:limit])
+    return messages
+
+
+async def run_digest(client: httpx.AsyncClient, digest: DigestAggregator, sender: TelegramSender = None,
+                     interval: float = config.DIGEST_INTERVAL_SECONDS):
+    """
+    Sends the digest (with one LLM summary) every `interval` seconds until cancelled,
+    through the rate-limited `sender` when this process has one.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            snapshot = digest.snapshot()
+            if not snapshot:
+                logger.info("No alerts within the digest windows; skipping this digest.")
+                continue
+            summary = await summarize_digest(format_digest(snapshot)) if config.DIGEST_LLM_SUMMARY else None
+            messages = render_digest_messages(snapshot, summary)
+            if sender:
+                results = await asyncio.gather(*(sender.enqueue(config.DIGEST_CHAT_ID, message) for message in messages))
+                delivered = all(result is not None for result in results)
+            else:
+                delivered = True
+                # One at a time, so the parts arrive in order.
+                for message in messages:
+                    delivered &= await send_telegram_alert(client, config.TELEGRAM_BOT_TOKEN, config.DIGEST_CHAT_ID, message)
+            if delivered:
+                logger.info("Sent digest for %d symbol(s) in %d message(s)%s.", len(snapshot), len(messages),
+                            " with summary" if summary else '')
+        except Exception as e:
+            logger.error(f"Digest failed: {e}", exc_info=True)
+
+
+async def process_alert(client: httpx.AsyncClient, whale_data: WhaleAlert, sources: list = None,
+                        sender: TelegramSender = None, router: RoutingTable = None, scorer: AlertScorer = None):
+    """
+    Runs one alert through the pipeline stages: format -> enrich (all sources
+    concurrently) -> infer -> render -> deliver, within ALERT_LATENCY_BUDGET_SECONDS.
+    Enrichment and inference are cut short when the budget runs out.
+    Returns wall-clock seconds per stage ('enrich', 'infer', 'render', 'deliver',
+    'total'), or None when the alert is skipped. With a sender, 'deliver' only
+    covers queueing; the sender tracks delivery latency itself.
+    While a circuit breaker is open its stage is skipped and the alert goes out
+    degraded, marked as such (whale data alone when Cerebras is unavailable).
+    With a `scorer`, only alerts scoring above the LLM threshold are enriched and
+    analyzed; lower ones get a template-only message or are left to the digest.
+    """
+    start_process_time = time.monotonic()
+    deadline = start_process_time + config.ALERT_LATENCY_BUDGET_SECONDS
+    symbol = whale_data.symbol
+    if not symbol or symbol == 'UNKNOWN':
+        logger.warning("Skipping processing for alert with missing/unknown symbol: %s", whale_data)
+        return
+    destinations = router.destinations(whale_data) if router else [config.TELEGRAM_CHAT_ID]
+    if not destinations:
+        logger.info("No Telegram route matches %s alert worth $%.0f; skipping.", symbol, whale_data.value_usd)
+        return
+    batch_size = len(whale_data.batch or [])
+    logger.info("Processing %s alert%s...", symbol, f" (batch of {batch_size})" if batch_size else '')
+    score, route = scorer.route(whale_data) if scorer else (None, LLM)
+    if route == DIGEST:
+        logger.info("%s alert scored %.2f, below the template threshold; not sending it individually.", symbol, score)
+        return
+    whale_summary = format_whale_summary(whale_data)
+    if sources is None:
+        sources = build_default_sources()
+    # Stages whose upstream circuit breaker is open are skipped up front instead of waiting out a timeout.
+    degraded = []
+    if route == TEMPLATE:
+        sources = []
+    elif not breaker_for('cerebras').available():
+        # Context only feeds the analysis, so without it the whale data goes out alone.
+        degraded.append('analysis')
+        sources = []
+    else:
+        unavailable = [source for source in sources if not source.available()]
+        degraded.extend(source.name for source in unavailable)
+        sources = [source for source in sources if source not in unavailable]
+    live = None
+    analyze = route == LLM and 'analysis' not in degraded
+    if sender and config.TELEGRAM_STREAM_ANALYSIS and analyze:
+        live = LiveMessage(sender, destinations)
+        live.post(render_alert_message(whale_data, whale_summary, None, ANALYSIS_PENDING, 0.0,
+                                       time.monotonic() - start_process_time, degraded, score))
+
+    timings = {}
+    enrich_start = time.monotonic()
+    enrich_budget = min(config.ENRICHMENT_TIMEOUT_SECONDS, deadline - enrich_start)
+    context = await gather_context(client, whale_data, sources, budget=enrich_budget)
+    tweets = context.get('twitter') or [] if analyze and 'twitter' not in degraded else None
+    extra_context = [
+        section for section in (s.prompt_section(context[s.name]) for s in sources if s.name in context)
+        if section
+    ]
+
+    infer_start = time.monotonic()
+    timings['enrich'] = infer_start - enrich_start
+    remaining = max(0.0, deadline - infer_start)
+    analysis, inference_time = None, 0.0
+    if analyze:
+        logger.info("Sending data for %s to LLaMA via Cerebras SDK for analysis...", symbol)
+        on_text = None
+        if live:
+            def on_text(partial_analysis: str):
+                now = time.monotonic()
+                live.update(render_alert_message(whale_data, whale_summary, tweets, partial_analysis + STREAMING_CURSOR,
+                                                 now - infer_start, now - start_process_time, degraded, score))
+        try:
+            analysis, inference_time = await asyncio.wait_for(
+                analyze_with_llama(whale_summary, tweets or [], symbol, extra_context,
+                                   cache_key=analysis_fingerprint(whale_data, tweets or [], extra_context),
+                                   on_text=on_text),
+                timeout=remaining,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("LLaMA analysis for %s cut off by the %ss latency budget.", symbol, config.ALERT_LATENCY_BUDGET_SECONDS)
+            analysis, inference_time = "_(Analysis skipped: latency budget exceeded.)_", remaining
+        if analysis == CIRCUIT_OPEN_TEXT:
+            degraded.append('analysis')
+            analysis = None
+    if degraded:
+        logger.info("Sending degraded %s alert without: %s.", symbol, ', '.join(degraded))
+        for stage in degraded:
+            DEGRADED_ALERTS.labels(stage).inc()
+
+    render_start = time.monotonic()
+    timings['infer'] = render_start - infer_start
+    total_latency = render_start - start_process_time
+    alert_message = render_alert_message(whale_data, whale_summary, tweets, analysis, inference_time, total_latency,
+                                         degraded, score)
+    deliver_start = time.monotonic()
+    timings['render'] = deliver_start - render_start
+    if live:
+        logger.info("Finalizing streamed alert for %s in %d chat(s)...", symbol, len(destinations))
+        await live.finish(alert_message)
+    elif sender:
+        logger.info("Queueing alert for %s for Telegram delivery to %d chat(s)...", symbol, len(destinations))
+        sender.broadcast(destinations, alert_message)
+    else:
+        logger.info("Sending alert for %s to Telegram...", symbol)
+        await asyncio.gather(*(
+            send_telegram_alert(client, config.TELEGRAM_BOT_TOKEN, chat_id, alert_message)
+            for chat_id in destinations
+        ))
+    finished = time.monotonic()
+    timings['deliver'] = finished - deliver_start
+    timings['total'] = finished - start_process_time
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    logger.info("Alert processing for %s completed in %.2fs.", symbol, total_latency)
+    return timings
+
+
+async def run_alerter(reconnect: bool = True):
+    """
+    Main application loop: Listens for alerts and schedules processing.
+    With reconnect=False (replay runs) it drains and returns when the WebSocket stream ends.
+    """
     logger.info("==================================================")
     logger.info(f"🚀 Starting PulseStreet Alerter (FlashBot)")
-    logger.info(f"   Monitoring Symbols : {', '.join(config.WHALE_SUBSCRIPTION_MSG.get('symbols', [])).upper()}")
-    logger.info(f"   Whale Threshold    : >= ${config.WHALE_SUBSCRIPTION_MSG.get('min_value_usd', 0):,}")
+    subscriptions = load_subscriptions()
+    symbols = subscribed_symbols(subscriptions)
+    logger.info(f"   Monitoring Symbols : {', '.join(symbols).upper()}")
+    for subscription in subscriptions:
+        logger.info(f"   Shard {subscription.name:<12} : {', '.join(subscription.symbols).upper()} >= ${subscription.min_value_usd:,}")
     logger.info(f"   LLM Engine         : Cerebras SDK")
     logger.info(f"   LLM Model          : {config.CEREBRAS_MODEL_ID}")
-    logger.info(f"   Twitter Context    : {'Enabled' if config.TWITTER_BEARER_TOKEN else 'Disabled'}")
-    logger.info(f"   Target Chat        : {config.TELEGRAM_CHAT_ID}")
+    logger.info(f"   Twitter Context    : {('Prefetched' if config.TWITTER_PREFETCH else 'Enabled') if config.TWITTER_BEARER_TOKEN else 'Disabled'}")
+    router = RoutingTable.from_config()
+    logger.info(f"   Target Chats       : {config.TELEGRAM_CHAT_ID if not config.TELEGRAM_ROUTES else f'{router.chat_count()} via {len(router.routes)} routes'}")
+    logger.info(f"   Alert Workers      : {config.ALERT_WORKERS} (queue {config.ALERT_QUEUE_SIZE}, {config.ALERT_OVERFLOW_POLICY})"
+                f"{f' in each of {config.WORKER_PROCESSES} worker processes' if config.WORKER_PROCESSES > 0 else ''}")
+    logger.info(f"   Alert Journal      : {config.ALERT_JOURNAL_PATH or 'Disabled'}")
+    logger.info(f"   Deduplication      : {config.DEDUP_BACKEND}, {config.DEDUP_WINDOW_SECONDS:.0f}s window")
+    logger.info(f"   Reconnect          : {config.RECONNECT_INITIAL_DELAY_SECONDS}s-{config.RECONNECT_DELAY_SECONDS}s backoff, gap backfill {'on' if config.WHALE_ALERT_BACKFILL else 'off'}")
+    logger.info(f"   Metrics            : {f'http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics' if config.METRICS_PORT else 'Disabled'}")
+    prescore_floor = f", template at >= {config.PRESCORE_TEMPLATE_THRESHOLD}" if config.DIGEST_ENABLED else ", template below"
+    logger.info(f"   Pre-scoring        : {f'LLM at >= {config.PRESCORE_LLM_THRESHOLD}{prescore_floor}' if config.PRESCORE_ENABLED else 'Disabled (every alert is analyzed)'}")
+    digest_windows = ', '.join(f"{window:g}s" for window in config.DIGEST_WINDOWS_SECONDS)
+    logger.info(f"   Digest             : {f'every {config.DIGEST_INTERVAL_SECONDS:g}s over {digest_windows} windows' if config.DIGEST_ENABLED else 'Disabled'}")
+    logger.info(f"   Alert Batching     : {f'{config.ALERT_BATCH_WINDOW_SECONDS}s window, max {config.ALERT_BATCH_MAX_SIZE}' if config.ALERT_BATCH_WINDOW_SECONDS > 0 else 'Disabled'}")
     logger.info("==================================================")
-    timeout_config = httpx.Timeout(30.0, read=None)
-    async with httpx.AsyncClient(timeout=timeout_config) as client:
+    async with HttpClients() as http:
+        client = http.client
         logger.info("Created shared HTTP client (for Twitter/Telegram).")
-        alert_generator = listen_for_alerts(config.WHALE_ALERT_WSS_URL, config.WHALE_SUBSCRIPTION_MSG)
-        logger.info("Waiting for whale alerts...")
-        async for whale_alert_data in alert_generator:
-            logger.debug(f"Received raw alert data: {whale_alert_data}")
-            asyncio.create_task(process_alert(client, whale_alert_data))
+        journal = AlertJournal(config.ALERT_JOURNAL_PATH) if config.ALERT_JOURNAL_PATH else None
+        if journal:
+            journal.start()
+        dedup = DedupIndex()
+        digest = DigestAggregator() if config.DIGEST_ENABLED else None
+        collectors = [stats_collector('pulsestreet_dedup', dedup.stats, counters=('checked', 'duplicates', 'rotations'))]
+        if digest:
+            collectors.append(stats_collector('pulsestreet_digest', digest.stats, counters=('observed',)))
+        if journal:
+            collectors.append(stats_collector('pulsestreet_journal', journal.stats,
+                                              counters=('recorded', 'duplicates', 'flushes', 'pruned')))
+        for collector in collectors:
+            REGISTRY.register_collector(collector)
+        metrics_server = None
+        shard_backfill = None
+        if config.WHALE_ALERT_BACKFILL and config.WHALE_ALERT_API_KEY:
+            shard_backfill = lambda subscription: make_backfill(client, config.WHALE_ALERT_API_KEY, subscription.message())
+        alert_stream = listen_to_shards(config.WHALE_ALERT_WSS_URL, subscriptions, reconnect, shard_backfill, dedup)
+        if journal:
+            alert_stream = journal.filter_new(alert_stream)
+        if digest:
+            alert_stream = digest.observe(alert_stream)
+        alert_generator = batch_alerts(alert_stream)
+        try:
+            if config.METRICS_PORT:
+                metrics_server = await start_metrics_server()
+            async with contextlib.AsyncExitStack() as stack:
+                sender = None
+                if config.WORKER_PROCESSES > 0:
+                    pool = WorkerPool(on_result=journal.mark if journal else None)
+                    pool.start()
+                    stack.push_async_callback(pool.close)
+                    pool_collector = REGISTRY.register_collector(stats_collector(
+                        'pulsestreet_worker_pool', pool.stats, counters=('submitted', 'completed', 'blocked', 'restarts')))
+                    stack.callback(REGISTRY.unregister_collector, pool_collector)
+                    submit = pool.submit
+                else:
+                    dispatcher, sender = await stack.enter_async_context(analysis_pipeline(
+                        http, router, symbols, journal.track if journal else None,
+                        on_drop=(lambda alert: journal.mark(alert, DROPPED)) if journal else None))
+                    submit = dispatcher.submit
+                if digest:
+                    # Registered after the pipeline, so it is cancelled before the sender closes.
+                    digest_task = asyncio.create_task(run_digest(client, digest, sender), name="digest")
+                    stack.callback(digest_task.cancel)
+                if journal:
+                    unfinished = journal.unfinished()
+                    if unfinished:
+                        logger.info("Replaying %d unfinished alert(s) from the journal...", len(unfinished))
+                    for whale_alert_data in unfinished:
+                        await submit(whale_alert_data)
+                logger.info("Waiting for whale alerts...")
+                async for whale_alert_data in alert_generator:
+                    logger.debug("Received raw alert data: %s", whale_alert_data)
+                    await submit(whale_alert_data)
+        finally:
+            if journal:
+                await journal.close()
+                logger.info(f"Alert journal stats: {journal.stats()}")
+            logger.info(f"Deduplication stats: {dedup.stats()}")
+            for collector in collectors:
+                REGISTRY.unregister_collector(collector)
+            if metrics_server:
+                metrics_server.close()
+                await metrics_server.wait_closed()
     logger.info("Alerter main loop finished (HTTP client closed).")
 
 
+@contextlib.asynccontextmanager
+async def analysis_pipeline(http: HttpClients, router: RoutingTable, symbols: list,
+                            wrap_handler=None, rate_share: int = 1, on_drop=None):
+    """
+    Enrichment, analysis and delivery for one process: yields the started AlertDispatcher and
+    Telegram sender, and drains them and the tweet prefetcher on exit.
+    `rate_share` splits the Telegram rate limits between that many processes;
+    `on_drop` is told about every alert the dispatcher drops.
+    """
+    client = http.client
+    # Single startup phase: SDK clients are built and upstream connection pools opened concurrently.
+    warm_hosts = ['telegram'] + (['twitter'] if config.TWITTER_BEARER_TOKEN else [])
+    await asyncio.gather(warm_up_llama(), http.prewarm(warm_hosts))
+    prefetcher = None
+    if config.TWITTER_BEARER_TOKEN and config.TWITTER_PREFETCH and symbols:
+        prefetcher = TweetPrefetcher(client, config.TWITTER_BEARER_TOKEN, symbols)
+        prefetcher.start()
+    sources = build_default_sources(prefetcher)
+    sender = TelegramSender(client, config.TELEGRAM_BOT_TOKEN,
+                            global_rate=config.TELEGRAM_GLOBAL_RATE_PER_SECOND / rate_share,
+                            chat_rate_per_minute=config.TELEGRAM_CHAT_RATE_PER_MINUTE / rate_share)
+    sender.start()
+    scorer = AlertScorer() if config.PRESCORE_ENABLED else None
+    handler = lambda whale_data: process_alert(client, whale_data, sources, sender, router, scorer)
+    if wrap_handler:
+        handler = wrap_handler(handler)
+    dispatcher = AlertDispatcher(handler, on_drop=on_drop)
+    dispatcher.start()
+    collectors = [
+        stats_collector('pulsestreet_dispatcher', dispatcher.stats,
+                        counters=('submitted', 'processed', 'failed', 'dropped')),
+        stats_collector('pulsestreet_telegram', sender.stats,
+                        counters=('sent_requests', 'delivered', 'failed', 'retries', 'rate_limited', 'coalesced')),
+        stats_collector('pulsestreet_twitter_cache', tweet_cache.stats, counters=CACHE_COUNTERS),
+        stats_collector('pulsestreet_llama_cache', analysis_cache.stats, counters=CACHE_COUNTERS),
+    ]
+    if scorer:
+        collectors.append(stats_collector('pulsestreet_prescore', scorer.stats,
+                                          counters=('routed_llm', 'routed_template', 'routed_digest')))
+    breakers = {name: breaker_for(name) for name in ('cerebras', 'twitter')}
+    collectors.extend(stats_collector(f'pulsestreet_breaker_{name}', breaker.stats, counters=BREAKER_COUNTERS)
+                      for name, breaker in breakers.items())
+    pools = dict(http.pools, cerebras=llama.connection_pool) if llama.connection_pool else http.pools
+    collectors.extend(stats_collector(f'pulsestreet_http_{name}', pool.stats, counters=POOL_COUNTERS)
+                      for name, pool in pools.items())
+    for collector in collectors:
+        REGISTRY.register_collector(collector)
+    try:
+        yield dispatcher, sender
+    finally:
+        await dispatcher.close()
+        await sender.close()
+        logger.info(f"Telegram delivery stats: {sender.stats()}")
+        logger.info(f"LLaMA analysis cache stats: {analysis_cache.stats()}")
+        logger.info(f"Circuit breaker stats: {({name: breaker.stats() for name, breaker in breakers.items()})}")
+        logger.info(f"HTTP connection pool stats: {({name: pool.stats() for name, pool in pools.items()})}")
+        if prefetcher:
+            await prefetcher.stop()
+        for collector in collectors:
+            REGISTRY.unregister_collector(collector)
+
+
+def _report_results(results):
+    """Handler wrapper that sends (alert, DONE/FAILED) back to the ingest process's journal."""
+    def wrap(handler):
+        async def reporting(alert: WhaleAlert):
+            try:
+                result = await handler(alert)
+            except Exception:
+                results.put((alert, FAILED))
+                raise
+            results.put((alert, DONE))
+            return result
+        return reporting
+    return wrap
+
+
+async def run_analysis_worker(index: int, processes: int, inbox, results):
+    """
+    Worker process loop (WORKER_PROCESSES > 0): processes the alerts the ingest process
+    routes to it until it reads the None sentinel. Only this worker's symbols are prefetched.
+    """
+    router = RoutingTable.from_config()
+    symbols = [symbol for symbol in subscribed_symbols(load_subscriptions()) if worker_for(symbol, processes) == index]
+    logger.info(f"Analysis worker {index + 1}/{processes} started for {', '.join(symbols).upper() or 'no prefetched symbols'}.")
+    metrics_server = None
+    async with HttpClients() as http:
+        try:
+            if config.METRICS_PORT:
+                metrics_server = await start_metrics_server(port=config.METRICS_PORT + 1 + index)
+            async with analysis_pipeline(http, router, symbols, _report_results(results), processes,
+                                         on_drop=lambda alert: results.put((alert, DROPPED))) as (dispatcher, _):
+                loop = asyncio.get_running_loop()
+                while (whale_alert_data := await loop.run_in_executor(None, inbox.get)) is not None:
+                    await dispatcher.submit(whale_alert_data)
+        finally:
+            if metrics_server:
+                metrics_server.close()
+                await metrics_server.wait_closed()
+    logger.info(f"Analysis worker {index + 1}/{processes} stopped.")
+
+
 if __name__ == "__main__":
+    config.setup_logging()
+    if not config.IS_CONFIG_VALID:
+        logging.critical("Essential configuration is invalid. Exiting.")
+        exit(1)
     try:
         if not os.environ.get("CEREBRAS_API_KEY") and config.CEREBRAS_API_KEY:
             logger.info("Setting CEREBRAS_API_KEY in environment from config for SDK.")
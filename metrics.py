@@ -0,0 +1,276 @@
+import asyncio
+import bisect
+import logging
+import math
+from config import METRICS_HOST, METRICS_PORT
+
+"""
+Minimal Prometheus instrumentation (text exposition format 0.0.4) with no third-party dependency.
+Counters, gauges and log-linear ("HDR-style") histograms keep plain numbers on
+the hot path: a labelled child is looked up once by its label values and then
+updated with an addition, and nothing is formatted until /metrics is scraped.
+Components that already keep their own counters (dispatcher, sender, caches,
+journal) are exposed through collectors that read their stats() at scrape time.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _histogram_bounds(min_exponent: int = -13, max_exponent: int = 7, sub_buckets: int = 4) -> list:
+    """Upper bounds growing by powers of two, each octave split into `sub_buckets` linear steps (~122µs to 128s)."""
+    bounds = []
+    for exponent in range(min_exponent, max_exponent):
+        base = 2.0 ** exponent
+        bounds.extend(base + base * i / sub_buckets for i in range(1, sub_buckets + 1))
+    return bounds
+
+
+DEFAULT_BOUNDS = _histogram_bounds()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        """Returns the child for these label values; cache it at the call site on hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _unlabelled(self):
+        return self._children[()]
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(child.expose(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def expose(self, name: str, labelnames: tuple, values: tuple) -> list:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonic count; `name` should end in _total."""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().value += amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._unlabelled().value = value
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().value -= amount
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: list):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (relative error bounded by the bucket width)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def expose(self, name: str, labelnames: tuple, values: tuple) -> list:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            le = 'le="%r"' % bound
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution over fixed log-linear buckets; observe() is one bisect and three additions."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), bounds: list = None, registry=None):
+        self.bounds = list(bounds or DEFAULT_BOUNDS)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector):
+        """`collector()` returns (name, kind, documentation, value) tuples, read at scrape time."""
+        self._collectors.append(collector)
+        return collector
+
+    def unregister_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for collector in list(self._collectors):
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.error(f"Metrics collector {collector!r} failed: {e}")
+                continue
+            for name, kind, documentation, value in samples:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def stats_collector(prefix: str, stats, counters: tuple = ()):
+    """
+    Collector exposing a component's stats() dict: numeric keys in `counters`
+    become <prefix>_<key>_total counters, every other numeric key a gauge.
+    """
+    def collect():
+        samples = []
+        for key, value in stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key in counters:
+                samples.append((f"{prefix}_{key}_total", 'counter', f"{prefix} {key}", value))
+            else:
+                samples.append((f"{prefix}_{key}", 'gauge', f"{prefix} {key}", value))
+        return samples
+    return collect
+
+
+# --- Pipeline metrics ---
+FRAMES_RECEIVED = Counter('pulsestreet_ws_frames_total', "WebSocket frames received")
+FRAMES_FILTERED = Counter('pulsestreet_ws_frames_filtered_total', "Frames that were not target alerts")
+FRAME_ERRORS = Counter('pulsestreet_ws_frame_errors_total', "Frames that failed to decode")
+ALERTS_RECEIVED = Counter('pulsestreet_alerts_received_total', "Target alerts parsed from the stream", ('symbol',))
+WS_RECONNECTS = Counter('pulsestreet_ws_reconnects_total', "WebSocket reconnect attempts")
+STAGE_SECONDS = Histogram('pulsestreet_stage_seconds', "Wall-clock time per process_alert stage", ('stage',))
+UPSTREAM_SECONDS = Histogram('pulsestreet_upstream_request_seconds', "Upstream API call latency", ('service',))
+UPSTREAM_ERRORS = Counter('pulsestreet_upstream_errors_total', "Failed upstream API calls by status code or error",
+                          ('service', 'code'))
+DEGRADED_ALERTS = Counter('pulsestreet_degraded_alerts_total', "Alerts sent without a stage whose upstream was unavailable",
+                          ('stage',))
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = "200 OK", REGISTRY.expose().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"Not found\n", "text/plain"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Serves GET /metrics; returns the asyncio server (close() it on shutdown). Port 0 picks a free port."""
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logger.info(f"Metrics available at http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
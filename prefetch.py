@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import httpx
+from config import (
+    TWITTER_POLL_INTERVAL_SECONDS, TWITTER_RATE_LIMIT_REQUESTS, TWITTER_RATE_LIMIT_WINDOW_SECONDS,
+    TWITTER_WINDOW_SIZE, TWITTER_MAX_RESULTS,
+)
+from twitter import refresh_recent_tweets
+
+"""
+Background Twitter poller that keeps a rolling window of recent tweets per symbol.
+process_alert reads the latest snapshot instead of calling Twitter on the alert
+path. The poll interval is stretched when needed so that polling every symbol
+stays within the configured recent-search rate limit.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class TweetPrefetcher:
+    """Polls Twitter for each symbol on a schedule and serves in-memory snapshots."""
+
+    def __init__(self, client: httpx.AsyncClient, bearer_token: str, symbols: list,
+                 poll_interval: float = TWITTER_POLL_INTERVAL_SECONDS,
+                 rate_limit_requests: int = TWITTER_RATE_LIMIT_REQUESTS,
+                 rate_limit_window: float = TWITTER_RATE_LIMIT_WINDOW_SECONDS,
+                 window_size: int = TWITTER_WINDOW_SIZE):
+        self.client = client
+        self.bearer_token = bearer_token
+        self.symbols = [s.upper() for s in symbols]
+        min_interval = rate_limit_window * len(self.symbols) / max(1, rate_limit_requests)
+        self.poll_interval = max(poll_interval, min_interval)
+        if self.poll_interval > poll_interval:
+            logger.warning(f"Twitter poll interval raised from {poll_interval}s to {self.poll_interval:.0f}s to stay "
+                           f"within {rate_limit_requests} requests per {rate_limit_window:.0f}s for {len(self.symbols)} symbols.")
+        self._windows = {symbol: deque(maxlen=window_size) for symbol in self.symbols}
+        self._updated_at = {}
+        self._tasks = []
+
+    def start(self):
+        if self._tasks:
+            return
+        stagger = self.poll_interval / max(1, len(self.symbols))
+        self._tasks = [
+            asyncio.create_task(self._poll(symbol, i * stagger), name=f"twitter-prefetch-{symbol}")
+            for i, symbol in enumerate(self.symbols)
+        ]
+        logger.info(f"Twitter prefetcher started for {', '.join(self.symbols)} every {self.poll_interval:.0f}s.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _poll(self, symbol: str, initial_delay: float):
+        await asyncio.sleep(initial_delay)
+        delay = self.poll_interval
+        while True:
+            try:
+                tweets = await refresh_recent_tweets(self.client, self.bearer_token, f"#{symbol}")
+            except Exception as e:
+                logger.error(f"Twitter prefetch for {symbol} failed: {e}", exc_info=True)
+                tweets = None
+            if tweets is None:
+                delay = min(delay * 2, self.poll_interval * 4)
+            else:
+                self._merge(symbol, tweets)
+                delay = self.poll_interval
+            await asyncio.sleep(delay)
+
+    def _merge(self, symbol: str, tweets: list):
+        window = self._windows[symbol]
+        seen = set(window)
+        fresh = [t for t in tweets if t not in seen]
+        for tweet in reversed(fresh):
+            window.appendleft(tweet)
+        self._updated_at[symbol] = time.monotonic()
+        logger.debug(f"Prefetched {len(fresh)} new tweets for {symbol} ({len(window)} in window).")
+
+    def snapshot(self, symbol: str, limit: int = TWITTER_MAX_RESULTS) -> list:
+        """Returns up to `limit` of the most recent tweets for `symbol` without any I/O."""
+        window = self._windows.get(symbol.upper())
+        if not window:
+            return []
+        return list(window)[:limit]
+
+    def age(self, symbol: str):
+        """Seconds since `symbol` was last refreshed, or None if it never was."""
+        updated_at = self._updated_at.get(symbol.upper())
+        return time.monotonic() - updated_at if updated_at is not None else None
@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+import mmap
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+import websockets
+
+"""
+Offline replay harness: drives the full alerter pipeline (run_alerter) from a
+recorded WebSocket capture, without Whale Alert, Twitter, Cerebras or Telegram.
+Frames are read from a JSONL capture (gzip-compressed if it ends in .gz,
+memory-mapped otherwise) and streamed by a local stand-in WebSocket server at
+their recorded pace, N times faster, or as fast as possible. Twitter, Cerebras
+and Telegram are served by one local mock HTTP server with a configurable
+latency distribution and error rate per service, so load tests are
+reproducible offline:
+
+    python replay.py benchmarks/data/whale_frames_sample.jsonl --speed 0 --latency cerebras=0.4 --error-rate telegram=0.05
+
+The environment is pointed at the local servers before config is imported, so
+replay runs as its own entry point rather than through main.py.
+"""
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ('twitter', 'cerebras', 'telegram')
+DEFAULT_LATENCIES = {'twitter': 0.15, 'cerebras': 0.4, 'telegram': 0.1}
+REPLAY_ANALYSIS = "Mixed: large exchange flows suggest short-term volatility; watch for follow-through."
+_TIMESTAMP = re.compile(rb'"timestamp":\s*(\d+(?:\.\d+)?)')
+
+
+def load_frames(path: str) -> list:
+    """Reads one WebSocket frame per non-empty line of a JSONL capture (.gz or plain)."""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            lines = f.read().splitlines()
+    else:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                lines = list(iter(mapped.readline, b''))
+    return [line.strip() for line in lines if line.strip()]
+
+
+def frame_offsets(frames: list) -> list:
+    """Seconds from the first frame's `timestamp` to each frame's; frames without one keep the previous offset."""
+    offsets = []
+    first = None
+    offset = 0.0
+    for frame in frames:
+        match = _TIMESTAMP.search(frame)
+        if match:
+            timestamp = float(match.group(1))
+            if first is None:
+                first = timestamp
+            offset = max(offset, timestamp - first)
+        offsets.append(offset)
+    return offsets
+
+
+@dataclass
+class ServiceProfile:
+    """Latency (median seconds, log-normal spread `jitter`) and error injection for one mocked service."""
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    def delay(self, rng: random.Random) -> float:
+        if self.jitter > 0:
+            return self.latency * rng.lognormvariate(0, self.jitter)
+        return self.latency
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+class ReplayWebSocketServer:
+    """Stand-in for the Whale Alert WebSocket: acknowledges the subscription, then plays the capture once."""
+
+    def __init__(self, frames: list, speed: float = 1.0):
+        self.frames = frames
+        self.speed = speed
+        self.sent = 0
+        self.port = None
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, '127.0.0.1', 0)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+
+    async def _handle(self, ws):
+        subscription = await ws.recv()
+        await ws.send(json.dumps({"type": "subscribed_alerts", "request": json.loads(subscription)}))
+        started = time.monotonic()
+        for frame, offset in zip(self.frames, frame_offsets(self.frames)):
+            if self.speed > 0:
+                wait = started + offset / self.speed - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await ws.send(frame.decode())
+            self.sent += 1
+        logger.info(f"Replayed {self.sent} frames in {time.monotonic() - started:.2f}s; closing stream.")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+class MockServiceServer:
+    """Minimal HTTP/1.1 server answering the Twitter, Cerebras and Telegram calls the alerter makes."""
+
+    def __init__(self, profiles: dict, seed: int = None):
+        self.profiles = profiles
+        self.rng = random.Random(seed)
+        self.requests = Counter()
+        self.errors = Counter()
+        self.telegram_calls = Counter()
+        self.port = None
+        self._server = None
+        self._connections = {}
+        self._message_ids = itertools.count(1)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                if method == 'HEAD':
+                    # Connection warm-up probes: no body, not counted as service calls.
+                    status, content_type, payload = 200, 'text/plain', b''
+                else:
+                    status, content_type, payload = await self._respond(method, target, body)
+                writer.write(
+                    f"HTTP/1.1 {status} Replay\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _respond(self, method: str, target: str, body: bytes) -> tuple:
+        path = target.split('?', 1)[0]
+        if path.startswith('/2/tweets/'):
+            service = 'twitter'
+        elif path.startswith('/v1/'):
+            service = 'cerebras'
+        elif path.startswith('/bot'):
+            service = 'telegram'
+        else:
+            return 404, 'application/json', b'{"error": "unknown endpoint"}'
+        self.requests[service] += 1
+        profile = self.profiles.get(service) or ServiceProfile()
+        await asyncio.sleep(profile.delay(self.rng))
+        if profile.fails(self.rng):
+            self.errors[service] += 1
+            error = {'ok': False, 'error_code': profile.error_status, 'description': "Injected replay error",
+                     'parameters': {'retry_after': 1}, 'error': {'message': "Injected replay error"}}
+            return profile.error_status, 'application/json', json.dumps(error).encode()
+        request = json.loads(body) if body else {}
+        if service == 'twitter':
+            tweets = [{'id': str(i), 'text': f"Replay tweet {i}: whales are moving again"} for i in range(3)]
+            return 200, 'application/json', json.dumps({'data': tweets}).encode()
+        if service == 'cerebras':
+            return self._completion(request)
+        telegram_method = path.rsplit('/', 1)[-1]
+        self.telegram_calls[telegram_method] += 1
+        result = {'message_id': request.get('message_id') or next(self._message_ids),
+                  'chat': {'id': request.get('chat_id')}, 'text': request.get('text', '')}
+        return 200, 'application/json', json.dumps({'ok': True, 'result': result}).encode()
+
+    def _completion(self, request: dict) -> tuple:
+        def chunk(text, finish_reason=None):
+            return {'id': 'replay', 'object': 'text_completion', 'created': int(time.time()),
+                    'model': request.get('model'),
+                    'choices': [{'index': 0, 'text': text, 'finish_reason': finish_reason}]}
+        if not request.get('stream'):
+            return 200, 'application/json', json.dumps(chunk(" " + REPLAY_ANALYSIS, 'stop')).encode()
+        events = [f"data: {json.dumps(chunk(' ' + word))}\n\n" for word in REPLAY_ANALYSIS.split()]
+        events.append("data: [DONE]\n\n")
+        return 200, 'text/event-stream', ''.join(events).encode()
+
+    def stats(self) -> dict:
+        return {
+            'requests': dict(self.requests),
+            'injected_errors': dict(self.errors),
+            'telegram_calls': dict(self.telegram_calls),
+        }
+
+
+async def run_replay(capture_path: str, speed: float = 1.0, profiles: dict = None, seed: int = None) -> dict:
+    """Plays a capture through run_alerter against local stand-ins and returns a run report."""
+    if 'config' in sys.modules:
+        raise RuntimeError("run_replay must configure the environment before config is imported.")
+    frames = load_frames(capture_path)
+    ws_server = ReplayWebSocketServer(frames, speed)
+    mock = MockServiceServer(profiles or {}, seed)
+    await ws_server.start()
+    await mock.start()
+    os.environ.update({
+        'WHALE_ALERT_API_KEY': 'replay',
+        'WHALE_ALERT_WSS_BASE_URL': ws_server.url,
+        'TWITTER_BEARER_TOKEN': 'replay',
+        'TWITTER_API_BASE_URL': mock.base_url,
+        'CEREBRAS_API_KEY': 'replay',
+        'CEREBRAS_BASE_URL': mock.base_url,
+        'CEREBRAS_MODEL_ID': 'replay-model',
+        'TELEGRAM_BOT_TOKEN': 'replay',
+        'TELEGRAM_API_BASE_URL': mock.base_url,
+        'TELEGRAM_CHAT_ID': 'replay-chat',
+        'TELEGRAM_ROUTES': '',
+        # Persistent state would make repeated runs of the same capture diverge.
+        'ALERT_JOURNAL_PATH': '',
+        'LLAMA_CACHE_DB': '',
+    })
+    import main
+    main.config.setup_logging()
+    logger.info(f"Replaying {len(frames)} frames from {capture_path} at "
+                f"{'max' if speed <= 0 else f'{speed:g}x'} speed...")
+    started = time.monotonic()
+    try:
+        await main.run_alerter(reconnect=False)
+    finally:
+        elapsed = time.monotonic() - started
+        await ws_server.stop()
+        await mock.stop()
+    return {
+        'capture': capture_path,
+        'speed': speed,
+        'frames': ws_server.sent,
+        'elapsed_seconds': elapsed,
+        'frames_per_second': ws_server.sent / elapsed if elapsed else 0.0,
+        'alerts_delivered': mock.telegram_calls['sendMessage'],
+        **mock.stats(),
+    }
+
+
+def _service_values(pairs: list, option: str, cast) -> dict:
+    values = {}
+    for pair in pairs or []:
+        service, _, value = pair.partition('=')
+        if service not in SERVICES or not value:
+            raise SystemExit(f"{option} expects SERVICE=VALUE with SERVICE one of {', '.join(SERVICES)}; got '{pair}'.")
+        values[service] = cast(value)
+    return values
+
+
+def build_profiles(args) -> dict:
+    latencies = dict(DEFAULT_LATENCIES, **_service_values(args.latency, '--latency', float))
+    jitters = _service_values(args.jitter, '--jitter', float)
+    error_rates = _service_values(args.error_rate, '--error-rate', float)
+    error_statuses = _service_values(args.error_status, '--error-status', int)
+    return {
+        service: ServiceProfile(
+            latency=latencies[service],
+            jitter=jitters.get(service, args.default_jitter),
+            error_rate=error_rates.get(service, 0.0),
+            error_status=error_statuses.get(service, 500),
+        )
+        for service in SERVICES
+    }
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Replay a recorded Whale Alert capture through the alerter offline.")
+    parser.add_argument('capture', help="JSONL capture, one WebSocket frame per line (.gz supported)")
+    parser.add_argument('--speed', type=float, default=1.0, help="Playback speed multiplier; 0 plays as fast as possible")
+    parser.add_argument('--latency', action='append', metavar='SERVICE=SECONDS', help="Median mock latency per service")
+    parser.add_argument('--jitter', action='append', metavar='SERVICE=SIGMA', help="Log-normal latency spread per service")
+    parser.add_argument('--default-jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', action='append', metavar='SERVICE=P', help="Fraction of mock calls that fail")
+    parser.add_argument('--error-status', action='append', metavar='SERVICE=CODE', help="HTTP status for injected failures")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for latency and error sampling")
+    parser.add_argument('--report', help="Write the run report as JSON to this path")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_replay(args.capture, args.speed, build_profiles(args), args.seed))
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from alerts import WhaleAlert
+from config import TELEGRAM_ROUTES, TELEGRAM_CHAT_ID
+
+"""
+Maps alerts to Telegram destinations.
+A route pairs a list of chat IDs with an optional symbol set and a USD value
+band. Routes are indexed by symbol, so resolving an alert only looks at the
+routes for its symbol plus the catch-all routes, however many chats exist.
+
+TELEGRAM_ROUTES holds either a JSON list or a path to a JSON file, e.g.
+[{"chat_ids": ["-100123", "@whales"], "symbols": ["btc"], "min_value_usd": 1000000}]
+Without it, every alert goes to TELEGRAM_CHAT_ID.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    chat_ids: tuple
+    symbols: frozenset = None
+    min_value_usd: float = 0.0
+    max_value_usd: float = math.inf
+
+    def matches_value(self, value_usd: float) -> bool:
+        return self.min_value_usd <= value_usd < self.max_value_usd
+
+
+class RoutingTable:
+    """Resolves the chat IDs an alert should be delivered to."""
+
+    def __init__(self, routes: list):
+        self.routes = list(routes)
+        self._by_symbol = {}
+        self._any_symbol = []
+        for route in self.routes:
+            if route.symbols:
+                for symbol in route.symbols:
+                    self._by_symbol.setdefault(symbol, []).append(route)
+            else:
+                self._any_symbol.append(route)
+
+    def destinations(self, alert: WhaleAlert) -> list:
+        """Unique chat IDs for the alert, in route order."""
+        chat_ids = {}
+        for route in self._by_symbol.get(alert.symbol.upper(), ()):
+            if route.matches_value(alert.value_usd):
+                chat_ids.update(dict.fromkeys(route.chat_ids))
+        for route in self._any_symbol:
+            if route.matches_value(alert.value_usd):
+                chat_ids.update(dict.fromkeys(route.chat_ids))
+        return list(chat_ids)
+
+    def chat_count(self) -> int:
+        return len({chat_id for route in self.routes for chat_id in route.chat_ids})
+
+    @classmethod
+    def from_config(cls, routes_setting: str = TELEGRAM_ROUTES, default_chat_id: str = TELEGRAM_CHAT_ID):
+        if not routes_setting:
+            return cls([Route(chat_ids=(default_chat_id,))] if default_chat_id else [])
+        if routes_setting.lstrip().startswith('['):
+            raw_routes = json.loads(routes_setting)
+        else:
+            with open(os.path.expanduser(routes_setting)) as f:
+                raw_routes = json.load(f)
+        routes = []
+        for raw in raw_routes:
+            chat_ids = raw.get('chat_ids') or ([raw['chat_id']] if raw.get('chat_id') else [])
+            if not chat_ids:
+                raise ValueError(f"Route without chat_ids: {raw}")
+            symbols = raw.get('symbols')
+            routes.append(Route(
+                chat_ids=tuple(str(chat_id) for chat_id in chat_ids),
+                symbols=frozenset(s.upper() for s in symbols) if symbols else None,
+                min_value_usd=float(raw.get('min_value_usd', 0)),
+                max_value_usd=float(raw.get('max_value_usd', math.inf)),
+            ))
+        table = cls(routes)
+        logger.info(f"Loaded {len(routes)} Telegram routes covering {table.chat_count()} chats.")
+        return table
@@ -0,0 +1,159 @@
+import bisect
+import logging
+import math
+import time
+from collections import deque
+from config import (
+    PRESCORE_LLM_THRESHOLD, PRESCORE_TEMPLATE_THRESHOLD, PRESCORE_HISTORY_SIZE, PRESCORE_MIN_HISTORY,
+    PRESCORE_BURST_WINDOW_SECONDS, PRESCORE_BURST_SATURATION,
+    PRESCORE_VALUE_WEIGHT, PRESCORE_FLOW_WEIGHT, PRESCORE_BURST_WEIGHT, DIGEST_ENABLED,
+)
+
+"""
+Rule-based pre-scoring that decides which alerts are worth an LLM call.
+Each alert gets a score in [0, 1] from three cheap features:
+- value: percentile of its USD value among the symbol's last
+  PRESCORE_HISTORY_SIZE transfers (log-scaled absolute value until enough history);
+  a batched alert is scored by its largest transfer, like the history it is compared to;
+- flow: exchange inflow (possible selling) and outflow (possible accumulation)
+  rank above exchange-internal shuffles and unknown-to-unknown transfers;
+- burst: how many alerts the symbol had within the burst window.
+Scores at or above PRESCORE_LLM_THRESHOLD go to the LLM ('llm'), those at or
+above PRESCORE_TEMPLATE_THRESHOLD get a template-only message ('template'), and
+the rest are not sent individually ('digest'), which only applies while the
+digest is enabled; without it they get a template-only message too.
+State is per symbol and bounded, and time comes from the alert's own timestamp
+when it has one, so scoring a recorded capture offline gives the same result as live.
+"""
+
+logger = logging.getLogger(__name__)
+
+LLM, TEMPLATE, DIGEST = 'llm', 'template', 'digest'
+FLOW_SCORES = {'inflow': 1.0, 'outflow': 0.8, 'other': 0.4, 'internal': 0.1}
+# Absolute scale used before a symbol has PRESCORE_MIN_HISTORY alerts: $100k -> 0, $100M -> 1.
+_COLD_LOG_MIN, _COLD_LOG_MAX = 5.0, 8.0
+
+
+def flow_direction(alert) -> str:
+    """'inflow' to an exchange, 'outflow' from one, 'internal' between exchanges, else 'other'."""
+    from_exchange = alert.from_owner_type == 'exchange'
+    to_exchange = alert.to_owner_type == 'exchange'
+    if from_exchange and to_exchange:
+        return 'internal'
+    if to_exchange:
+        return 'inflow'
+    if from_exchange:
+        return 'outflow'
+    return 'other'
+
+
+class RollingPercentile:
+    """The last `size` values kept both in arrival order and sorted, so percentile() is a bisect."""
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._arrivals = deque()
+        self._sorted = []
+
+    def percentile(self, value: float) -> float:
+        if not self._sorted:
+            return 0.5
+        below = bisect.bisect_left(self._sorted, value)
+        equal = bisect.bisect_right(self._sorted, value) - below
+        return (below + equal / 2) / len(self._sorted)
+
+    def add(self, value: float):
+        self._arrivals.append(value)
+        bisect.insort(self._sorted, value)
+        if len(self._arrivals) > self.size:
+            oldest = self._arrivals.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+
+    def __len__(self):
+        return len(self._sorted)
+
+
+class _SymbolState:
+    __slots__ = ('values', 'recent')
+
+    def __init__(self, history_size: int):
+        self.values = RollingPercentile(history_size)
+        self.recent = deque()
+
+
+class AlertScorer:
+    def __init__(self, llm_threshold: float = PRESCORE_LLM_THRESHOLD,
+                 template_threshold: float = PRESCORE_TEMPLATE_THRESHOLD,
+                 history_size: int = PRESCORE_HISTORY_SIZE, min_history: int = PRESCORE_MIN_HISTORY,
+                 burst_window: float = PRESCORE_BURST_WINDOW_SECONDS, burst_saturation: int = PRESCORE_BURST_SATURATION,
+                 weights: tuple = (PRESCORE_VALUE_WEIGHT, PRESCORE_FLOW_WEIGHT, PRESCORE_BURST_WEIGHT),
+                 digest_enabled: bool = DIGEST_ENABLED, clock=time.time):
+        self.llm_threshold = llm_threshold
+        self.template_threshold = template_threshold
+        self.digest_enabled = digest_enabled
+        self.history_size = history_size
+        self.min_history = min_history
+        self.burst_window = burst_window
+        self.burst_saturation = max(1, burst_saturation)
+        total = sum(weights) or 1.0
+        self.weights = tuple(weight / total for weight in weights)
+        self.clock = clock
+        self._symbols = {}
+        self.routed = {LLM: 0, TEMPLATE: 0, DIGEST: 0}
+
+    def features(self, alert) -> dict:
+        """Scores the alert's features against the symbol's history, then adds it to that history."""
+        state = self._symbols.get(alert.symbol)
+        if state is None:
+            state = self._symbols[alert.symbol] = _SymbolState(self.history_size)
+        transfers = alert.batch or (alert,)
+        value_usd = max(float(transfer.value_usd or 0.0) for transfer in transfers)
+        if len(state.values) >= self.min_history:
+            value = state.values.percentile(value_usd)
+        else:
+            value = (math.log10(max(value_usd, 1.0)) - _COLD_LOG_MIN) / (_COLD_LOG_MAX - _COLD_LOG_MIN)
+        now = alert.timestamp or self.clock()
+        recent = state.recent
+        while recent and recent[0] <= now - self.burst_window:
+            recent.popleft()
+        burst = min(1.0, len(recent) / self.burst_saturation)
+
+        for transfer in transfers:
+            state.values.add(float(transfer.value_usd or 0.0))
+            recent.append(now)
+        # A batch from the batcher is bounded by ALERT_BATCH_MAX_SIZE; keep the burst window bounded too.
+        while len(recent) > self.burst_saturation:
+            recent.popleft()
+        return {
+            'value': min(1.0, max(0.0, value)),
+            'flow': FLOW_SCORES[flow_direction(alert)],
+            'burst': burst,
+        }
+
+    def score(self, alert) -> float:
+        features = self.features(alert)
+        value_weight, flow_weight, burst_weight = self.weights
+        return value_weight * features['value'] + flow_weight * features['flow'] + burst_weight * features['burst']
+
+    def route_for(self, score: float) -> str:
+        if score >= self.llm_threshold:
+            return LLM
+        if score >= self.template_threshold or not self.digest_enabled:
+            return TEMPLATE
+        return DIGEST
+
+    def route(self, alert) -> tuple:
+        """(score, route) for the alert, updating its symbol's history."""
+        score = self.score(alert)
+        route = self.route_for(score)
+        self.routed[route] += 1
+        logger.debug("Pre-score %.2f for %s alert worth $%.0f -> %s.", score, alert.symbol, alert.value_usd, route)
+        return score, route
+
+    def stats(self) -> dict:
+        return {
+            'symbols': len(self._symbols),
+            'routed_llm': self.routed[LLM],
+            'routed_template': self.routed[TEMPLATE],
+            'routed_digest': self.routed[DIGEST],
+        }
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from alerts import listen_for_alerts
+from dedup import DedupIndex
+from config import WHALE_SUBSCRIPTIONS, WHALE_SUBSCRIPTION_MSG
+
+"""
+Splits the Whale Alert feed into subscription shards.
+Each shard is its own WebSocket connection with its own blockchains, symbols,
+minimum value and reconnect/backfill cycle. merge_streams runs every shard in
+its own task and funnels their alerts into one async stream, so a shard that
+is reconnecting or stuck never holds up the others. Shards share one
+DedupIndex, so a transfer matched by two shards is yielded once.
+
+WHALE_SUBSCRIPTIONS holds either a JSON list or a path to a JSON file, e.g.
+[{"name": "majors", "blockchains": ["bitcoin", "ethereum"], "symbols": ["btc", "eth"], "min_value_usd": 1000000},
+ {"name": "stables", "blockchains": ["tron", "ethereum"], "symbols": ["usdt", "usdc"], "min_value_usd": 5000000}]
+Without it, the single WHALE_SUBSCRIPTION_MSG subscription is used.
+"""
+
+logger = logging.getLogger(__name__)
+
+MERGE_QUEUE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class Subscription:
+    name: str
+    blockchains: tuple
+    symbols: tuple
+    min_value_usd: float = 0
+
+    def message(self) -> dict:
+        """The subscribe_alerts request sent when the shard connects."""
+        return {
+            "type": "subscribe_alerts",
+            "blockchains": list(self.blockchains),
+            "symbols": list(self.symbols),
+            "min_value_usd": self.min_value_usd,
+        }
+
+
+def _subscription(raw: dict, index: int) -> Subscription:
+    symbols = tuple(s.lower() for s in raw.get('symbols') or ())
+    if not symbols:
+        raise ValueError(f"Subscription without symbols: {raw}")
+    return Subscription(
+        name=raw.get('name') or f"shard-{index}",
+        blockchains=tuple(b.lower() for b in raw.get('blockchains') or ()),
+        symbols=symbols,
+        min_value_usd=raw.get('min_value_usd', 0),
+    )
+
+
+def load_subscriptions(setting: str = WHALE_SUBSCRIPTIONS, default: dict = WHALE_SUBSCRIPTION_MSG) -> list:
+    if not setting:
+        return [_subscription(dict(default, name='default'), 0)]
+    if setting.lstrip().startswith('['):
+        raw_subscriptions = json.loads(setting)
+    else:
+        with open(os.path.expanduser(setting)) as f:
+            raw_subscriptions = json.load(f)
+    subscriptions = [_subscription(raw, index) for index, raw in enumerate(raw_subscriptions)]
+    if not subscriptions:
+        raise ValueError("WHALE_SUBSCRIPTIONS is empty.")
+    names = [subscription.name for subscription in subscriptions]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate subscription names: {names}")
+    return subscriptions
+
+
+def subscribed_symbols(subscriptions: list) -> list:
+    """Unique symbols across all shards, in first-seen order."""
+    return list(dict.fromkeys(symbol for subscription in subscriptions for symbol in subscription.symbols))
+
+
+async def merge_streams(streams: dict):
+    """
+    Yields items from several async iterators (keyed by name) as they arrive.
+    A stream that fails is logged and dropped; the merge ends once every stream has ended.
+    """
+    queue = asyncio.Queue(maxsize=MERGE_QUEUE_SIZE)
+    finished = object()
+
+    async def pump(name: str, stream):
+        try:
+            async for item in stream:
+                await queue.put(item)
+        except Exception as e:
+            logger.error(f"Subscription shard '{name}' failed: {e}", exc_info=True)
+        await queue.put(finished)
+
+    tasks = [asyncio.create_task(pump(name, stream), name=f"shard-{name}") for name, stream in streams.items()]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is finished:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def listen_to_shards(websocket_url: str, subscriptions: list, reconnect: bool = True, make_backfill=None,
+                     seen: DedupIndex = None):
+    """
+    One merged alert stream over every subscription shard.
+    `make_backfill(subscription)` optionally returns the backfill callable for a shard.
+    """
+    seen = seen if seen is not None else DedupIndex()
+    streams = {}
+    for subscription in subscriptions:
+        backfill = make_backfill(subscription) if make_backfill else None
+        streams[subscription.name] = listen_for_alerts(websocket_url, subscription.message(), reconnect, backfill, seen)
+    if len(streams) == 1:
+        return next(iter(streams.values()))
+    return merge_streams(streams)
@@ -1,35 +1,73 @@
+import asyncio
 import httpx
 import logging
-from telegram.constants import ParseMode 
-from config import TELEGRAM_TIMEOUT_SECONDS 
+import time
+from collections import deque
+from config import (
+    TELEGRAM_API_BASE_URL, TELEGRAM_TIMEOUT_SECONDS, TELEGRAM_GLOBAL_RATE_PER_SECOND, TELEGRAM_CHAT_RATE_PER_MINUTE,
+    TELEGRAM_CHAT_BURST, TELEGRAM_MAX_RETRIES, TELEGRAM_SENDER_CONCURRENCY, TELEGRAM_EDIT_INTERVAL_SECONDS,
+)
 import json
+from metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+from log_context import alert_id
 
 """
-Sends an alert message to the specified Telegram chat using httpx, in this case to a telegram channel 
+Sends an alert message to the specified Telegram chat using httpx, in this case to a telegram channel
 with all the info.
+TelegramSender is the outbound delivery subsystem used by the alerter: messages
+are queued per chat, paced by a global and a per-chat token bucket, retried with
+exponential backoff (honoring 429 retry_after), and queued messages for the same
+chat are coalesced into one send up to Telegram's 4096-character limit.
+LiveMessage posts a message once and then edits it in place (editMessageText)
+at a throttled cadence, e.g. while a streamed LLM analysis fills in.
 """
 
 logger = logging.getLogger(__name__)
 
+PARSE_MODE_MARKDOWN = "Markdown"  # Bot API parse_mode value (telegram.constants.ParseMode.MARKDOWN)
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+
+
+async def _post_message(client: httpx.AsyncClient, bot_token: str, chat_id: str, message: str,
+                        parse_mode: str = PARSE_MODE_MARKDOWN) -> httpx.Response:
+    url = f"{TELEGRAM_API_BASE_URL}/bot{bot_token}/sendMessage"
+    payload = {
+        'chat_id': chat_id,
+        'text': message,
+    }
+    if parse_mode:
+        payload['parse_mode'] = parse_mode
+    logger.debug("Sending message to Telegram chat ID: %s", chat_id)
+    return await client.post(url, json=payload)
+
+
+async def _edit_message(client: httpx.AsyncClient, bot_token: str, chat_id: str, message_id: int, message: str,
+                        parse_mode: str = PARSE_MODE_MARKDOWN) -> httpx.Response:
+    url = f"{TELEGRAM_API_BASE_URL}/bot{bot_token}/editMessageText"
+    payload = {
+        'chat_id': chat_id,
+        'message_id': message_id,
+        'text': message,
+    }
+    if parse_mode:
+        payload['parse_mode'] = parse_mode
+    logger.debug("Editing message %s in Telegram chat ID: %s", message_id, chat_id)
+    return await client.post(url, json=payload)
+
+
 async def send_telegram_alert(client: httpx.AsyncClient, bot_token: str, chat_id: str, message: str):
     if not bot_token or not chat_id:
         logger.error("Telegram bot token or chat ID is missing. Cannot send alert.")
-        return False 
+        return False
     try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': ParseMode.MARKDOWN 
-        }
-        logger.debug(f"Sending message to Telegram chat ID: {chat_id}")
-        response = await client.post(url, json=payload, timeout=TELEGRAM_TIMEOUT_SECONDS)
+        response = await _post_message(client, bot_token, chat_id, message)
         if response.status_code >= 400:
              logger.error(f"Telegram API Error {response.status_code}: {response.text}")
              return False
         else:
             logger.info("Telegram alert sent successfully!")
-            return True 
+            return True
     except httpx.TimeoutException:
          logger.error(f"Telegram API request timed out after {TELEGRAM_TIMEOUT_SECONDS} seconds.")
     except httpx.RequestError as e:
@@ -38,4 +76,336 @@ async def send_telegram_alert(client: httpx.AsyncClient, bot_token: str, chat_id
          logger.error(f"Failed to decode Telegram API JSON response: {e}. Response text: {response.text if 'response' in locals() else 'N/A'}")
     except Exception as e:
         logger.error(f"Unexpected error sending Telegram alert: {e}", exc_info=True)
-    return False
\ No newline at end of file
+    return False
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def block_for(self, seconds: float):
+        """Pauses the bucket, e.g. for a 429 retry_after."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0)
+
+
+class _Outgoing:
+    __slots__ = ('text', 'enqueued_at', 'future', 'message_id', 'coalesce', 'alert_id')
+
+    def __init__(self, text: str, future: asyncio.Future, message_id: int = None, coalesce: bool = True):
+        self.text = text
+        self.enqueued_at = time.monotonic()
+        self.future = future
+        self.message_id = message_id
+        self.coalesce = coalesce and message_id is None
+        self.alert_id = alert_id.get()
+
+
+class TelegramSender:
+    """Rate-limit-aware, retrying, coalescing delivery queue for Telegram messages."""
+
+    def __init__(self, client: httpx.AsyncClient, bot_token: str,
+                 global_rate: float = TELEGRAM_GLOBAL_RATE_PER_SECOND,
+                 chat_rate_per_minute: float = TELEGRAM_CHAT_RATE_PER_MINUTE,
+                 chat_burst: int = TELEGRAM_CHAT_BURST,
+                 max_retries: int = TELEGRAM_MAX_RETRIES,
+                 concurrency: int = TELEGRAM_SENDER_CONCURRENCY):
+        self.client = client
+        self.bot_token = bot_token
+        self.max_retries = max_retries
+        self.concurrency = max(1, concurrency)
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate_per_minute / 60.0
+        self.chat_burst = chat_burst
+        self._chat_buckets = {}
+        self._pending = {}
+        self._ready = asyncio.Queue()
+        self._workers = []
+        self.sent = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=1000)
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"telegram-sender-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Telegram sender started ({self.concurrency} workers, global {self.global_bucket.rate}/s, "
+                    f"per chat {self.chat_rate * 60:.0f}/min).")
+
+    def enqueue(self, chat_id: str, text: str, coalesce: bool = True) -> asyncio.Future:
+        """
+        Queues `text` for `chat_id`. The returned future resolves to the Telegram result dict or None.
+        Pass coalesce=False for messages that will be edited later, so they keep their own message_id.
+        """
+        return self._queue(chat_id, _Outgoing(text, asyncio.get_running_loop().create_future(), coalesce=coalesce))
+
+    def edit(self, chat_id: str, message_id: int, text: str) -> asyncio.Future:
+        """Queues an editMessageText for a previously sent message; paced like any other send."""
+        return self._queue(chat_id, _Outgoing(text, asyncio.get_running_loop().create_future(), message_id=message_id))
+
+    def _queue(self, chat_id: str, item: _Outgoing) -> asyncio.Future:
+        chat_queue = self._pending.get(chat_id)
+        if chat_queue is None:
+            chat_queue = self._pending[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        chat_queue.append(item)
+        return item.future
+
+    def broadcast(self, chat_ids: list, text: str) -> list:
+        """Queues the same rendered `text` for every chat in `chat_ids`."""
+        return [self.enqueue(chat_id, text) for chat_id in chat_ids]
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _take_batch(self, chat_queue: deque) -> list:
+        """Pops queued messages for one chat that fit together in a single Telegram message."""
+        batch = [chat_queue.popleft()]
+        if not batch[0].coalesce:
+            return batch
+        length = len(batch[0].text)
+        while chat_queue and chat_queue[0].coalesce and length + len(COALESCE_SEPARATOR) + len(chat_queue[0].text) <= TELEGRAM_MAX_MESSAGE_LENGTH:
+            length += len(COALESCE_SEPARATOR) + len(chat_queue[0].text)
+            batch.append(chat_queue.popleft())
+        if len(batch) > 1:
+            self.coalesced += len(batch) - 1
+        return batch
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            try:
+                await self._deliver_next(chat_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Telegram sender failed for chat %s: %s", chat_id, e, exc_info=True)
+            finally:
+                chat_queue = self._pending.get(chat_id)
+                if chat_queue:
+                    self._ready.put_nowait(chat_id)
+                else:
+                    self._pending.pop(chat_id, None)
+                self._ready.task_done()
+
+    async def _wait_for_tokens(self, chat_bucket: TokenBucket):
+        while True:
+            wait = max(chat_bucket.delay(), self.global_bucket.delay())
+            if wait <= 0:
+                chat_bucket.take()
+                self.global_bucket.take()
+                return
+            await asyncio.sleep(wait)
+
+    async def _deliver_next(self, chat_id: str):
+        chat_queue = self._pending[chat_id]
+        batch = self._take_batch(chat_queue)
+        alert_id.set(batch[0].alert_id)
+        text = COALESCE_SEPARATOR.join(item.text for item in batch)
+        chat_bucket = self._bucket(chat_id)
+        message_id = batch[0].message_id
+        parse_mode = PARSE_MODE_MARKDOWN
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_tokens(chat_bucket)
+            self.sent += 1
+            started = time.monotonic()
+            try:
+                if message_id is None:
+                    response = await _post_message(self.client, self.bot_token, chat_id, text, parse_mode)
+                else:
+                    response = await _edit_message(self.client, self.bot_token, chat_id, message_id, text, parse_mode)
+            except (httpx.TimeoutException, httpx.RequestError) as e:
+                UPSTREAM_ERRORS.labels('telegram', 'timeout' if isinstance(e, httpx.TimeoutException) else 'network').inc()
+                logger.warning("Telegram send to %s failed (%s), attempt %d.", chat_id, e.__class__.__name__, attempt + 1)
+                await self._backoff(attempt)
+                continue
+            UPSTREAM_SECONDS.labels('telegram').observe(time.monotonic() - started)
+            if response.status_code >= 400:
+                UPSTREAM_ERRORS.labels('telegram', str(response.status_code)).inc()
+            if response.status_code < 400:
+                self._complete(batch, response)
+                return
+            if response.status_code == 429:
+                self.rate_limited += 1
+                retry_after = self._retry_after(response)
+                logger.warning("Telegram rate limited chat %s; retrying after %ss.", chat_id, retry_after)
+                chat_bucket.block_for(retry_after)
+                continue
+            if response.status_code == 400 and message_id is not None and "message is not modified" in response.text:
+                self._complete(batch, response)
+                return
+            if response.status_code == 400 and parse_mode and "can't parse entities" in response.text:
+                logger.warning("Telegram rejected Markdown for chat %s; resending as plain text.", chat_id)
+                parse_mode = None
+                continue
+            if response.status_code >= 500:
+                logger.warning("Telegram API Error %d for chat %s, attempt %d.", response.status_code, chat_id, attempt + 1)
+                await self._backoff(attempt)
+                continue
+            logger.error("Telegram API Error %d: %s", response.status_code, response.text)
+            break
+        self._fail(batch, chat_id)
+
+    async def _backoff(self, attempt: int):
+        self.retries += 1
+        await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        try:
+            return float(response.json().get('parameters', {}).get('retry_after', 1))
+        except (ValueError, AttributeError):
+            return float(response.headers.get('retry-after', 1))
+
+    def _complete(self, batch: list, response: httpx.Response):
+        now = time.monotonic()
+        try:
+            result = response.json().get('result')
+        except ValueError:
+            result = None
+        for item in batch:
+            self.delivered += 1
+            self.latencies.append(now - item.enqueued_at)
+            if not item.future.done():
+                item.future.set_result(result)
+        logger.info("Telegram alert sent successfully! (%d message(s), delivery latency %.2fs)",
+                    len(batch), now - batch[0].enqueued_at)
+
+    def _fail(self, batch: list, chat_id: str):
+        self.failed += len(batch)
+        logger.error("Giving up on %d Telegram message(s) for chat %s.", len(batch), chat_id)
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(None)
+
+    async def close(self, drain_timeout: float = 10.0):
+        """Waits up to `drain_timeout` for queued messages to go out, then stops the workers."""
+        if self._workers and self.queued():
+            try:
+                await asyncio.wait_for(self._ready.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Telegram sender drain timed out; {self.queued()} message(s) not delivered.")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def pct(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        return {
+            'queued': self.queued(),
+            'sent_requests': self.sent,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'coalesced': self.coalesced,
+            'delivery_latency_p50': pct(0.50),
+            'delivery_latency_p95': pct(0.95),
+            'delivery_latency_max': latencies[-1] if latencies else 0.0,
+        }
+
+
+class LiveMessage:
+    """
+    One logical message, posted to each chat once and then edited in place.
+    update() is throttled to one edit round per `min_interval` with at most one in
+    flight; texts superseded in between are skipped. finish() always lands the final text,
+    and updates arriving after it (e.g. from a stream that outlived the latency budget) are ignored.
+    """
+
+    def __init__(self, sender: TelegramSender, chat_ids: list, min_interval: float = TELEGRAM_EDIT_INTERVAL_SECONDS):
+        self.sender = sender
+        self.chat_ids = list(chat_ids)
+        self.min_interval = min_interval
+        self.message_ids = {}
+        self.edits = 0
+        self._posted = None
+        self._in_flight = None
+        self._last_text = None
+        self._last_edit_at = 0.0
+        self._finished = False
+
+    def post(self, text: str):
+        """Sends the initial message to every chat without waiting for delivery."""
+        self._last_text = text
+        futures = [self.sender.enqueue(chat_id, text, coalesce=False) for chat_id in self.chat_ids]
+        self._posted = asyncio.ensure_future(self._collect_message_ids(futures))
+
+    async def _collect_message_ids(self, futures: list):
+        results = await asyncio.gather(*futures)
+        for chat_id, result in zip(self.chat_ids, results):
+            if result and result.get('message_id') is not None:
+                self.message_ids[chat_id] = result['message_id']
+        self._last_edit_at = time.monotonic()
+
+    def update(self, text: str):
+        if self._finished or not self.message_ids or text == self._last_text:
+            return
+        if self._in_flight is not None and not self._in_flight.done():
+            return
+        if time.monotonic() - self._last_edit_at < self.min_interval:
+            return
+        self._in_flight = self._edit(text)
+
+    def _edit(self, text: str) -> asyncio.Future:
+        self._last_text = text
+        self._last_edit_at = time.monotonic()
+        self.edits += 1
+        return asyncio.gather(*(
+            self.sender.edit(chat_id, message_id, text) for chat_id, message_id in self.message_ids.items()
+        ))
+
+    async def finish(self, text: str):
+        """Waits for the initial post and any edit in flight, then sets the final text everywhere."""
+        self._finished = True
+        if self._posted is not None:
+            await self._posted
+        if self._in_flight is not None:
+            await self._in_flight
+        if self.message_ids and text != self._last_text:
+            await self._edit(text)
+        unposted = [chat_id for chat_id in self.chat_ids if chat_id not in self.message_ids]
+        if unposted:
+            logger.warning(f"Initial message not delivered to {len(unposted)} chat(s); sending final text instead.")
+            await asyncio.gather(*(self.sender.enqueue(chat_id, text) for chat_id in unposted))
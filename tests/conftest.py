@@ -0,0 +1,34 @@
+import pytest
+
+from alerts import WhaleAlert
+
+"""
+Shared test fixtures: a settable clock for components that take a `clock`
+callable, and a WhaleAlert factory with a default for every field, so each
+test spells out only the fields it exercises.
+"""
+
+ALERT_DEFAULTS = dict(symbol="BTC", blockchain="BITCOIN", amount=1.0, value_usd=1_000_000.0,
+                      from_owner="unknown", to_owner="unknown")
+
+
+class FakeClock:
+    """Stands in for time.monotonic / time.time; tests move time by setting `now`."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_alert():
+    def make(**fields) -> WhaleAlert:
+        return WhaleAlert(**{**ALERT_DEFAULTS, **fields})
+    return make
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import random
+
+import httpx
+import websockets
+
+import alerts
+from alerts import Backoff, listen_for_alerts
+from backfill import fetch_transactions, transaction_to_alert
+
+
+def _transaction(tx_hash, symbol="btc", timestamp=1760000000):
+    return {
+        "blockchain": "bitcoin", "symbol": symbol, "hash": tx_hash, "timestamp": timestamp,
+        "amount": 10, "amount_usd": 700000,
+        "from": {"address": "a", "owner": "binance", "owner_type": "exchange"},
+        "to": {"address": "b", "owner_type": "unknown"},
+    }
+
+
+def _frame(tx_hash, symbol="btc"):
+    return json.dumps({
+        "type": "alert", "symbol": symbol, "blockchain": "bitcoin", "timestamp": 1760000000,
+        "transaction": {"hash": tx_hash},
+        "from": {"owner": "binance", "owner_type": "exchange"}, "to": {"owner_type": "unknown"},
+        "amounts": [{"amount": 10, "value_usd": 700000}],
+    })
+
+
+def test_backoff_starts_small_grows_exponentially_and_resets():
+    backoff = Backoff(0.5, 8, rng=random.Random(1))
+    delays = [backoff.next() for _ in range(8)]
+    assert 0.25 <= delays[0] <= 0.5
+    assert 0.5 <= delays[1] <= 1.0 and 2.0 <= delays[3] <= 4.0
+    assert all(4.0 <= delay <= 8.0 for delay in delays[4:])
+    backoff.reset()
+    assert backoff.next() <= 0.5
+
+
+def test_transactions_page_by_cursor_and_map_to_alerts():
+    pages = []
+
+    def handle(request):
+        pages.append(dict(request.url.params))
+        if 'cursor' not in request.url.params:
+            return httpx.Response(200, json={"cursor": "next", "transactions": [_transaction(f"h{i}") for i in range(100)]})
+        return httpx.Response(200, json={"cursor": "end", "transactions": [_transaction("last", "eth")]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+            return await fetch_transactions(client, "key", 100.9, 200, min_value_usd=500_000)
+
+    transactions = asyncio.run(run())
+    assert len(transactions) == 101
+    assert pages[0]["start"] == "100" and pages[0]["min_value"] == "500000" and pages[1]["cursor"] == "next"
+    alert = transaction_to_alert(transactions[-1])
+    assert (alert.symbol, alert.blockchain, alert.tx_hash) == ("ETH", "BITCOIN", "last")
+    assert (alert.from_owner, alert.from_owner_type, alert.to_owner, alert.value_usd) == ("binance", "exchange", "unknown", 700000.0)
+
+
+def test_reconnect_backfills_the_gap_without_duplicates(monkeypatch):
+    monkeypatch.setattr(alerts, 'RECONNECT_INITIAL_DELAY_SECONDS', 0.01)
+    connections = []
+    gaps = []
+
+    async def handle(ws):
+        connections.append(ws)
+        await ws.recv()
+        await ws.send(json.dumps({"type": "subscribed_alerts"}))
+        if len(connections) == 1:
+            await ws.send(_frame("0xaaa"))
+            return
+        await ws.send(_frame("0xccc"))
+        await ws.wait_closed()
+
+    async def backfill(since, until):
+        gaps.append((since, until))
+        return [transaction_to_alert(_transaction("0xaaa")), transaction_to_alert(_transaction("0xbbb")),
+                transaction_to_alert(_transaction("0xddd", "doge"))]
+
+    async def run():
+        server = await websockets.serve(handle, '127.0.0.1', 0)
+        url = f"ws://127.0.0.1:{next(iter(server.sockets)).getsockname()[1]}"
+        stream = listen_for_alerts(url, {"symbols": ["btc"]}, backfill=backfill)
+        received = []
+        async for alert in stream:
+            received.append(alert.tx_hash)
+            if len(received) == 3:
+                break
+        await stream.aclose()
+        server.close()
+        await server.wait_closed()
+        return received
+
+    assert asyncio.run(asyncio.wait_for(run(), 10)) == ["0xaaa", "0xbbb", "0xccc"]
+    assert len(connections) == 2 and len(gaps) == 1 and gaps[0][0] < gaps[0][1]
@@ -0,0 +1,48 @@
+import asyncio
+
+from batcher import batch_alerts, merge_alerts
+
+
+async def _feed(alerts, gap=0.0):
+    for alert in alerts:
+        if gap:
+            await asyncio.sleep(gap)
+        yield alert
+
+
+async def _collect(generator):
+    return [item async for item in generator]
+
+
+def test_merge_alerts_sums_and_keeps_transfers(make_alert):
+    merged = merge_alerts([make_alert(amount=1, value_usd=100), make_alert(amount=2, value_usd=300)])
+    assert merged.amount == 3 and merged.value_usd == 400
+    assert len(merged.batch) == 2
+
+
+def test_same_symbol_alerts_within_window_are_merged(make_alert):
+    source = _feed([make_alert(amount=1, value_usd=100), make_alert(symbol="ETH", amount=5, value_usd=50),
+                    make_alert(amount=2, value_usd=200)])
+    results = asyncio.run(_collect(batch_alerts(source, window_seconds=0.2, max_batch_size=10)))
+    by_symbol = {r.symbol: r for r in results}
+    assert len(results) == 2
+    assert by_symbol['BTC'].value_usd == 300
+    assert by_symbol['ETH'].batch is None
+
+
+def test_full_batch_flushes_before_window_expires(make_alert):
+    async def run():
+        start = asyncio.get_running_loop().time()
+        gen = batch_alerts(_feed([make_alert(value_usd=1)] * 3), window_seconds=10, max_batch_size=3)
+        first = await gen.__anext__()
+        await gen.aclose()
+        return first, asyncio.get_running_loop().time() - start
+
+    first, elapsed = asyncio.run(run())
+    assert len(first.batch) == 3
+    assert elapsed < 1
+
+
+def test_window_zero_passes_alerts_through(make_alert):
+    alerts = [make_alert(value_usd=1), make_alert(amount=2, value_usd=2)]
+    assert asyncio.run(_collect(batch_alerts(_feed(alerts), window_seconds=0))) == alerts
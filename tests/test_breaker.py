@@ -0,0 +1,99 @@
+import asyncio
+
+import main
+from breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+def _breaker(clock, **overrides):
+    options = dict(slow_call_seconds=2.0, window_size=4, min_calls=4, failure_rate=0.5,
+                   open_seconds=30, half_open_calls=2, enabled=True, clock=clock)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_error_rate_and_rejects_until_cooldown(clock):
+    breaker = _breaker(clock)
+    for ok in (True, False, True):
+        permit = breaker.allow()
+        assert permit
+        breaker.record(permit, ok, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(breaker.allow(), False, 0.1)
+    assert breaker.state == OPEN and not breaker.available()
+    assert not breaker.allow() and breaker.stats()['rejected'] == 1
+    clock.now = 30
+    assert breaker.available()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(breaker.allow(), True, 2.5)
+    assert breaker.state == OPEN
+    assert breaker.stats()['slow_calls'] == 4
+
+
+def test_half_open_closes_after_trials_and_reopens_on_failure(clock):
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record(breaker.allow(), False, 0.1)
+    clock.now = 30
+    first, second = breaker.allow(), breaker.allow()
+    assert first and second and breaker.state == HALF_OPEN
+    assert breaker.allow() is None  # only half_open_calls trials at a time
+    breaker.record(first, True, 0.1)
+    breaker.record(second, False, 0.1)
+    assert breaker.state == OPEN and breaker.stats()['opened'] == 2
+
+    clock.now = 60
+    first, second = breaker.allow(), breaker.allow()
+    breaker.record(first, True, 0.1)
+    breaker.record(second, True, 0.1)
+    assert breaker.state == CLOSED and breaker.stats()['window_failure_rate'] == 0.0
+
+
+def test_only_trial_permits_decide_the_half_open_state(clock):
+    breaker = _breaker(clock, half_open_calls=1)
+    slow_call = breaker.allow()  # admitted while closed, still running when the breaker trips
+    for _ in range(4):
+        breaker.record(breaker.allow(), False, 0.1)
+    clock.now = 30
+    trial = breaker.allow()
+    breaker.record(slow_call, True, 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record(trial, True, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_disabled_breaker_never_opens(clock):
+    breaker = _breaker(clock, enabled=False)
+    for _ in range(10):
+        permit = breaker.allow()
+        assert permit
+        breaker.record(permit, False, 5.0)
+    assert breaker.state == CLOSED and breaker.stats()['failures'] == 10
+
+
+def test_open_cerebras_breaker_sends_whale_data_alone(monkeypatch, clock, make_alert):
+    open_breaker = _breaker(clock)
+    for _ in range(4):
+        open_breaker.record(open_breaker.allow(), False, 0.1)
+    sent = []
+
+    async def fake_send(client, bot_token, chat_id, message):
+        sent.append(message)
+        return True
+
+    async def no_analysis(*args, **kwargs):
+        raise AssertionError("analysis should be skipped while the breaker is open")
+
+    monkeypatch.setattr(main, "breaker_for", lambda name: open_breaker)
+    monkeypatch.setattr(main, "send_telegram_alert", fake_send)
+    monkeypatch.setattr(main, "analyze_with_llama", no_analysis)
+    alert = make_alert(amount=100.0, value_usd=7_000_000.0, from_owner="binance")
+
+    timings = asyncio.run(main.process_alert(None, alert, sources=[]))
+
+    assert timings is not None and len(sent) == 1
+    assert "Degraded alert" in sent[0] and "100.00 BTC" in sent[0]
+    assert "LLaMA Analysis" not in sent[0]
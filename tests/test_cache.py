@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from cache import AsyncCache, SQLiteCacheStore, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1 and cache.get("b") is None and cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_entries=4, stale_ttl=5)
+    cache.set("a", 1)
+    now[0] += 12
+    assert cache.get("a") is None
+    assert cache.get_entry("a") == (1, 12)
+    now[0] += 5
+    assert cache.get_entry("a") is None
+
+
+def test_async_cache_coalesces_concurrent_fetches():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return ["tweet"]
+
+    async def run():
+        cache = AsyncCache("test", ttl=60, max_entries=8)
+        results = await asyncio.gather(*(cache.get_or_fetch("#btc", fetch) for _ in range(5)))
+        results.append(await cache.get_or_fetch("#btc", fetch))
+        return results, cache.stats()
+
+    results, stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == ["tweet"] for result in results)
+    assert stats['misses'] == 1 and stats['coalesced'] == 4 and stats['hits'] == 1
+
+
+def test_async_cache_serves_stale_while_refreshing():
+    values = iter(["old", "new"])
+
+    async def fetch():
+        return next(values)
+
+    async def run():
+        cache = AsyncCache("test", ttl=0.01, max_entries=8, stale_ttl=60)
+        first = await cache.get_or_fetch("k", fetch)
+        await asyncio.sleep(0.02)
+        stale = await cache.get_or_fetch("k", fetch)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return first, stale, cache.entries.get_entry("k")[0], cache.stats()
+
+    first, stale, refreshed, stats = asyncio.run(run())
+    assert (first, stale, refreshed) == ("old", "old", "new")
+    assert stats['stale_hits'] == 1 and stats['refreshes'] == 1
+
+
+def test_async_cache_does_not_store_failed_fetches():
+    async def fetch():
+        return None
+
+    async def run():
+        cache = AsyncCache("test", ttl=60, max_entries=8)
+        await cache.get_or_fetch("k", fetch)
+        return len(cache.entries)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def fetch():
+        return {"analysis": "Bullish"}
+
+    first = AsyncCache("llama", ttl=60, max_entries=8, store=SQLiteCacheStore(path, "llama"))
+    asyncio.run(first.get_or_fetch("k", fetch))
+    first.store.close()
+
+    async def unexpected_fetch():
+        raise AssertionError("should be served from disk")
+
+    restarted = AsyncCache("llama", ttl=60, max_entries=8, store=SQLiteCacheStore(path, "llama"))
+    assert asyncio.run(restarted.get_or_fetch("k", unexpected_fetch)) == {"analysis": "Bullish"}
+    assert restarted.disk_hits == 1
+    assert restarted.store.prune(max_age=60) == 0
@@ -0,0 +1,39 @@
+import asyncio
+from collections import Counter
+
+from cluster import WorkerPool, worker_for
+
+
+def _echo_worker(index, processes, inbox, results):
+    """Stand-in worker: reports which process handled each alert."""
+    while (alert := inbox.get()) is not None:
+        results.put((alert, f"done-by-{index}"))
+
+
+def test_symbol_routing_is_stable_and_spreads_symbols():
+    symbols = ['BTC', 'ETH', 'USDT', 'USDC', 'SOL', 'XRP', 'TRX', 'DOGE', 'LINK', 'MATIC', 'ADA', 'DOT']
+    assignments = [worker_for(symbol, 4) for symbol in symbols]
+    assert assignments == [worker_for(symbol.lower(), 4) for symbol in symbols]
+    assert len(set(assignments)) > 1
+
+
+def test_pool_delivers_every_alert_to_its_symbols_worker_and_reports_back(make_alert):
+    outcomes = []
+
+    async def run():
+        pool = WorkerPool(processes=3, queue_size=4, on_result=lambda alert, state: outcomes.append((alert, state)),
+                          target=_echo_worker)
+        pool.start()
+        for i in range(30):
+            await pool.submit(make_alert(symbol=['BTC', 'ETH', 'SOL', 'XRP'][i % 4], tx_hash=f"0x{i}"))
+        await pool.close(drain_timeout=10)
+        return pool.stats()
+
+    stats = asyncio.run(asyncio.wait_for(run(), 60))
+    assert stats['submitted'] == stats['completed'] == 30 and stats['alive'] == 0
+    assert sorted(alert.tx_hash for alert, _ in outcomes) == sorted(f"0x{i}" for i in range(30))
+    handled_by = {alert.symbol: Counter() for alert, _ in outcomes}
+    for alert, state in outcomes:
+        handled_by[alert.symbol][state] += 1
+    for symbol, states in handled_by.items():
+        assert list(states) == [f"done-by-{worker_for(symbol, 3)}"]
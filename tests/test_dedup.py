@@ -0,0 +1,52 @@
+import hashlib
+
+import pytest
+
+from dedup import DedupIndex, RotatingBloomFilter, alert_key, dedup_key
+
+
+def test_key_is_a_digest_of_the_journal_alert_key(make_alert):
+    # REST backfill and the stream may disagree on owners and USD value for the same transfer.
+    assert dedup_key(make_alert(tx_hash='0xabc')) == dedup_key(make_alert(tx_hash='0xabc', value_usd=69000.0,
+                                                                          from_owner='binance'))
+    assert dedup_key(make_alert(tx_hash='0xabc')) == dedup_key(make_alert(tx_hash='0xABC'))
+    assert dedup_key(make_alert(tx_hash='0xabc')) != dedup_key(make_alert(tx_hash='0xabc', symbol='USDT'))
+    assert dedup_key(make_alert(tx_hash='0xabc')) != dedup_key(make_alert(tx_hash='0xabc', blockchain='ETHEREUM'))
+    # Without a hash the key is symbol, amount and timestamp, so owners and value are ignored there too.
+    assert dedup_key(make_alert()) == dedup_key(make_alert(value_usd=69000.0, from_owner='binance',
+                                                           to_owner='coinbase'))
+    assert dedup_key(make_alert()) != dedup_key(make_alert(amount=2.0))
+    assert dedup_key(make_alert()) != dedup_key(make_alert(timestamp=1760000001))
+    digest = hashlib.blake2b(alert_key(make_alert(tx_hash='0xabc')).encode(), digest_size=8).digest()
+    assert dedup_key(make_alert(tx_hash='0xabc')) == int.from_bytes(digest, 'little')
+
+
+@pytest.mark.parametrize('backend', ['sets', 'bloom'])
+def test_duplicates_are_dropped_within_the_window_and_forgotten_after(backend, clock, make_alert):
+    index = DedupIndex(window=60, backend=backend, capacity=1000, error_rate=0.001, clock=clock)
+    assert index.add(make_alert(tx_hash='0x1'))
+    clock.now = 59
+    assert not index.add(make_alert(tx_hash='0x1'))
+    clock.now = 61
+    assert not index.add(make_alert(tx_hash='0x1'))  # previous generation still remembers it
+    clock.now = 185
+    assert index.add(make_alert(tx_hash='0x1'))
+    assert index.stats()['duplicates'] == 2 and index.stats()['checked'] == 4
+
+
+@pytest.mark.parametrize('backend', ['sets', 'bloom'])
+def test_memory_stays_flat_on_a_continuous_stream(backend, clock, make_alert):
+    index = DedupIndex(window=60, backend=backend, capacity=1000, error_rate=0.001, clock=clock)
+    for i in range(20_000):
+        clock.now = i * 0.1  # 10 alerts/s, so 600 keys per window
+        index.add(make_alert(tx_hash=f"0x{i:x}"))
+    assert index.stats()['entries'] <= 1200
+    assert index.stats()['duplicates'] <= 20_000 * 0.001 * 2  # only Bloom false positives
+
+
+def test_bloom_false_positive_rate_stays_near_target(clock, make_alert):
+    bloom = RotatingBloomFilter(window=3600, capacity=5000, error_rate=0.01, clock=clock)
+    for i in range(5000):
+        bloom.add(dedup_key(make_alert(tx_hash=f"0xseen{i}")))
+    false_positives = sum(not bloom.add(dedup_key(make_alert(tx_hash=f"0xnew{i}"))) for i in range(5000))
+    assert false_positives < 5000 * 0.03
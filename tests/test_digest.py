@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+import main
+from digest import DigestAggregator, RollingAggregate, format_digest
+
+
+@pytest.fixture
+def transfer(make_alert):
+    """A transfer from an unattributed whale into Binance unless the owners are given."""
+    def make(value_usd, from_owner="whale", from_type="unknown", to_owner="binance", to_type="exchange", **fields):
+        return make_alert(amount=value_usd / 50_000, value_usd=value_usd, from_owner=from_owner, to_owner=to_owner,
+                          from_owner_type=from_type, to_owner_type=to_type, **fields)
+    return make
+
+
+def test_totals_flows_largest_and_top_owners(transfer):
+    aggregate = RollingAggregate(600, buckets=10)
+    aggregate.add(transfer(1_000_000), 0)
+    aggregate.add(transfer(3_000_000, "kraken", "exchange", "cold wallet", "unknown"), 30)
+    aggregate.add(transfer(500_000, "kraken", "exchange", "binance", "exchange"), 90)
+    stats = aggregate.snapshot(100)
+    assert stats['count'] == 3 and stats['volume_usd'] == 4_500_000
+    assert stats['inflow_usd'] == 1_000_000 and stats['outflow_usd'] == 3_000_000
+    assert stats['largest'][0] == 3_000_000 and stats['largest'][2:] == ("kraken", "cold wallet")
+    # Unattributed wallets ("whale", "cold wallet") are not ranked.
+    assert stats['top_owners'] == [("kraken", 3_500_000), ("binance", 1_500_000)]
+
+
+def test_slots_age_out_of_the_window_without_rescanning(transfer):
+    aggregate = RollingAggregate(600, buckets=10)
+    aggregate.add(transfer(1_000_000), 0)
+    aggregate.add(transfer(2_000_000, to_owner="okx"), 300)
+    assert aggregate.snapshot(599)['count'] == 2
+    # The first slot expires once the window has moved past it.
+    stats = aggregate.snapshot(660)
+    assert stats['count'] == 1 and stats['volume_usd'] == 2_000_000
+    assert [owner for owner, _ in stats['top_owners']] == ["okx"]
+    # A new alert reusing an old slot evicts it first.
+    aggregate.add(transfer(4_000_000), 960)
+    stats = aggregate.snapshot(960)
+    assert stats['count'] == 1 and stats['largest'][0] == 4_000_000
+    assert aggregate.snapshot(5000)['count'] == 0 and aggregate.volume_usd == 0.0
+
+
+def test_memory_stays_constant_under_sustained_load(transfer):
+    aggregate = RollingAggregate(60, buckets=6, max_owners=4)
+    for second in range(0, 100_000, 3):
+        aggregate.add(transfer(1_000 + second % 7, to_owner=f"exchange-{second}"), second)
+    assert len(aggregate._counts) == 6
+    assert len(aggregate._owner_totals) <= 6 * 4
+    assert sys.getsizeof(aggregate._owners) == sys.getsizeof([None] * 6)
+    assert aggregate.snapshot(99_999)['count'] == 20
+
+
+def test_aggregator_tracks_every_window_per_symbol_and_formats(clock, transfer):
+    clock.now = 1_000_000.0
+    digest = DigestAggregator(windows=(3600, 900), buckets=12, clock=clock)
+    digest.add(transfer(1_000_000))
+    clock.now += 1200
+    digest.add(transfer(2_000_000, symbol="ETH"))
+    snapshot = digest.snapshot()
+    assert [stats['count'] for stats in snapshot['BTC']] == [0, 1]
+    assert [stats['count'] for stats in snapshot['ETH']] == [1, 1]
+    text = format_digest(snapshot)
+    assert "BTC:\n  last 15m: 0 transfers" in text and "last 1h: 1 transfers" in text
+    clock.now += 7200
+    assert digest.snapshot() == {}
+    assert digest.stats() == {'symbols': 2, 'observed': 2}
+
+
+def test_long_digests_are_split_by_symbol_under_the_message_limit(clock, transfer):
+    digest = DigestAggregator(windows=(900, 3600), buckets=12, clock=clock)
+    symbols = [f"COIN{index}" for index in range(10)]
+    for symbol in symbols:
+        for index in range(5):
+            digest.add(transfer(1_000_000 * (index + 1), f"exchange-{index}", "exchange", f"custody-{index}",
+                                "exchange", symbol=symbol))
+    snapshot = digest.snapshot()
+    assert len(format_digest(snapshot)) > 4096
+
+    messages = main.render_digest_messages(snapshot, "summary " * 100)
+    assert len(messages) > 1 and all(len(message) <= 4096 for message in messages)
+    assert "Whale Digest (1/" in messages[0] and "LLaMA Summary" in messages[-1]
+    # Each symbol's block stays whole, in one message.
+    assert [sum(f"{symbol}:\n" in message for message in messages) for symbol in symbols] == [1] * 10
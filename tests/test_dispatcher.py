@@ -0,0 +1,89 @@
+import asyncio
+
+from dispatcher import AlertDispatcher
+
+
+def _drain(queue) -> list:
+    """Values of the queued alerts, in dequeue order, through the public Queue API."""
+    values = []
+    while queue.qsize():
+        _, alert = queue.get_nowait()
+        queue.task_done()
+        values.append(alert.value_usd)
+    return values
+
+
+def test_workers_process_all_alerts_and_drain_on_close(make_alert):
+    processed = []
+
+    async def handler(alert):
+        await asyncio.sleep(0.01)
+        processed.append(alert.symbol)
+
+    async def run():
+        dispatcher = AlertDispatcher(handler, workers=2, queue_size=10, overflow_policy="block")
+        dispatcher.start()
+        for i in range(6):
+            await dispatcher.submit(make_alert(symbol=f"S{i}", value_usd=i))
+        await dispatcher.close(drain_timeout=5)
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert sorted(processed) == [f"S{i}" for i in range(6)]
+    assert stats['processed'] == 6 and stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+
+def test_drop_oldest_evicts_head_of_queue(make_alert):
+    async def run():
+        dispatcher = AlertDispatcher(lambda alert: asyncio.sleep(0), workers=1, queue_size=2,
+                                     overflow_policy="drop_oldest")
+        for value in (1, 2, 3):
+            await dispatcher.submit(make_alert(value_usd=value))
+        return _drain(dispatcher.queue), dispatcher.dropped
+
+    queued, dropped = asyncio.run(run())
+    assert queued == [2, 3]
+    assert dropped == 1
+
+
+def test_drop_lowest_value_keeps_biggest_alerts(make_alert):
+    async def run():
+        dispatcher = AlertDispatcher(lambda alert: asyncio.sleep(0), workers=1, queue_size=2,
+                                     overflow_policy="drop_lowest_value")
+        accepted = [await dispatcher.submit(make_alert(symbol="ETH", value_usd=value)) for value in (500, 100, 900, 50)]
+        queued = sorted(_drain(dispatcher.queue))
+        # The eviction was accounted for, so join() does not wait on a task that is gone.
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=1)
+        return accepted, queued
+
+    accepted, queued = asyncio.run(run())
+    assert accepted == [True, True, True, False]
+    assert queued == [500, 900]
+
+
+def test_handler_errors_are_counted_not_raised(make_alert):
+    async def handler(alert):
+        raise ValueError("boom")
+
+    async def run():
+        dispatcher = AlertDispatcher(handler, workers=1, queue_size=5, overflow_policy="block")
+        dispatcher.start()
+        await dispatcher.submit(make_alert(value_usd=1))
+        await dispatcher.close(drain_timeout=5)
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert stats['failed'] == 1 and stats['processed'] == 0
+
+
+def test_on_drop_reports_evicted_and_rejected_alerts(make_alert):
+    async def run(policy, values):
+        dropped = []
+        dispatcher = AlertDispatcher(lambda alert: asyncio.sleep(0), workers=1, queue_size=2,
+                                     overflow_policy=policy, on_drop=lambda alert: dropped.append(alert.value_usd))
+        accepted = [await dispatcher.submit(make_alert(value_usd=value)) for value in values]
+        return accepted, dropped
+
+    # Evictions of already-queued alerts still return True for the new one.
+    assert asyncio.run(run("drop_oldest", (1, 2, 3))) == ([True, True, True], [1])
+    assert asyncio.run(run("drop_lowest_value", (500, 100, 900, 50))) == ([True, True, True, False], [100, 50])
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from enrichment import EnrichmentSource, gather_context
+
+
+class _SleepySource(EnrichmentSource):
+    def __init__(self, name, delay, result=None, error=None, timeout=None):
+        self.name = name
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.timeout = timeout
+        self.cancelled = False
+
+    async def fetch(self, client, whale_data):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_sources_run_concurrently_and_slow_ones_are_dropped():
+    fast = _SleepySource("fast", 0.05, result=["tweet"])
+    also_fast = _SleepySource("news", 0.05, result="headline")
+    slow = _SleepySource("slow", 5, result="never")
+
+    start = time.monotonic()
+    context = asyncio.run(gather_context(None, {'symbol': 'BTC'}, [fast, also_fast, slow], budget=0.2))
+    elapsed = time.monotonic() - start
+
+    assert context == {'fast': ["tweet"], 'news': "headline"}
+    assert slow.cancelled
+    assert elapsed < 1
+
+
+def test_failing_and_per_source_timeouts_are_skipped():
+    broken = _SleepySource("broken", 0, error=RuntimeError("down"))
+    timed = _SleepySource("timed", 1, timeout=0.01)
+    ok = _SleepySource("ok", 0, result=1)
+
+    context = asyncio.run(gather_context(None, {'symbol': 'ETH'}, [broken, timed, ok], budget=2))
+    assert context == {'ok': 1}
+
+
+def test_no_sources_returns_empty_context():
+    assert asyncio.run(gather_context(None, {}, [], budget=1)) == {}
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+
+from http_clients import HostConfig, HttpClients, PooledTransport
+
+
+def test_host_timeouts_override_per_request_timeouts():
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions['timeout'])
+        return httpx.Response(200)
+
+    host = HostConfig('telegram', 'https://api.telegram.org', 7.0)
+
+    async def scenario():
+        pool = PooledTransport(host, transport=httpx.MockTransport(handler))
+        async with httpx.AsyncClient(mounts={host.origin: pool}) as client:
+            await client.get("https://api.telegram.org/bot/getMe", timeout=None)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert seen[0]['read'] == 7.0 and seen[0]['connect'] is not None and seen[0]['pool'] is not None
+    assert pool.stats()['requests'] == 1 and pool.stats()['in_flight'] == 0
+
+
+def test_pool_stats_track_concurrency_and_saturation():
+    release = asyncio.Event()
+
+    async def handler(request):
+        await release.wait()
+        return httpx.Response(200, text="ok")
+
+    host = HostConfig('twitter', 'https://api.twitter.com', 5.0, max_connections=2)
+
+    async def scenario():
+        pool = PooledTransport(host, transport=httpx.MockTransport(handler))
+        async with httpx.AsyncClient(mounts={host.origin: pool}) as client:
+            requests = [asyncio.create_task(client.get("https://api.twitter.com/2/tweets")) for _ in range(4)]
+            await asyncio.sleep(0.05)
+            during = pool.stats()
+            release.set()
+            await asyncio.gather(*requests)
+        return during, pool.stats()
+
+    during, after = asyncio.run(scenario())
+    assert during['in_flight'] == 4 and during['utilization'] == 2.0
+    assert after == dict(after, in_flight=0, peak_in_flight=4, requests=4, saturated=2, errors=0)
+
+
+def test_prewarm_opens_connections_and_hosts_share_an_origin_pool():
+    connections = []
+
+    async def serve(reader, writer):
+        connections.append(writer)
+        while (await reader.readuntil(b"\r\n\r\n")):
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+
+    async def scenario():
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        hosts = [
+            HostConfig('telegram', f"{base_url}/telegram", 5.0, warm_connections=2),
+            HostConfig('twitter', f"{base_url}/twitter", 5.0),
+        ]
+        async with HttpClients(hosts) as http:
+            await http.prewarm(['telegram', 'missing'])
+            stats = http.stats()
+            shared = http.pools['telegram'] is http.pools['twitter']
+        server.close()
+        return stats, shared
+
+    stats, shared = asyncio.run(scenario())
+    assert shared
+    assert len(connections) == 2
+    assert stats['telegram']['requests'] == 2 and stats['telegram']['peak_in_flight'] == 2
+    assert stats['telegram']['in_flight'] == 0
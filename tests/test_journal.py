@@ -0,0 +1,73 @@
+import asyncio
+
+from journal import AlertJournal, DONE, alert_key
+
+
+async def _stream(alerts):
+    for alert in alerts:
+        yield alert
+
+
+def test_duplicates_are_skipped_and_unfinished_alerts_replayed(tmp_path, make_alert):
+    path = str(tmp_path / "journal.sqlite3")
+
+    async def first_run():
+        journal = AlertJournal(path, flush_interval=60)
+        journal.start()
+        passed = [alert async for alert in journal.filter_new(_stream([make_alert(tx_hash="a"), make_alert(tx_hash="b"), make_alert(tx_hash="a")]))]
+        journal.mark(passed[0], DONE)
+        await journal.close()
+        return passed, journal.stats()
+
+    passed, stats = asyncio.run(first_run())
+    assert [alert.tx_hash for alert in passed] == ["a", "b"]
+    assert stats['duplicates'] == 1 and stats['flushes'] == 1
+
+    restarted = AlertJournal(path)
+    assert restarted.unfinished() == [make_alert(tx_hash="b")]
+    assert not restarted.record(make_alert(tx_hash="a"))
+    assert restarted.record(make_alert(tx_hash="c"))
+
+
+def test_tracked_handler_marks_batch_members(tmp_path, make_alert):
+    journal = AlertJournal(str(tmp_path / "journal.sqlite3"))
+    members = [make_alert(tx_hash="a"), make_alert(tx_hash="b")]
+    for member in members:
+        journal.record(member)
+    batch = make_alert(amount=2.0, value_usd=2_000_000.0, batch=members)
+
+    async def handler(alert):
+        return "sent"
+
+    async def run():
+        result = await journal.track(handler)(batch)
+        await journal.close()
+        return result
+
+    assert asyncio.run(run()) == "sent"
+    assert AlertJournal(journal.path).unfinished() == []
+
+
+def test_key_falls_back_to_field_hash_without_tx_hash(make_alert):
+    assert alert_key(make_alert()) == alert_key(make_alert())
+    assert alert_key(make_alert()) != alert_key(make_alert(amount=2.0))
+
+
+def test_flush_loop_prunes_expired_alerts_while_running(tmp_path, make_alert):
+    async def run():
+        journal = AlertJournal(str(tmp_path / "journal.sqlite3"), flush_interval=0.01,
+                               retention_hours=0, prune_interval=0)
+        journal.start()
+        journal.record(make_alert(tx_hash="a"))
+        journal.mark(make_alert(tx_hash="a"), DONE)
+        journal.record(make_alert(tx_hash="b"))
+        await asyncio.sleep(0.1)
+        remaining = [row[0] for row in journal._db.execute("SELECT key FROM alerts")]
+        stats = journal.stats()
+        await journal.close()
+        return remaining, stats, journal._seen
+
+    remaining, stats, seen = asyncio.run(run())
+    # Only the finished alert is pruned; the pending one is kept for replay.
+    assert remaining == [alert_key(make_alert(tx_hash="b"))] and seen == {alert_key(make_alert(tx_hash="b"))}
+    assert stats['pruned'] == 1
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import llama
+from breaker import CircuitBreaker, CLOSED
+from cache import AsyncCache
+
+
+class _FakeCompletions:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(text=" Bullish pressure. ")])
+
+
+def test_run_inference_caps_concurrency_and_reports_queue_time(monkeypatch):
+    completions = _FakeCompletions(delay=0.05)
+    monkeypatch.setattr(llama, "async_cerebras_client", SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llama, "LLAMA_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(llama, "_semaphores", {})
+
+    async def run():
+        return await asyncio.gather(*(llama.run_inference("prompt") for _ in range(4)))
+
+    results = asyncio.run(run())
+    assert completions.peak == 2
+    assert all(result.text == "Bullish pressure." for result in results)
+    assert max(result.queue_time for result in results) >= 0.04
+
+
+def test_run_inference_times_out(monkeypatch):
+    monkeypatch.setattr(llama, "async_cerebras_client", SimpleNamespace(completions=_FakeCompletions(delay=1)))
+    monkeypatch.setattr(llama, "LLAMA_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(llama, "_semaphores", {})
+
+    result = asyncio.run(llama.run_inference("prompt"))
+    assert result.text.startswith("Error:")
+
+
+def test_cancelled_queued_call_does_not_leak_a_half_open_trial(monkeypatch):
+    breaker = CircuitBreaker("cerebras", min_calls=1, failure_rate=0.5, open_seconds=0, half_open_calls=2,
+                             enabled=True)
+    breaker.record(breaker.allow(), False, 0.1)
+    monkeypatch.setattr(llama, "breaker_for", lambda name: breaker)
+    monkeypatch.setattr(llama, "async_cerebras_client", SimpleNamespace(completions=_FakeCompletions(delay=0.05)))
+    monkeypatch.setattr(llama, "LLAMA_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(llama, "_semaphores", {})
+
+    async def run():
+        trial = asyncio.create_task(llama.run_inference("prompt"))
+        await asyncio.sleep(0.01)
+        # Queued behind the trial, then cut off (e.g. by the alert's latency budget).
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(llama.run_inference("prompt"), timeout=0.01)
+        await trial
+        return await llama.run_inference("prompt")
+
+    assert asyncio.run(run()).text == "Bullish pressure."
+    assert breaker.state == CLOSED
+
+
+def test_fingerprint_buckets_value_and_ignores_tweet_order(make_alert):
+    def whale(value_usd, to_owner_type="exchange"):
+        return make_alert(value_usd=value_usd, to_owner="binance", to_owner_type=to_owner_type)
+
+    key = llama.analysis_fingerprint(whale(5_100_000), ["a", "b"])
+    assert llama.analysis_fingerprint(whale(5_300_000), ["b", "a"]) == key
+    assert llama.analysis_fingerprint(whale(50_000_000), ["a", "b"]) != key
+    assert llama.analysis_fingerprint(whale(5_100_000, to_owner_type="unknown"), ["a", "b"]) != key
+    assert llama.analysis_fingerprint(whale(5_100_000), ["a", "b"], ["On-chain: inflow"]) != key
+
+
+def test_analysis_is_reused_for_matching_fingerprint(monkeypatch, make_alert):
+    completions = _FakeCompletions(delay=0)
+    monkeypatch.setattr(llama, "async_cerebras_client", SimpleNamespace(completions=completions))
+    monkeypatch.setattr(llama, "_semaphores", {})
+    monkeypatch.setattr(llama, "analysis_cache", AsyncCache("llama-analysis", ttl=60, max_entries=8))
+    key = llama.analysis_fingerprint(make_alert(value_usd=5_100_000, to_owner_type="exchange"), [])
+
+    async def run():
+        first = await llama.analyze_with_llama("summary", [], "BTC", cache_key=key)
+        second = await llama.analyze_with_llama("summary", [], "BTC", cache_key=key)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert (llama.analysis_cache.misses, llama.analysis_cache.hits) == (1, 1)
+    assert first[0] == second[0] == "Bullish pressure."
+    assert second[1] == 0.0
+
+
+class _FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(text=piece)])
+
+
+def test_streaming_reports_partial_text(monkeypatch):
+    async def create(**kwargs):
+        assert kwargs['stream'] is True
+        return _FakeStream(["Bull", "ish ", "pressure."])
+
+    monkeypatch.setattr(llama, "async_cerebras_client", SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llama, "_semaphores", {})
+    partials = []
+    result = asyncio.run(llama.run_inference("prompt", on_text=partials.append))
+    assert partials == ["Bull", "Bullish", "Bullish pressure."]
+    assert result.text == "Bullish pressure."
@@ -0,0 +1,34 @@
+import asyncio
+import json
+import logging
+
+from log_context import CorrelationFilter, JsonFormatter, alert_id, new_alert_id
+
+
+def test_new_alert_id_prefers_transaction_hash(make_alert):
+    assert new_alert_id(make_alert(tx_hash='0xabcdef0123456789')) == 'BTC-abcdef0123'
+    first, second = new_alert_id(make_alert()), new_alert_id(make_alert())
+    assert first.startswith('BTC-') and first != second
+
+
+def test_json_records_carry_the_alert_id_of_the_running_task(make_alert):
+    formatter = JsonFormatter()
+    correlation = CorrelationFilter()
+
+    def render(msg, *args, **kwargs):
+        record = logging.LogRecord('pulse', logging.INFO, __file__, 1, msg, args, None, **kwargs)
+        correlation.filter(record)
+        return json.loads(formatter.format(record))
+
+    async def handle(tx_hash):
+        alert_id.set(new_alert_id(make_alert(tx_hash=tx_hash)))
+        await asyncio.sleep(0)
+        return render("Processing %s alert.", 'BTC')
+
+    async def main():
+        return await asyncio.gather(handle('0x1111111111aa'), handle('0x2222222222bb'))
+
+    first, second = asyncio.run(main())
+    assert first['alert_id'] == 'BTC-1111111111' and second['alert_id'] == 'BTC-2222222222'
+    assert first['message'] == "Processing BTC alert." and first['level'] == 'INFO'
+    assert render("outside")['alert_id'] == '-'
@@ -0,0 +1,50 @@
+import asyncio
+
+from metrics import Counter, Histogram, Registry, start_metrics_server, stats_collector
+
+
+def test_exposition_renders_labels_histograms_and_collectors():
+    registry = Registry()
+    errors = Counter('test_errors_total', "Errors", ('service', 'code'), registry=registry)
+    latency = Histogram('test_latency_seconds', "Latency", ('service',), bounds=[0.1, 1.0], registry=registry)
+    errors.labels('telegram', '429').inc()
+    errors.labels('telegram', '429').inc()
+    child = latency.labels('cerebras')
+    for seconds in (0.05, 0.5, 3.0):
+        child.observe(seconds)
+    registry.register_collector(stats_collector('test_queue', lambda: {'depth': 3, 'dropped': 1, 'name': 'x'},
+                                                counters=('dropped',)))
+
+    text = registry.expose()
+    assert 'test_errors_total{service="telegram",code="429"} 2.0' in text
+    assert 'test_latency_seconds_bucket{service="cerebras",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{service="cerebras",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{service="cerebras",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{service="cerebras"} 3' in text
+    assert 'test_queue_depth 3' in text and 'test_queue_dropped_total 1' in text
+    assert 'test_queue_name' not in text
+
+
+def test_histogram_quantiles_stay_within_bucket_resolution():
+    latency = Histogram('test_quantile_seconds', "Latency", registry=Registry())
+    for i in range(1, 1001):
+        latency.observe(i / 1000)
+    p95 = latency.labels().quantile(0.95)
+    assert 0.95 <= p95 <= 0.95 * 1.25
+
+
+def test_metrics_endpoint_serves_registry():
+    async def run():
+        server = await start_metrics_server('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"# TYPE pulsestreet_stage_seconds histogram" in response
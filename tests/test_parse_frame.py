@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import alerts
+from alerts import WhaleAlert, build_symbol_filter, parse_frame, prefilter_frame
+
+SYMBOLS = build_symbol_filter(["eth", "btc"])
+
+
+def _frame(**overrides):
+    message = {
+        "type": "alert",
+        "symbol": "eth",
+        "blockchain": "ethereum",
+        "timestamp": 1760000000,
+        "from": {"owner": "binance", "owner_type": "exchange"},
+        "to": "unknown wallet",
+        "amounts": [{"symbol": "ETH", "amount": 12.5, "value_usd": 40000}],
+    }
+    message.update(overrides)
+    return json.dumps(message, separators=(',', ':')).encode()
+
+
+def test_target_alert_is_parsed_into_record():
+    alert = parse_frame(_frame(), SYMBOLS)
+    assert alert == WhaleAlert("ETH", "ETHEREUM", 12.5, 40000.0, "binance", "unknown wallet", 1760000000,
+                               from_owner_type="exchange", to_owner_type="unknown")
+
+
+def test_prefilter_rejects_other_symbols_and_types_without_parsing():
+    _, symbol_bytes = SYMBOLS
+    assert not prefilter_frame(_frame(symbol="usdt"), symbol_bytes)
+    assert not prefilter_frame(b'{"type":"heartbeat"}', symbol_bytes)
+    assert prefilter_frame(_frame(symbol="BTC"), symbol_bytes)
+
+
+def test_non_compact_frames_fall_back_to_full_parse():
+    spaced = json.dumps({"type": "alert", "symbol": "btc", "amounts": []}).encode()
+    assert parse_frame(spaced, SYMBOLS).symbol == "BTC"
+    assert parse_frame(json.dumps({"type": "alert", "symbol": "xrp"}), SYMBOLS) is None
+
+
+def test_missing_amounts_default_to_zero():
+    alert = parse_frame(_frame(amounts=[], **{"from": None}), SYMBOLS)
+    assert (alert.amount, alert.value_usd, alert.from_owner) == (0.0, 0.0, "unknown")
+
+
+def test_malformed_frames_raise_the_active_decoders_error():
+    with pytest.raises(alerts._DECODE_ERRORS):
+        parse_frame(b'{"type":"alert","symbol":"eth",', SYMBOLS)
@@ -0,0 +1,36 @@
+import asyncio
+
+import prefetch
+from prefetch import TweetPrefetcher
+
+
+def test_poll_interval_respects_rate_limit():
+    prefetcher = TweetPrefetcher(None, "token", ["btc", "eth"], poll_interval=10,
+                                 rate_limit_requests=60, rate_limit_window=900)
+    assert prefetcher.poll_interval == 30
+
+
+def test_background_poll_fills_rolling_window(monkeypatch):
+    batches = iter([["b", "a"], ["c", "b"]])
+
+    async def fake_refresh(client, bearer_token, search_term):
+        assert search_term == "#BTC"
+        return next(batches, [])
+
+    monkeypatch.setattr(prefetch, "refresh_recent_tweets", fake_refresh)
+
+    async def run():
+        prefetcher = TweetPrefetcher(None, "token", ["btc"], poll_interval=0.01,
+                                     rate_limit_requests=10_000, rate_limit_window=1, window_size=3)
+        prefetcher.start()
+        await asyncio.sleep(0.05)
+        await prefetcher.stop()
+        return prefetcher.snapshot("btc"), prefetcher.age("BTC")
+
+    snapshot, age = asyncio.run(run())
+    assert snapshot == ["c", "b", "a"]
+    assert age is not None
+
+
+def test_snapshot_for_unpolled_symbol_is_empty():
+    assert TweetPrefetcher(None, "token", ["btc"]).snapshot("doge") == []
@@ -0,0 +1,51 @@
+import asyncio
+import gzip
+
+import httpx
+
+from alerts import listen_for_alerts
+from replay import MockServiceServer, ReplayWebSocketServer, ServiceProfile, frame_offsets, load_frames
+
+FRAMES = [
+    b'{"type":"alert","timestamp":100,"symbol":"btc","amounts":[{"amount":1,"value_usd":50000}]}',
+    b'{"type":"heartbeat"}',
+    b'{"type":"alert","timestamp":103,"symbol":"eth","amounts":[{"amount":5,"value_usd":20000}]}',
+]
+
+
+def test_captures_load_from_plain_and_gzip_files(tmp_path):
+    plain = tmp_path / "capture.jsonl"
+    plain.write_bytes(b"\n".join(FRAMES) + b"\n\n")
+    compressed = tmp_path / "capture.jsonl.gz"
+    compressed.write_bytes(gzip.compress(plain.read_bytes()))
+    assert load_frames(str(plain)) == load_frames(str(compressed)) == FRAMES
+    assert frame_offsets(FRAMES) == [0.0, 0.0, 3.0]
+
+
+def test_websocket_stand_in_plays_capture_to_listener():
+    async def run():
+        server = ReplayWebSocketServer(FRAMES, speed=0)
+        await server.start()
+        alerts = [alert async for alert in listen_for_alerts(server.url, {"symbols": ["btc", "eth"]}, reconnect=False)]
+        await server.stop()
+        return alerts
+
+    assert [alert.symbol for alert in asyncio.run(run())] == ["BTC", "ETH"]
+
+
+def test_mock_services_inject_errors_per_profile():
+    async def run():
+        mock = MockServiceServer({'telegram': ServiceProfile(error_rate=1.0, error_status=429)}, seed=1)
+        await mock.start()
+        async with httpx.AsyncClient(base_url=mock.base_url) as client:
+            tweets = await client.get("/2/tweets/search/recent", params={"query": "#BTC"})
+            completion = await client.post("/v1/completions", json={"prompt": "p", "model": "m"})
+            telegram = await client.post("/botreplay/sendMessage", json={"chat_id": "1", "text": "hi"})
+        await mock.stop()
+        return tweets, completion, telegram, mock.stats()
+
+    tweets, completion, telegram, stats = asyncio.run(run())
+    assert len(tweets.json()['data']) == 3
+    assert completion.json()['choices'][0]['text'].strip()
+    assert telegram.status_code == 429 and telegram.json()['parameters']['retry_after'] == 1
+    assert stats['injected_errors'] == {'telegram': 1}
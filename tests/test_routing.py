@@ -0,0 +1,34 @@
+import json
+
+from routing import Route, RoutingTable
+
+
+ROUTES = json.dumps([
+    {"chat_ids": ["btc-big"], "symbols": ["btc"], "min_value_usd": 1_000_000},
+    {"chat_ids": ["btc-small", "shared"], "symbols": ["btc"], "max_value_usd": 1_000_000},
+    {"chat_ids": ["eth"], "symbols": ["ETH"]},
+    {"chat_ids": ["shared", "firehose"]},
+])
+
+
+def test_routes_select_by_symbol_and_value_band(make_alert):
+    table = RoutingTable.from_config(ROUTES, default_chat_id=None)
+    assert table.destinations(make_alert(symbol="BTC", value_usd=5_000_000)) == ["btc-big", "shared", "firehose"]
+    assert table.destinations(make_alert(symbol="BTC", value_usd=50_000)) == ["btc-small", "shared", "firehose"]
+    assert table.destinations(make_alert(symbol="ETH", value_usd=10)) == ["eth", "shared", "firehose"]
+    assert table.destinations(make_alert(symbol="SOL", value_usd=10)) == ["shared", "firehose"]
+    assert table.chat_count() == 5
+
+
+def test_routes_can_be_loaded_from_file(tmp_path, make_alert):
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps([{"chat_id": "-100", "symbols": ["eth"]}]))
+    table = RoutingTable.from_config(str(path), default_chat_id=None)
+    assert table.destinations(make_alert(symbol="ETH", value_usd=1)) == ["-100"]
+    assert table.destinations(make_alert(symbol="BTC", value_usd=1)) == []
+
+
+def test_default_route_sends_everything_to_single_chat(make_alert):
+    table = RoutingTable.from_config(None, default_chat_id="12345")
+    assert table.routes == [Route(chat_ids=("12345",))]
+    assert table.destinations(make_alert(symbol="BTC", value_usd=1)) == ["12345"]
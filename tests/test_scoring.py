@@ -0,0 +1,88 @@
+import asyncio
+
+import main
+from scoring import AlertScorer, RollingPercentile, flow_direction, LLM, TEMPLATE, DIGEST
+
+
+def test_rolling_percentile_evicts_oldest_values():
+    window = RollingPercentile(3)
+    for value in (10, 20, 30):
+        window.add(value)
+    assert window.percentile(25) == 2 / 3
+    window.add(40)  # evicts 10
+    assert len(window) == 3
+    assert window.percentile(15) == 0.0 and window.percentile(40) == 5 / 6
+
+
+def test_flow_direction_from_owner_types(make_alert):
+    def direction(from_type, to_type):
+        return flow_direction(make_alert(from_owner_type=from_type, to_owner_type=to_type))
+
+    assert direction("unknown", "exchange") == "inflow"
+    assert direction("exchange", "unknown") == "outflow"
+    assert direction("exchange", "exchange") == "internal"
+    assert direction("unknown", "unknown") == "other"
+
+
+def test_large_inflows_score_above_small_internal_transfers(make_alert):
+    scorer = AlertScorer(min_history=5, weights=(0.5, 0.3, 0.2))
+    for index in range(10):
+        scorer.score(make_alert(value_usd=100_000 + index * 1000, timestamp=1760000000 + index * 600))
+    big_inflow = scorer.score(make_alert(value_usd=5_000_000, to_owner_type="exchange", timestamp=1760010000))
+    small_internal = scorer.score(make_alert(value_usd=50_000, from_owner_type="exchange", to_owner_type="exchange",
+                                             timestamp=1760020000))
+    assert big_inflow > 0.75 > 0.1 > small_internal
+
+
+def test_burst_raises_the_score_within_the_window(make_alert):
+    scorer = AlertScorer(min_history=1000, burst_window=60, burst_saturation=4, weights=(0, 0, 1))
+    scores = [scorer.score(make_alert(timestamp=1760000000 + second)) for second in range(5)]
+    assert scores == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert scorer.score(make_alert(timestamp=1760000200)) == 0.0
+
+
+def test_routes_by_threshold_and_counts_them(make_alert):
+    scorer = AlertScorer(llm_threshold=0.6, template_threshold=0.3, digest_enabled=True)
+    assert [scorer.route_for(score) for score in (0.9, 0.6, 0.45, 0.1)] == [LLM, LLM, TEMPLATE, DIGEST]
+    scorer.route(make_alert(value_usd=50_000_000, to_owner_type="exchange", timestamp=1760000000))
+    assert scorer.stats()['routed_llm'] == 1
+
+
+def test_low_scores_get_a_template_message_while_the_digest_is_off():
+    scorer = AlertScorer(llm_threshold=0.6, template_threshold=0.3, digest_enabled=False)
+    assert [scorer.route_for(score) for score in (0.9, 0.45, 0.1)] == [LLM, TEMPLATE, TEMPLATE]
+
+
+def test_template_route_skips_analysis_and_digest_route_sends_nothing(monkeypatch, make_alert):
+    sent = []
+
+    async def fake_send(client, bot_token, chat_id, message):
+        sent.append(message)
+        return True
+
+    async def no_analysis(*args, **kwargs):
+        raise AssertionError("low-score alerts must not reach the LLM")
+
+    monkeypatch.setattr(main, "send_telegram_alert", fake_send)
+    monkeypatch.setattr(main, "analyze_with_llama", no_analysis)
+
+    template_scorer = AlertScorer(llm_threshold=1.01, template_threshold=0.0)
+    asyncio.run(main.process_alert(None, make_alert(value_usd=2_000_000), sources=[], scorer=template_scorer))
+    assert len(sent) == 1 and "Alert Score" in sent[0] and "LLaMA Analysis" not in sent[0]
+
+    digest_scorer = AlertScorer(llm_threshold=1.01, template_threshold=1.01, digest_enabled=True)
+    assert asyncio.run(main.process_alert(None, make_alert(value_usd=2_000_000), sources=[],
+                                          scorer=digest_scorer)) is None
+    assert len(sent) == 1
+
+
+def test_batches_are_valued_by_their_largest_transfer_not_the_sum(make_alert):
+    def warmed_scorer():
+        scorer = AlertScorer(min_history=5, weights=(1, 0, 0))
+        for index in range(20):
+            scorer.score(make_alert(value_usd=1_000_000 + index * 10_000, timestamp=1760000000 + index * 600))
+        return scorer
+
+    members = [make_alert(value_usd=1_100_000, timestamp=1760020000) for _ in range(5)]
+    batch = make_alert(amount=5.0, value_usd=5_500_000, timestamp=1760020000, batch=members)
+    assert warmed_scorer().score(batch) == warmed_scorer().score(members[0]) < 1.0
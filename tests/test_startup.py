@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str, **env) -> subprocess.CompletedProcess:
+    clean = {key: value for key, value in os.environ.items()
+             if not key.startswith(('WHALE_', 'CEREBRAS_', 'TELEGRAM_', 'TWITTER_'))}
+    clean.update(env)
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=clean, capture_output=True, text=True, timeout=60)
+
+
+def test_main_imports_without_credentials_or_heavy_sdks():
+    result = _run("import sys, logging, main\n"
+                  "print(sorted({m.split('.')[0] for m in sys.modules} & {'cerebras', 'telegram'}))\n"
+                  "print(logging.getLogger().handlers)\n"
+                  "print(main.config.IS_CONFIG_VALID)")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["[]", "[]", "False"]
+
+
+def test_cerebras_clients_are_built_on_first_access():
+    result = _run("import sys, llama\n"
+                  "assert 'cerebras' not in sys.modules\n"
+                  "print(type(llama.async_cerebras_client).__name__, 'cerebras' in sys.modules)",
+                  CEREBRAS_API_KEY='test', CEREBRAS_BASE_URL='http://127.0.0.1:9')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["AsyncCerebras", "True"]
+
+
+def test_llama_analysis_cache_db_is_opened_on_warm_up_not_import(tmp_path):
+    db = tmp_path / "llama-cache.sqlite3"
+    result = _run("import asyncio, os, llama\n"
+                  f"print(os.path.exists({str(db)!r}), llama.analysis_cache.store)\n"
+                  "asyncio.run(llama.warm_up())\n"
+                  f"print(os.path.exists({str(db)!r}), type(llama.analysis_cache.store).__name__)",
+                  LLAMA_CACHE_DB=str(db))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["False None", "True SQLiteCacheStore"]
+
+
+def test_digest_without_a_chat_to_send_it_to_is_rejected():
+    check = "import config; print(config.IS_CONFIG_VALID)"
+    credentials = dict(WHALE_ALERT_API_KEY='test', CEREBRAS_API_KEY='test', CEREBRAS_MODEL_ID='test',
+                       TELEGRAM_BOT_TOKEN='test', TELEGRAM_ROUTES='BTC:-100', DIGEST_ENABLED='true')
+    assert _run(check, **credentials).stdout.split() == ["False"]
+    assert _run(check, **credentials, DIGEST_CHAT_ID='-200').stdout.split() == ["True"]
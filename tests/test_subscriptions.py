@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from subscriptions import listen_to_shards, load_subscriptions, merge_streams, subscribed_symbols
+
+
+def test_subscriptions_load_from_json_with_defaults_and_validation(tmp_path):
+    default = load_subscriptions(None, {"blockchains": ["bitcoin"], "symbols": ["btc"], "min_value_usd": 10_000})
+    assert [(s.name, s.symbols, s.min_value_usd) for s in default] == [("default", ("btc",), 10_000)]
+
+    path = tmp_path / "shards.json"
+    path.write_text(json.dumps([{"name": "majors", "symbols": ["BTC", "eth"], "min_value_usd": 1_000_000},
+                                {"blockchains": ["tron"], "symbols": ["usdt", "btc"]}]))
+    shards = load_subscriptions(str(path))
+    assert [s.name for s in shards] == ["majors", "shard-1"]
+    assert shards[0].message() == {"type": "subscribe_alerts", "blockchains": [], "symbols": ["btc", "eth"],
+                                   "min_value_usd": 1_000_000}
+    assert subscribed_symbols(shards) == ["btc", "eth", "usdt"]
+    with pytest.raises(ValueError):
+        load_subscriptions('[{"name": "a", "symbols": ["btc"]}, {"name": "a", "symbols": ["eth"]}]')
+
+
+def test_merge_keeps_streaming_past_a_stalled_and_a_broken_shard():
+    async def fast():
+        for i in range(3):
+            yield i
+
+    async def stalled():
+        await asyncio.sleep(60)
+        yield 'never'
+
+    async def broken():
+        yield 'x'
+        raise RuntimeError("boom")
+
+    async def run():
+        merged = merge_streams({"fast": fast(), "stalled": stalled(), "broken": broken()})
+        received = [await anext(merged) for _ in range(4)]
+        await merged.aclose()
+        return received
+
+    assert sorted(map(str, asyncio.run(asyncio.wait_for(run(), 5)))) == ['0', '1', '2', 'x']
+
+
+def _frame(symbol, tx_hash, value_usd):
+    return json.dumps({"type": "alert", "symbol": symbol, "blockchain": "ethereum", "transaction": {"hash": tx_hash},
+                       "amounts": [{"amount": 1, "value_usd": value_usd}]})
+
+
+def test_shards_apply_their_own_thresholds_and_share_dedupe():
+    async def handle(ws):
+        request = json.loads(await ws.recv())
+        await ws.send(json.dumps({"type": "subscribed_alerts"}))
+        if request["symbols"] == ["eth"]:
+            frames = [_frame("eth", "0x1", 2_000_000), _frame("eth", "0x2", 500)]
+        else:
+            frames = [_frame("usdt", "0x3", 6_000_000), _frame("usdt", "0x4", 1_000_000), _frame("eth", "0x1", 2_000_000)]
+        for frame in frames:
+            await ws.send(frame)
+
+    async def run():
+        server = await websockets.serve(handle, '127.0.0.1', 0)
+        url = f"ws://127.0.0.1:{next(iter(server.sockets)).getsockname()[1]}"
+        shards = load_subscriptions('[{"name": "eth", "symbols": ["eth"], "min_value_usd": 1000},'
+                                    ' {"name": "stables", "symbols": ["usdt", "eth"], "min_value_usd": 5000000}]')
+        received = [alert.tx_hash async for alert in listen_to_shards(url, shards, reconnect=False)]
+        server.close()
+        await server.wait_closed()
+        return received
+
+    assert sorted(asyncio.run(asyncio.wait_for(run(), 10))) == ["0x1", "0x3"]
@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import httpx
+
+from telegram_bot import COALESCE_SEPARATOR, LiveMessage, TelegramSender, TokenBucket
+
+
+def _run_sender(handler, messages, **kwargs):
+    """Sends (chat_id, text) pairs through a TelegramSender backed by a mock transport."""
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            sender = TelegramSender(client, "token", **kwargs)
+            futures = [sender.enqueue(chat_id, text) for chat_id, text in messages]
+            sender.start()
+            results = await asyncio.wait_for(asyncio.gather(*futures), timeout=5)
+            await sender.close()
+            return results, sender.stats()
+
+    return asyncio.run(run())
+
+
+def test_queued_messages_for_one_chat_are_coalesced():
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': len(bodies)}})
+
+    results, stats = _run_sender(handler, [("chat", "one"), ("chat", "two"), ("other", "three")],
+                                 global_rate=1000, chat_rate_per_minute=6000, chat_burst=1, concurrency=2)
+    texts = sorted(body['text'] for body in bodies)
+    assert texts == ["one" + COALESCE_SEPARATOR + "two", "three"]
+    assert stats['delivered'] == 3 and stats['coalesced'] == 1
+    assert all(result is not None for result in results)
+
+
+def test_429_retry_after_is_honored_and_5xx_retried():
+    responses = iter([
+        httpx.Response(429, json={'ok': False, 'parameters': {'retry_after': 0.05}}),
+        httpx.Response(502, text="bad gateway"),
+        httpx.Response(200, json={'ok': True, 'result': {'message_id': 7}}),
+    ])
+
+    results, stats = _run_sender(lambda request: next(responses), [("chat", "hello")],
+                                 global_rate=1000, chat_rate_per_minute=6000, chat_burst=5)
+    assert results == [{'message_id': 7}]
+    assert stats['rate_limited'] == 1 and stats['retries'] == 1 and stats['sent_requests'] == 3
+
+
+def test_client_errors_are_not_retried():
+    results, stats = _run_sender(lambda request: httpx.Response(403, text="forbidden"), [("chat", "hi")],
+                                 global_rate=1000, chat_rate_per_minute=6000)
+    assert results == [None]
+    assert stats['failed'] == 1 and stats['sent_requests'] == 1
+
+
+def test_markdown_errors_fall_back_to_plain_text():
+    modes = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        modes.append(body.get('parse_mode'))
+        if body.get('parse_mode'):
+            return httpx.Response(400, text="Bad Request: can't parse entities")
+        return httpx.Response(200, json={'ok': True, 'result': {}})
+
+    results, _ = _run_sender(handler, [("chat", "*broken")], global_rate=1000, chat_rate_per_minute=6000)
+    assert modes == ["Markdown", None]
+    assert results == [{}]
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.take()
+    bucket.take()
+    assert 0.05 < bucket.delay() <= 0.1
+
+
+def test_live_message_posts_once_then_edits_throttled():
+    calls = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        calls.append((request.url.path.rsplit('/', 1)[-1], body.get('message_id'), body['text']))
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': 42}})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            sender = TelegramSender(client, "token", global_rate=1000, chat_rate_per_minute=6000, chat_burst=5)
+            sender.start()
+            live = LiveMessage(sender, ["chat"], min_interval=60)
+            live.post("summary")
+            live.update("ignored: not posted yet")
+            await asyncio.sleep(0.05)
+            live.update("ignored: throttled")
+            await live.finish("final")
+            await sender.close()
+            return live
+
+    live = asyncio.run(run())
+    assert calls == [("sendMessage", None, "summary"), ("editMessageText", 42, "final")]
+    assert live.edits == 1
+
+
+def test_live_message_ignores_updates_after_finish():
+    calls = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        calls.append((request.url.path.rsplit('/', 1)[-1], body['text']))
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': 42}})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            sender = TelegramSender(client, "token", global_rate=1000, chat_rate_per_minute=6000, chat_burst=5)
+            sender.start()
+            live = LiveMessage(sender, ["chat"], min_interval=0)
+            live.post("summary")
+            await live.finish("FINAL")
+            # A stream that outlived the latency budget keeps calling on_text.
+            live.update("partial ▌")
+            await asyncio.sleep(0.05)
+            await sender.close()
+
+    asyncio.run(run())
+    assert calls == [("sendMessage", "summary"), ("editMessageText", "FINAL")]
@@ -1,42 +1,103 @@
 import httpx
 import logging
-from config import TWITTER_MAX_RESULTS 
-import json 
+import time
+from config import TWITTER_API_BASE_URL, TWITTER_MAX_RESULTS, TWITTER_CACHE_TTL_SECONDS, TWITTER_CACHE_STALE_SECONDS, TWITTER_CACHE_MAX_ENTRIES
+from cache import AsyncCache
+from breaker import breaker_for
+from metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS
+import json
 
 """
 Uses the Twitter API v2 to search for tweets containing the alert symbol.
+Results are cached per normalized query, and concurrent lookups for the same
+query share a single in-flight request.
 """
 
 logger = logging.getLogger(__name__)
 
+tweet_cache = AsyncCache(
+    "twitter",
+    ttl=TWITTER_CACHE_TTL_SECONDS,
+    max_entries=TWITTER_CACHE_MAX_ENTRIES,
+    stale_ttl=TWITTER_CACHE_STALE_SECONDS,
+)
+
+
+def _normalize_query(search_term: str) -> str:
+    return ' '.join(search_term.lower().split())
+
+
 async def fetch_recent_tweets(client: httpx.AsyncClient, bearer_token: str, search_term: str):
     if not bearer_token:
         logger.debug("Bearer token not provided to fetch_recent_tweets.")
-        return [] 
+        return []
+    if TWITTER_CACHE_TTL_SECONDS <= 0:
+        tweets = await _search_recent_tweets(client, bearer_token, search_term)
+    else:
+        tweets = await tweet_cache.get_or_fetch(
+            _normalize_query(search_term),
+            lambda: _search_recent_tweets(client, bearer_token, search_term),
+        )
+    return list(tweets) if tweets is not None else []
+
+
+async def refresh_recent_tweets(client: httpx.AsyncClient, bearer_token: str, search_term: str):
+    """Fetches fresh tweets bypassing the cache, then re-seeds it. Returns None on failure."""
+    tweets = await _search_recent_tweets(client, bearer_token, search_term)
+    if tweets is not None:
+        tweet_cache.entries.set(_normalize_query(search_term), tweets)
+    return tweets
+
+
+async def _search_recent_tweets(client: httpx.AsyncClient, bearer_token: str, search_term: str):
+    """
+    Calls the recent search endpoint through the Twitter circuit breaker; returns None
+    on failure (or while the breaker is open) so errors are not cached.
+    """
+    breaker = breaker_for('twitter')
+    permit = breaker.allow()
+    if permit is None:
+        logger.debug("Twitter circuit breaker is open; skipping search for '%s'.", search_term)
+        return None
+    started = time.monotonic()
+    tweets = None
+    try:
+        tweets = await _request_recent_tweets(client, bearer_token, search_term)
+    finally:
+        breaker.record(permit, tweets is not None, time.monotonic() - started)
+    return tweets
+
+
+async def _request_recent_tweets(client: httpx.AsyncClient, bearer_token: str, search_term: str):
     try:
         headers = {"Authorization": f"Bearer {bearer_token}"}
-        query = f"({search_term}) -is:retweet lang:en" 
+        query = f"({search_term}) -is:retweet lang:en"
         params = {
             "query": query,
-            "max_results": TWITTER_MAX_RESULTS, 
-            "tweet.fields": "created_at", 
+            "max_results": TWITTER_MAX_RESULTS,
+            "tweet.fields": "created_at",
         }
-        url = "https://api.twitter.com/2/tweets/search/recent"
-        logger.info(f"Fetching up to {TWITTER_MAX_RESULTS} tweets with query: '{query}'")
-        response = await client.get(url, headers=headers, params=params, timeout=10.0)
+        url = f"{TWITTER_API_BASE_URL}/2/tweets/search/recent"
+        logger.info("Fetching up to %d tweets with query: '%s'", TWITTER_MAX_RESULTS, query)
+        started = time.monotonic()
+        response = await client.get(url, headers=headers, params=params)
+        UPSTREAM_SECONDS.labels('twitter').observe(time.monotonic() - started)
         if response.status_code >= 400:
-             logger.error(f"Twitter API Error {response.status_code}: {response.text}")
-             return []
+             UPSTREAM_ERRORS.labels('twitter', str(response.status_code)).inc()
+             logger.error("Twitter API Error %d: %s", response.status_code, response.text)
+             return None
         data = response.json()
         tweets = [tweet.get('text', '') for tweet in data.get('data', [])]
-        logger.info(f"Successfully fetched {len(tweets)} tweets for context.")
+        logger.info("Successfully fetched %d tweets for context.", len(tweets))
         return tweets
     except httpx.TimeoutException:
+        UPSTREAM_ERRORS.labels('twitter', 'timeout').inc()
         logger.error("Twitter API request timed out.")
     except httpx.RequestError as e:
+        UPSTREAM_ERRORS.labels('twitter', 'network').inc()
         logger.error(f"Twitter API connection error: {e}")
     except json.JSONDecodeError as e:
          logger.error(f"Failed to decode Twitter API JSON response: {e}. Response text: {response.text if 'response' in locals() else 'N/A'}")
     except Exception as e:
         logger.error(f"Unexpected error fetching tweets: {e}", exc_info=True)
-    return [] 
\ No newline at end of file
+    return None